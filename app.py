@@ -1,7 +1,6 @@
 import streamlit as st
 import pandas as pd
 import os
-import base64
 from streamlit.components.v1 import html
 import time
 from datetime import datetime
@@ -14,26 +13,15 @@ st.set_page_config(
     menu_items=None
 )
 
-# Function to convert image to base64 for embedding in CSS
-def get_base64_of_file(file_path):
-    """Convert file to base64 encoded string for embedding in HTML/CSS"""
-    try:
-        with open(file_path, "rb") as f:
-            data = f.read()
-        return base64.b64encode(data).decode()
-    except Exception as e:
-        st.error(f"Error loading file {file_path}: {e}")
-        return ""
-
 # Function to set background image
 def set_background(background_image_path):
     """Apply a background image to the Streamlit app"""
-    background_base64 = get_base64_of_file(background_image_path)
+    background_url = get_asset_url(background_image_path)
     st.markdown(
         f"""
         <style>
         .stApp {{
-            background-image: url("data:image/svg+xml;base64,{background_base64}");
+            background-image: url("{background_url}");
             background-size: cover;
             background-repeat: no-repeat;
             background-attachment: fixed;
@@ -48,14 +36,21 @@ from components.analysis_section import render_analysis_section
 from components.visualization_section import render_visualization_section
 from components.chat_bot import render_chat_bot, render_placeholder_chat_bot
 from utils.data_loader import load_sample_data, load_file, get_data_summary
+from utils.assets import get_asset_url, read_text_asset, preload_assets
+from utils.profiler import start_rerun, finish_rerun, render_profiler_panel
 
 # Page configuration is set at the top of the file
 
+# Start timing this rerun (only when profiling is enabled)
+start_rerun(st.session_state.get('current_tab', "Upload"))
+
 # Load custom CSS
 def load_css(css_file):
-    with open(css_file, "r") as f:
-        css = f"<style>{f.read()}</style>"
-        st.markdown(css, unsafe_allow_html=True)
+    css = f"<style>{read_text_asset(css_file)}</style>"
+    st.markdown(css, unsafe_allow_html=True)
+
+# Encode shared assets once per process (no-op on later reruns)
+preload_assets()
 
 # Load the custom CSS if it exists
 css_path = ".streamlit/styles.css"
@@ -295,7 +290,7 @@ st.markdown(f"""
     </style>
 """, unsafe_allow_html=True)
 
-# Use the above get_base64_of_file function
+# Images are served through the shared asset registry (utils.assets)
 # Professional header inspired by modern analytics dashboards with theme-specific colors
 st.markdown(f"""
 <div class="page-header">
@@ -373,7 +368,7 @@ if st.session_state.current_tab == "Upload":
                     </div>
                 </div>
                 <div style="min-width:150px; text-align:center;">
-                    <img src="data:image/jpeg;base64,{get_base64_of_file('assets/synaptide_logo.jpeg')}" style="max-width:160px; height:auto; border-radius:8px;">
+                    <img src="{get_asset_url('static/synaptide_logo.jpeg')}" style="max-width:160px; height:auto; border-radius:8px;">
                 </div>
             </div>
         </div>
@@ -403,13 +398,13 @@ if st.session_state.current_tab == "Upload":
                     </ul>
                 </div>
                 <div style="flex:1; min-width:180px; display:flex; justify-content:center;">
-                    <img src="data:image/svg+xml;base64,{get_base64_of_file('assets/example_images/data_analysis.svg')}" style="max-width:100%; height:auto; border-radius:8px; box-shadow:0 4px 12px rgba(0,0,0,0.1);">
+                    <img src="{get_asset_url('assets/example_images/data_analysis.svg')}" style="max-width:100%; height:auto; border-radius:8px; box-shadow:0 4px 12px rgba(0,0,0,0.1);">
                 </div>
             </div>
             
             <div class="feature-showcase-item" style="display:flex; margin-bottom:30px; background:white; border-radius:12px; padding:25px; gap:30px; align-items:center; border:1px solid #E0E0E0; box-shadow:0 4px 12px rgba(0,0,0,0.05);">
                 <div style="flex:1; min-width:180px; display:flex; justify-content:center;">
-                    <img src="data:image/svg+xml;base64,{get_base64_of_file('assets/example_images/data_visualization.svg')}" style="max-width:100%; height:auto; border-radius:8px; box-shadow:0 4px 12px rgba(0,0,0,0.1);">
+                    <img src="{get_asset_url('assets/example_images/data_visualization.svg')}" style="max-width:100%; height:auto; border-radius:8px; box-shadow:0 4px 12px rgba(0,0,0,0.1);">
                 </div>
                 <div style="flex:1; min-width:180px;">
                     <div style="font-size:24px; margin-bottom:10px; color:#242424; font-family:'Space Grotesk', sans-serif; font-weight:600;">Data Visualization</div>
@@ -469,7 +464,7 @@ if st.session_state.current_tab == "Upload":
             
             <div style="padding:25px;">
                 <div style="font-size:24px; margin-bottom:15px; color:white; font-family:'Space Grotesk', sans-serif; font-weight:600; display:flex; align-items:center; gap:10px;">
-                    <img src="data:image/jpeg;base64,{get_base64_of_file('assets/synaptide_logo.jpeg')}" style="width:32px; height:32px; border-radius:4px;">
+                    <img src="{get_asset_url('static/synaptide_logo.jpeg')}" style="width:32px; height:32px; border-radius:4px;">
                     <span>Synaptide AI-Powered Analytics</span>
                 </div>
                 
@@ -581,7 +576,7 @@ elif st.session_state.current_tab == "Chat Bot":
 st.markdown(f"""
 <div style="margin-top: 50px; padding: 25px; border-radius: 10px; background: #242424; text-align: center; border: 1px solid #333;">
     <div style="display: flex; justify-content: center; align-items: center; gap: 12px; margin-bottom: 15px;">
-        <img src="data:image/jpeg;base64,{get_base64_of_file('assets/synaptide_logo.jpeg')}" style="width: 32px; height: 32px; border-radius: 4px;">
+        <img src="{get_asset_url('static/synaptide_logo.jpeg')}" style="width: 32px; height: 32px; border-radius: 4px;">
         <span style="font-weight: 600; color: white; font-family: 'Space Grotesk', sans-serif; font-size: 18px;">CorpChat Analytics</span>
     </div>
     <p style="margin: 0; font-size: 14px; color: rgba(255, 255, 255, 0.7); font-family: 'Space Grotesk', sans-serif;">
@@ -589,3 +584,7 @@ st.markdown(f"""
     </p>
 </div>
 """, unsafe_allow_html=True)
+
+# Finish the rerun profile and show the timing panel (only when profiling is enabled)
+finish_rerun(rows=len(st.session_state.data) if st.session_state.data is not None else None)
+render_profiler_panel()
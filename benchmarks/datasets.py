@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+# Row counts accepted on the command line, e.g. "100k" or "1m"
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+# Number of extra numeric / categorical columns added to the wide shape
+WIDE_NUMERIC_COLUMNS = 60
+WIDE_CATEGORICAL_COLUMNS = 20
+
+CATEGORIES = np.array([f"Category {i}" for i in range(8)], dtype=object)
+REGIONS = np.array(["North", "South", "East", "West", "Central"], dtype=object)
+PRODUCTS = np.array([f"Product {i:04d}" for i in range(2000)], dtype=object)
+
+def parse_size(label):
+    """
+    Parse a row count such as "1k", "250k" or "10m"
+
+    Parameters:
+    - label: Size label or plain integer string
+
+    Returns:
+    - Number of rows
+    """
+    label = str(label).strip().lower()
+    if label and label[-1] in SIZE_SUFFIXES:
+        return int(float(label[:-1]) * SIZE_SUFFIXES[label[-1]])
+    return int(label)
+
+def format_size(rows):
+    """
+    Format a row count as a short label (inverse of parse_size)
+    """
+    if rows >= 1_000_000 and rows % 1_000_000 == 0:
+        return f"{rows // 1_000_000}m"
+    if rows >= 1_000 and rows % 1_000 == 0:
+        return f"{rows // 1_000}k"
+    return str(rows)
+
+def _with_missing(rng, values, fraction):
+    mask = rng.random(len(values)) < fraction
+    values = values.astype(float) if values.dtype.kind in "iu" else values
+    values[mask] = np.nan if values.dtype.kind == "f" else None
+    return values
+
+def make_dataset(rows, shape="narrow", seed=0):
+    """
+    Generate a synthetic business dataset with mixed dtypes
+
+    The narrow shape mirrors a typical sales export: ids, dates (parsed and
+    as strings), low-cardinality categories, a high-cardinality product
+    column, numeric measures with missing values, a boolean flag and a
+    small share of duplicated rows. The wide shape adds many numeric and
+    categorical columns on top.
+
+    Parameters:
+    - rows: Number of rows
+    - shape: "narrow" or "wide"
+    - seed: Random seed, so every run benchmarks identical data
+
+    Returns:
+    - Pandas DataFrame
+    """
+    rng = np.random.default_rng(seed)
+
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, rows), unit="D")
+    data = {
+        "ID": np.arange(rows, dtype=np.int64),
+        "Date": dates,
+        "Date Text": dates.strftime("%Y-%m-%d"),
+        "Category": CATEGORIES[rng.integers(0, len(CATEGORIES), rows)],
+        "Region": _with_missing(rng, REGIONS[rng.integers(0, len(REGIONS), rows)], 0.02),
+        "Product": PRODUCTS[rng.integers(0, len(PRODUCTS), rows)],
+        "Value": _with_missing(rng, rng.gamma(2.0, 50.0, rows).round(2), 0.05),
+        "Quantity": _with_missing(rng, rng.integers(1, 100, rows), 0.03),
+        "Discount": rng.random(rows).round(3),
+        "Returned": rng.random(rows) < 0.1
+    }
+
+    if shape == "wide":
+        for i in range(WIDE_NUMERIC_COLUMNS):
+            data[f"Metric {i}"] = _with_missing(rng, rng.normal(100, 15, rows), 0.01)
+        for i in range(WIDE_CATEGORICAL_COLUMNS):
+            data[f"Attribute {i}"] = CATEGORIES[rng.integers(0, len(CATEGORIES), rows)]
+    elif shape != "narrow":
+        raise ValueError(f"Unknown dataset shape: {shape}")
+
+    # Repeat about 1% of rows exactly so de-duplication has work to do
+    positions = np.arange(rows)
+    duplicates = rng.integers(0, rows, rows // 100)
+    positions[duplicates] = rng.integers(0, rows, len(duplicates))
+
+    return pd.DataFrame(data).iloc[positions].reset_index(drop=True)
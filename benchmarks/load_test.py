@@ -0,0 +1,454 @@
+"""
+Simulate concurrent analyst sessions against the Streamlit app
+
+Usage (from the repository root):
+    python -m benchmarks.load_test --sessions 10 --rows 100k
+    python -m benchmarks.load_test --sessions 40 --rows 50k --ramp 10 --output load.json
+
+Every session is a headless AppTest running app.py in its own worker
+process and replays the same flow: open the app, upload a CSV, open the
+analysis panels, create a chart and ask the chat assistant a question.
+The assistant talks to a local stub server that streams an OpenAI-style
+response, so no API key or network access is needed. The report lists
+p50/p95/p99 rerun latency per step and the memory each session holds.
+"""
+import io
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import traceback
+import argparse
+import threading
+import multiprocessing
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+from benchmarks.datasets import make_dataset, parse_size, format_size
+from utils.data_loader import load_file
+
+# Words streamed by the stub assistant before its chart spec
+STUB_RESPONSE_WORDS = (
+    "**Key insight:** Category 3 leads total value, driven by steady growth in the North region. "
+    "Returns stay below ten percent across all categories."
+).split(" ")
+STUB_CHART_SPEC = {"type": "bar", "x": "Category", "y": "Value", "aggregation": "sum", "title": "Value by Category"}
+
+CHAT_QUESTION = "Show me a bar chart of total value by category"
+
+# Reruns in one pass of the flow after opening the app (see run_session)
+FLOW_STEPS = 8
+
+def _sse_event(content=None, finish_reason=None):
+    chunk = {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": "stub",
+        "choices": [{
+            "index": 0,
+            "delta": {"content": content} if content is not None else {},
+            "finish_reason": finish_reason
+        }]
+    }
+    return f"data: {json.dumps(chunk)}\n\n".encode()
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """
+    Minimal OpenAI-compatible chat completions endpoint that streams a fixed answer
+    """
+    protocol_version = "HTTP/1.1"
+    token_delay = 0.02
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        tokens = [word + " " for word in STUB_RESPONSE_WORDS]
+        tokens.append(f"\n\n```chart\n{json.dumps(STUB_CHART_SPEC)}\n```")
+        try:
+            for token in tokens:
+                self._write_chunk(_sse_event(token))
+                time.sleep(self.token_delay)
+            self._write_chunk(_sse_event(finish_reason="stop"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+def start_stub_llm_server(token_delay):
+    """
+    Start the stub LLM server on a free local port
+
+    Parameters:
+    - token_delay: Seconds between streamed tokens
+
+    Returns:
+    - (server, base_url) tuple
+    """
+    handler = type("ConfiguredStubLLMHandler", (StubLLMHandler,), {"token_delay": token_delay})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1"
+
+class UploadedCSV(io.BytesIO):
+    """
+    In-memory stand-in for Streamlit's UploadedFile
+    """
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+def get_rss_mb():
+    """
+    Current resident set size of this process in MB (Linux), or None
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def estimate_session_bytes(at):
+    """
+    Estimate the memory a session holds in st.session_state
+
+    DataFrames are measured deeply and saved visualizations by their stored
+    size; other values are ignored as they are small in comparison.
+    """
+    total = 0
+    for value in at.session_state.filtered_state.values():
+        if isinstance(value, pd.DataFrame):
+            total += int(value.memory_usage(deep=True).sum())
+        elif isinstance(value, (bytes, bytearray)):
+            total += len(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    total += item.get("size", 0)
+                    if isinstance(item.get("data"), pd.DataFrame):
+                        total += int(item["data"].memory_usage(deep=True).sum())
+    return total
+
+def run_session(session_id, csv_bytes, timeout, iterations, record):
+    """
+    Replay the analyst flow in one headless session
+
+    Parameters:
+    - session_id: Index of the session
+    - csv_bytes: CSV file contents to "upload"
+    - timeout: Seconds allowed per rerun
+    - iterations: Number of times to repeat the flow after opening the app
+    - record: Callback record(step, seconds, error=None)
+
+    Returns:
+    - AppTest instance (kept alive so its memory can be measured)
+    """
+    at = AppTest.from_file(os.path.join(ROOT_DIR, "app.py"), default_timeout=timeout)
+
+    def step(name, action):
+        start = time.perf_counter()
+        try:
+            action()
+            error = f"{at.exception[0].message}" if at.exception else None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        record(name, time.perf_counter() - start, error)
+
+    step("open", at.run)
+
+    for _ in range(iterations):
+        def upload():
+            df = load_file(UploadedCSV(csv_bytes, f"session_{session_id}.csv"))
+            at.session_state.data = df
+            at.session_state.file_name = f"session_{session_id}.csv"
+            at.session_state.current_tab = "Upload"
+            at.run()
+        step("upload_preview", upload)
+
+        def analysis():
+            at.session_state.current_tab = "Analysis"
+            at.run()
+        step("analysis_stats", analysis)
+
+        step("analysis_filter", lambda: at.radio(key="analysis_panel").set_value("Filtering").run())
+        step("analysis_distribution", lambda: at.radio(key="analysis_panel").set_value("Distribution Analysis").run())
+
+        def visualization():
+            at.session_state.current_tab = "Visualization"
+            at.run()
+        step("visualization_open", visualization)
+
+        def create_chart():
+            button = next(b for b in at.button if b.label == "Create Bar Chart")
+            button.click().run()
+        step("visualization_chart", create_chart)
+
+        def chat_open():
+            at.session_state.current_tab = "Chat Bot"
+            at.session_state.openai_api_key_available = True
+            at.run()
+        step("chat_open", chat_open)
+
+        step("chat_question", lambda: at.chat_input[0].set_value(CHAT_QUESTION).run())
+
+    return at
+
+def session_worker(session_id, settings, barrier, results):
+    """
+    Worker process entry point: prepare the upload, wait for the other
+    sessions, replay the flow and report samples and memory
+    """
+    # Setting session state between runs logs a bare-mode warning every time
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+    os.chdir(ROOT_DIR)
+    os.environ["OPENAI_BASE_URL"] = settings["base_url"]
+    os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+
+    try:
+        csv_bytes = make_dataset(settings["rows"], seed=session_id).to_csv(index=False).encode()
+        samples = []
+
+        def record(step, seconds, error=None):
+            samples.append({"step": step, "seconds": seconds, "error": error})
+
+        # Warm up imports so "open" measures a rerun on a running server, not a cold start
+        AppTest.from_file(os.path.join(ROOT_DIR, "app.py"), default_timeout=settings["timeout"]).run()
+
+        try:
+            barrier.wait(timeout=settings["timeout"])
+        except threading.BrokenBarrierError:
+            results.put({"session_id": session_id, "failed": "Another session failed to start in time"})
+            return
+        time.sleep(settings["ramp"] * session_id / settings["sessions"])
+
+        rss_start = get_rss_mb()
+        at = run_session(session_id, csv_bytes, settings["timeout"], settings["iterations"], record)
+        rss_end = get_rss_mb()
+
+        results.put({
+            "session_id": session_id,
+            "samples": samples,
+            "rss_growth_mb": rss_end - rss_start if rss_start and rss_end else None,
+            "rss_end_mb": rss_end,
+            "session_state_bytes": estimate_session_bytes(at)
+        })
+    except Exception:
+        results.put({"session_id": session_id, "failed": traceback.format_exc(limit=3)})
+
+def collect_reports(workers, results, deadline):
+    """
+    Wait for every session's report without blocking on a crashed or hung one
+
+    Parameters:
+    - workers: Session worker processes, indexed by session id
+    - results: Queue the workers put their reports on
+    - deadline: time.monotonic() value after which unfinished sessions are terminated
+
+    Returns:
+    - (reports of finished sessions, list of failed sessions with session_id and error) tuple
+    """
+    reports = {}
+    terminated = set()
+    while len(reports) < len(workers):
+        try:
+            report = results.get(timeout=1)
+        except queue.Empty:
+            pending = [i for i in range(len(workers)) if i not in reports]
+            if time.monotonic() > deadline:
+                for i in pending:
+                    if workers[i].is_alive():
+                        workers[i].terminate()
+                        terminated.add(i)
+                break
+            if not any(workers[i].is_alive() for i in pending):
+                # Every remaining worker has exited; anything they reported has been read
+                break
+            continue
+        reports[report["session_id"]] = report
+
+    failed = [
+        {"session_id": i, "error": reports[i]["failed"]}
+        for i in sorted(reports) if "failed" in reports[i]
+    ]
+    for i, worker in enumerate(workers):
+        if i in reports:
+            continue
+        if i in terminated:
+            error = "Did not finish before the deadline and was terminated"
+        else:
+            error = f"Exited with code {worker.exitcode} without a report"
+        failed.append({"session_id": i, "error": error})
+    return [report for report in reports.values() if "failed" not in report], failed
+
+def percentiles(samples):
+    if not samples:
+        return {"count": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    values = np.array(samples) * 1000
+    return {
+        "count": len(values),
+        "p50_ms": round(float(np.percentile(values, 50)), 1),
+        "p95_ms": round(float(np.percentile(values, 95)), 1),
+        "p99_ms": round(float(np.percentile(values, 99)), 1),
+        "max_ms": round(float(values.max()), 1)
+    }
+
+def run_load_test(sessions, rows, iterations=1, ramp=0.0, timeout=120, token_delay=0.02):
+    """
+    Run concurrent sessions and collect latency and memory statistics
+
+    AppTest keeps its runtime in process-wide globals, so each session runs
+    in its own worker process. The sessions still compete for the same CPUs
+    and memory, but not for one interpreter lock as they would inside a
+    single Streamlit server, so treat the latencies as a lower bound.
+
+    Parameters:
+    - sessions: Number of concurrent sessions
+    - rows: Rows in each uploaded dataset
+    - iterations: Flow repetitions per session
+    - ramp: Seconds over which session starts are spread
+    - timeout: Seconds allowed per rerun, and for the sessions to get ready
+    - token_delay: Seconds between stub LLM tokens
+
+    A session that crashes or hangs does not block the run: the barrier and
+    every wait for results time out, sessions still running after the time
+    their reruns can take are terminated, and failed sessions are reported.
+
+    Returns:
+    - Report dictionary
+    """
+    server, base_url = start_stub_llm_server(token_delay)
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(sessions + 1)
+    results = context.Queue()
+    settings = {
+        "base_url": base_url,
+        "rows": rows,
+        "sessions": sessions,
+        "iterations": iterations,
+        "ramp": ramp,
+        "timeout": timeout
+    }
+
+    workers = [
+        context.Process(target=session_worker, args=(i, settings, barrier, results), daemon=True)
+        for i in range(sessions)
+    ]
+    for worker in workers:
+        worker.start()
+
+    # Start the clock once every worker has warmed up and built its upload
+    try:
+        barrier.wait(timeout=timeout)
+    except threading.BrokenBarrierError:
+        # A session crashed or hung while getting ready; the others are released and report it
+        pass
+    started = time.perf_counter()
+    deadline = time.monotonic() + ramp + timeout * (FLOW_STEPS * iterations + 1)
+    reports, failed_sessions = collect_reports(workers, results, deadline)
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.join(timeout=5)
+    server.shutdown()
+
+    samples = {}
+    errors = []
+    for report in reports:
+        for sample in report["samples"]:
+            samples.setdefault(sample["step"], []).append(sample["seconds"])
+            if sample["error"]:
+                errors.append({"session_id": report["session_id"], "step": sample["step"], "error": sample["error"]})
+    all_samples = [value for values in samples.values() for value in values]
+    rss_growth = [report["rss_growth_mb"] for report in reports if report["rss_growth_mb"] is not None]
+    session_bytes = [report["session_state_bytes"] for report in reports]
+
+    return {
+        "settings": {
+            "sessions": sessions,
+            "rows": rows,
+            "iterations": iterations,
+            "ramp_s": ramp,
+            "token_delay_s": token_delay
+        },
+        "elapsed_s": round(elapsed, 2),
+        "reruns": len(all_samples),
+        "latency": {"all": percentiles(all_samples), **{step: percentiles(values) for step, values in samples.items()}},
+        "memory": {
+            "rss_growth_mb_mean": round(float(np.mean(rss_growth)), 1) if rss_growth else None,
+            "rss_growth_mb_max": round(max(rss_growth), 1) if rss_growth else None,
+            "session_state_mb_mean": round(float(np.mean(session_bytes)) / (1024 * 1024), 2) if session_bytes else None,
+            "session_state_mb_max": round(max(session_bytes) / (1024 * 1024), 2) if session_bytes else None
+        },
+        "errors": errors,
+        "failed_sessions": failed_sessions
+    }
+
+def print_report(report):
+    settings = report["settings"]
+    print(f"\n{settings['sessions']} sessions, {format_size(settings['rows'])} rows, "
+          f"{report['reruns']} reruns in {report['elapsed_s']} s")
+    print(f"\n  {'step':<24}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, stats in report["latency"].items():
+        print(f"  {step:<24}{stats['count']:>7}{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+              f"{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+
+    memory = report["memory"]
+    print(f"\n  RSS growth per session: {memory['rss_growth_mb_mean']} MB mean, {memory['rss_growth_mb_max']} MB max")
+    print(f"  Session state: {memory['session_state_mb_mean']} MB mean, {memory['session_state_mb_max']} MB max")
+
+    if report["errors"]:
+        print(f"\n  {len(report['errors'])} errors, first: {report['errors'][0]}")
+    for failure in report["failed_sessions"]:
+        print(f"\n  Session {failure['session_id']} failed: {failure['error']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test CorpChat with concurrent headless sessions")
+    parser.add_argument("--sessions", type=int, default=10, help="Number of concurrent sessions")
+    parser.add_argument("--rows", default="100k", help="Rows in the uploaded dataset, e.g. 50k or 1m")
+    parser.add_argument("--iterations", type=int, default=1, help="Times each session repeats the flow")
+    parser.add_argument("--ramp", type=float, default=0.0, help="Seconds over which sessions start")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds allowed per rerun")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between stub LLM tokens")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    report = run_load_test(
+        args.sessions,
+        parse_size(args.rows),
+        iterations=args.iterations,
+        ramp=args.ramp,
+        timeout=args.timeout,
+        token_delay=args.token_delay
+    )
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    return 1 if report["errors"] or report["failed_sessions"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Benchmark the data analysis and chart helpers on synthetic datasets
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks --sizes 1k,100k,1m --shapes narrow,wide
+    python -m benchmarks.run_benchmarks --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json
+
+Each benchmark is timed over several repeats (minimum and median wall time)
+and run once more under tracemalloc to record peak memory. With --baseline
+the results are compared against a stored run and the exit code is 1 when
+anything got slower or larger than the tolerance allows. A few correctness
+checks against plain pandas run first; the exit code is also 1 when one
+of them fails.
+"""
+import os
+import re
+import sys
+import io
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from streamlit import logger as streamlit_logger
+from benchmarks.datasets import make_dataset, parse_size, format_size
+from utils.data_analysis import (
+    calculate_basic_stats,
+    get_column_types,
+    clean_data,
+    count_duplicates,
+    find_duplicate_rows,
+    filter_data,
+    get_categorical_distribution,
+    get_numeric_distribution
+)
+from utils.sketches import update_numeric_sketches
+from utils.excel_reader import read_excel
+from utils.data_visualization import (
+    create_bar_chart,
+    create_line_chart,
+    create_scatter_plot,
+    create_histogram,
+    create_pie_chart,
+    create_heatmap,
+    create_box_plot,
+    create_correlation_heatmap
+)
+
+# Benchmark name -> callable taking the dataset
+BENCHMARKS = {
+    "calculate_basic_stats": lambda df: calculate_basic_stats(df),
+    "get_column_types": lambda df: get_column_types(df),
+    "clean_data.drop_missing": lambda df: clean_data(df, {"handle_missing": True, "missing_strategy": "drop"}),
+    "clean_data.fill_mean": lambda df: clean_data(df, {"handle_missing": True, "missing_strategy": "fill_mean"}),
+    "clean_data.fill_mode": lambda df: clean_data(df, {"handle_missing": True, "missing_strategy": "fill_mode"}),
+    "clean_data.remove_duplicates": lambda df: clean_data(df, {"remove_duplicates": True}),
+    "count_duplicates.key_columns": lambda df: count_duplicates(df, ["Date", "Category", "Product"]),
+    "clean_data.datetime": lambda df: clean_data(df, {"datetime_columns": ["Date Text"]}),
+    "filter_data": lambda df: filter_data(df, [
+        {"column": "Category", "operator": "equals", "value": "Category 3"},
+        {"column": "Value", "operator": "greater_than", "value": 50},
+        {"column": "Product", "operator": "contains", "value": "7"}
+    ]),
+    "get_categorical_distribution": lambda df: get_categorical_distribution(df, "Product", mode="exact"),
+    "get_categorical_distribution.approximate": lambda df: get_categorical_distribution(df, "Product", mode="approximate"),
+    "get_numeric_distribution": lambda df: get_numeric_distribution(df, "Value", bins=20),
+    "numeric_sketches.build": lambda df: update_numeric_sketches({}, df, set()),
+    "create_bar_chart": lambda df: create_bar_chart(df, "Category", "Value"),
+    "create_line_chart": lambda df: create_line_chart(df, "Date", ["Value"]),
+    "create_scatter_plot": lambda df: create_scatter_plot(df, "Value", "Discount"),
+    "create_histogram": lambda df: create_histogram(df, "Value"),
+    "create_pie_chart": lambda df: create_pie_chart(df, "Region", "Value"),
+    "create_heatmap": lambda df: create_heatmap(df, "Category", "Region", "Value"),
+    "create_box_plot": lambda df: create_box_plot(df, "Region", "Value"),
+    "create_correlation_heatmap": lambda df: create_correlation_heatmap(df),
+}
+
+def _check_excel_matches_pandas():
+    import openpyxl
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for row in [["A", "A", 5, None, "B"], [1, "x", 2.5, None, None], [2, None, None, None, "y"]]:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    # Duplicate headers must be renamed (A, A.1) and empty cells be NaN, not None
+    return read_excel(io.BytesIO(buffer.getvalue()), "xlsx").equals(pd.read_excel(io.BytesIO(buffer.getvalue())))
+
+# Regression checks: name -> callable returning True when the helper agrees with plain pandas
+CORRECTNESS_CHECKS = {
+    # Object columns hash 1 and '1' alike; they must still not count as duplicates
+    "find_duplicate_rows.mixed_types": lambda: (
+        find_duplicate_rows(pd.DataFrame({"k": [1, "1", 2, "2", 3, 1]})).tolist()
+        == pd.DataFrame({"k": [1, "1", 2, "2", 3, 1]}).duplicated().tolist()
+    ),
+    "clean_data.remove_duplicates.mixed_types": lambda: (
+        len(clean_data(pd.DataFrame({"k": [1, "1", 2, "2", 3]}), {"remove_duplicates": True})) == 5
+    ),
+    "read_excel.duplicate_headers": _check_excel_matches_pandas,
+    # Columns loaded with the "boolean" type override have no quantiles and are skipped
+    "calculate_basic_stats.boolean_columns": lambda: list(calculate_basic_stats(
+        pd.DataFrame({"f": pd.array([True, False, None], dtype="boolean"), "v": [1.0, 2.0, 3.0]}), ["f", "v"]
+    ).columns) == ["v"],
+    # Column labels need not be strings (e.g. numeric Excel headers)
+    "clean_data.datetime.non_string_columns": lambda: pd.api.types.is_datetime64_any_dtype(
+        clean_data(pd.DataFrame({0: ["2024-01-01", "2024-02-03"]}), {"datetime_columns": [0]})[0]
+    ),
+}
+
+# Differences below these floors are treated as noise when comparing to a baseline
+MIN_TIME_DIFF_SECONDS = 0.005
+MIN_MEMORY_DIFF_MB = 1.0
+
+def measure(func, df, repeat):
+    """
+    Time a benchmark and record its peak traced memory
+
+    Parameters:
+    - func: Benchmark callable
+    - df: Dataset
+    - repeat: Number of timed runs
+
+    Returns:
+    - Dictionary with min/median seconds and peak memory in MB
+    """
+    # Memory run first (also warms up imports and caches), timed runs without tracing
+    tracemalloc.start()
+    try:
+        func(df)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "min_s": round(min(timings), 6),
+        "median_s": round(statistics.median(timings), 6),
+        "peak_mb": round(peak / (1024 * 1024), 3)
+    }
+
+def check_correctness():
+    """
+    Run the correctness checks
+
+    Returns:
+    - List of names of failed checks
+    """
+    failed = []
+    print("Correctness checks:")
+    for name, check in CORRECTNESS_CHECKS.items():
+        try:
+            ok = bool(check())
+        except Exception as e:
+            ok = False
+            print(f"  {name:<48} ERROR {type(e).__name__}: {e}")
+        else:
+            print(f"  {name:<48} {'ok' if ok else 'FAILED'}")
+        if not ok:
+            failed.append(name)
+    return failed
+
+def run(sizes, shapes, repeat, pattern=None, seed=0):
+    """
+    Run every selected benchmark for each dataset size and shape
+
+    Returns:
+    - Dictionary of results keyed by "name[size/shape]"
+    """
+    selected = {
+        name: func for name, func in BENCHMARKS.items()
+        if pattern is None or re.search(pattern, name)
+    }
+    results = {}
+
+    for rows in sizes:
+        for shape in shapes:
+            df = make_dataset(rows, shape, seed)
+            print(f"\n{format_size(rows)} rows, {shape} ({df.shape[1]} columns, "
+                  f"{df.memory_usage(deep=True).sum() / (1024 * 1024):.1f} MB)")
+            for name, func in selected.items():
+                key = f"{name}[{format_size(rows)}/{shape}]"
+                try:
+                    result = measure(func, df, repeat)
+                except Exception as e:
+                    result = {"error": f"{type(e).__name__}: {e}"}
+                    print(f"  {name:<32} ERROR {result['error']}")
+                else:
+                    print(f"  {name:<32} {result['min_s'] * 1000:>10.1f} ms  {result['peak_mb']:>9.1f} MB peak")
+                results[key] = result
+            del df
+
+    return results
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline run
+
+    Parameters:
+    - results: Results from run()
+    - baseline: Results dictionary from a previous run
+    - tolerance: Allowed relative increase (0.2 = 20%)
+
+    Returns:
+    - List of regression descriptions
+    """
+    regressions = []
+    print(f"\nComparison with baseline (tolerance {tolerance:.0%}):")
+
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None or "error" in result or "error" in previous:
+            continue
+
+        time_ratio = result["min_s"] / previous["min_s"] if previous["min_s"] else 1.0
+        memory_ratio = result["peak_mb"] / previous["peak_mb"] if previous["peak_mb"] else 1.0
+        slower = (
+            time_ratio > 1 + tolerance
+            and result["min_s"] - previous["min_s"] > MIN_TIME_DIFF_SECONDS
+        )
+        larger = (
+            memory_ratio > 1 + tolerance
+            and result["peak_mb"] - previous["peak_mb"] > MIN_MEMORY_DIFF_MB
+        )
+
+        status = "REGRESSION" if slower or larger else "ok"
+        print(f"  {key:<48} time x{time_ratio:.2f}  memory x{memory_ratio:.2f}  {status}")
+        if slower:
+            regressions.append(f"{key}: {previous['min_s'] * 1000:.1f} ms -> {result['min_s'] * 1000:.1f} ms")
+        if larger:
+            regressions.append(f"{key}: {previous['peak_mb']:.1f} MB -> {result['peak_mb']:.1f} MB peak")
+
+    return regressions
+
+def environment_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark CorpChat data analysis and chart helpers")
+    parser.add_argument("--sizes", default="1k,100k,1m", help="Comma separated row counts, e.g. 1k,100k,1m,10m")
+    parser.add_argument("--shapes", default="narrow,wide", help="Comma separated dataset shapes (narrow, wide)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark")
+    parser.add_argument("--only", help="Regular expression selecting benchmark names")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic datasets")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--save-baseline", help="Write results as a baseline to this path")
+    parser.add_argument("--baseline", help="Compare against a baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before failing")
+    args = parser.parse_args(argv)
+
+    # The helpers report problems through st.error, which logs noise outside a running app
+    streamlit_logger.set_log_level("error")
+
+    failed_checks = check_correctness()
+
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+    shapes = [shape.strip() for shape in args.shapes.split(",") if shape.strip()]
+
+    report = {
+        "environment": environment_info(),
+        "settings": {"sizes": sizes, "shapes": shapes, "repeat": args.repeat, "seed": args.seed},
+        "results": run(sizes, shapes, args.repeat, args.only, args.seed)
+    }
+
+    for path in [args.output, args.save_baseline]:
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"\nResults written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report["results"], baseline.get("results", {}), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions")
+
+    if failed_checks:
+        print(f"\nFailed correctness checks: {', '.join(failed_checks)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,12 +4,22 @@ import numpy as np
 from utils.data_analysis import (
     calculate_basic_stats, 
     clean_data, 
+    count_duplicates,
     filter_data, 
     get_column_types,
     get_categorical_distribution,
-    get_numeric_distribution
+    get_numeric_distribution,
+    DISTRIBUTION_TOP_K,
+    SKETCH_STATS_MIN_ROWS
 )
+from utils.datetime_parsing import validate_datetime_format
+from utils.data_loader import get_dataset_key, get_dataset_sketches, get_query_source
+from utils.query_backend import QueryTable, MAX_RESULT_ROWS
+from utils.compute_service import ComputeTimeout
+from utils.transform_history import get_history, apply_transformation, undo, redo, get_history_memory_bytes
+from utils.profiler import profiled
 
+@profiled
 def render_analysis_section():
     """
     Render the data analysis section with various analysis options
@@ -20,29 +30,132 @@ def render_analysis_section():
     
     st.markdown('<h1 style="color: white; font-family: \'Space Grotesk\', sans-serif;">Data Analysis</h1>', unsafe_allow_html=True)
     
-    # Create tabs for different analysis features
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "Basic Statistics", 
-        "Data Cleaning", 
-        "Filtering", 
-        "Distribution Analysis"
-    ])
-    
-    # Tab 1: Basic Statistics
-    with tab1:
-        render_basic_statistics()
-    
-    # Tab 2: Data Cleaning
-    with tab2:
-        render_data_cleaning()
-    
-    # Tab 3: Filtering
-    with tab3:
-        render_data_filtering()
-    
-    # Tab 4: Distribution Analysis
-    with tab4:
-        render_distribution_analysis()
+    render_transformation_history()
+    
+    source = get_query_source(st.session_state.data)
+    if isinstance(source, QueryTable):
+        st.caption(
+            f"Statistics, filters and distributions run on all {len(source):,} rows in the local query engine; "
+            f"the first {len(st.session_state.data):,} rows are loaded for preview, cleaning and chat."
+        )
+    
+    # Only the selected panel is executed on each rerun (st.tabs would run all four)
+    panels = {
+        "Basic Statistics": render_basic_statistics,
+        "Data Cleaning": render_data_cleaning,
+        "Filtering": render_data_filtering,
+        "Distribution Analysis": render_distribution_analysis
+    }
+    active_panel = st.radio(
+        "Analysis panel",
+        options=list(panels),
+        horizontal=True,
+        key="analysis_panel",
+        label_visibility="collapsed"
+    )
+    
+    panels[active_panel]()
+
+def render_transformation_history():
+    """
+    Render undo/redo controls and the list of applied transformations
+    """
+    history = get_history()
+    steps = history["steps"]
+    position = history["position"]
+    
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        if st.button("Undo", key="history_undo", disabled=position == 0, use_container_width=True):
+            undo()
+            st.rerun()
+    with col2:
+        if st.button("Redo", key="history_redo", disabled=position == len(steps), use_container_width=True):
+            redo()
+            st.rerun()
+    with col3:
+        if position > 0:
+            st.caption(f"Step {position} of {len(steps)}: {steps[position - 1]['label']}")
+        elif steps:
+            st.caption(f"Original data ({len(steps)} step{'s' if len(steps) != 1 else ''} can be redone)")
+        else:
+            st.caption("Original data")
+    
+    with st.expander("Transformation history", expanded=False):
+        st.write(f"0. Original data ({len(history['base']):,} rows)")
+        for i, step in enumerate(steps, start=1):
+            marker = "" if i <= position else " (undone)"
+            st.write(f"{i}. {step['label']} ({step['rows']:,} rows){marker}")
+        st.caption(f"History storage: {get_history_memory_bytes(history) / (1024 * 1024):.1f} MB on top of the original data")
+        
+        # Random sampling is recorded as a step like cleaning and filtering
+        sample_rows = st.number_input(
+            "Rows to keep in a random sample",
+            min_value=1,
+            max_value=max(len(st.session_state.data), 1),
+            value=min(1000, max(len(st.session_state.data), 1)),
+            step=100,
+            key="history_sample_rows"
+        )
+        if st.button("Keep Random Sample", key="history_sample"):
+            apply_transformation(
+                "sample",
+                f"Random sample of {int(sample_rows):,} rows",
+                st.session_state.data.sample(n=int(sample_rows), random_state=42),
+                params={"rows": int(sample_rows)}
+            )
+            st.rerun()
+
+def describe_cleaning(options):
+    """
+    Short description of a set of cleaning options for the history
+    """
+    parts = []
+    if options.get("handle_missing"):
+        parts.append(f"missing values: {options.get('missing_strategy')}")
+    if options.get("remove_duplicates"):
+        parts.append("remove duplicates")
+    if options.get("datetime_columns"):
+        parts.append(f"datetime: {', '.join(map(str, options['datetime_columns']))}")
+    return "Clean: " + ("; ".join(parts) if parts else "no changes")
+
+def get_panel_result(panel, params, compute):
+    """
+    Get a panel's computed result, recomputing only when data or inputs change
+    
+    Parameters:
+    - panel: Panel name used as the cache slot
+    - params: Hashable panel inputs (e.g. selected columns)
+    - compute: Function that computes the result
+    
+    Returns:
+    - The cached or freshly computed result
+    """
+    if "panel_cache" not in st.session_state:
+        st.session_state.panel_cache = {}
+    
+    key = (get_dataset_key(st.session_state.data), params)
+    cached = st.session_state.panel_cache.get(panel)
+    if cached is None or cached["key"] != key:
+        cached = {"key": key, "result": compute()}
+        st.session_state.panel_cache[panel] = cached
+    return cached["result"]
+
+def get_stats_sketches():
+    """
+    Get the numeric sketches built while loading the current dataset, when
+    it is large enough for them to be used instead of scanning the data
+    """
+    data = st.session_state.data
+    if data is None or len(data) <= SKETCH_STATS_MIN_ROWS:
+        return None
+    return get_dataset_sketches(data)
+
+def get_current_column_types():
+    """
+    Get column types for the current dataset, computed once per dataset
+    """
+    return get_panel_result("column_types", None, lambda: get_column_types(st.session_state.data))
 
 def render_basic_statistics():
     """
@@ -51,7 +164,7 @@ def render_basic_statistics():
     st.markdown('<h3 style="color: white; font-family: \'Space Grotesk\', sans-serif;">Basic Statistics</h3>', unsafe_allow_html=True)
     
     # Get column types to suggest appropriate columns
-    column_types = get_column_types(st.session_state.data)
+    column_types = get_current_column_types()
     numeric_columns = [col for col, type_ in column_types.items() if type_ in ["integer", "float"]]
     
     # Let user select columns for analysis
@@ -66,8 +179,13 @@ def render_basic_statistics():
         st.info("Please select at least one column for analysis")
         return
     
-    # Calculate and display statistics
-    stats_df = calculate_basic_stats(st.session_state.data, selected_columns)
+    # Calculate and display statistics (cached until the data or selection changes)
+    sketches = get_stats_sketches()
+    stats_df = get_panel_result(
+        "basic_statistics",
+        tuple(selected_columns),
+        lambda: calculate_basic_stats(get_query_source(st.session_state.data), selected_columns, sketches=sketches)
+    )
     
     if stats_df is not None:
         # Check if we got a message instead of actual stats
@@ -75,6 +193,8 @@ def render_basic_statistics():
             st.warning(stats_df["Message"][0])
         else:
             st.write("Statistical summary:")
+            if sketches and any(col in sketches for col in stats_df.columns):
+                st.caption("Computed from sketches built while loading: median and quartiles are approximate.")
             st.dataframe(stats_df, use_container_width=True)
             
             # Store in session state for later use
@@ -111,10 +231,30 @@ def render_data_cleaning():
     
     # Remove duplicates
     remove_duplicates = st.checkbox("Remove duplicate rows", value=True)
+    duplicate_columns = []
+    
+    if remove_duplicates:
+        duplicate_columns = st.multiselect(
+            "Columns that identify a duplicate:",
+            options=st.session_state.data.columns.tolist(),
+            help="Rows with equal values in these columns count as duplicates. Leave empty to compare all columns."
+        )
+        
+        # Report duplicates before anything is removed (cached per dataset and key columns)
+        try:
+            duplicate_count = get_panel_result(
+                "duplicate_count",
+                tuple(duplicate_columns),
+                lambda: count_duplicates(st.session_state.data, duplicate_columns or None)
+            )
+            st.caption(f"{duplicate_count:,} duplicate rows found in the current data")
+        except ComputeTimeout as e:
+            st.warning(f"Could not count duplicates: {str(e)}")
     
     # Convert datetime columns
     datetime_conversion = st.checkbox("Convert columns to datetime format", value=False)
     datetime_columns = []
+    datetime_format = ""
     
     if datetime_conversion:
         datetime_columns = st.multiselect(
@@ -122,6 +262,14 @@ def render_data_cleaning():
             options=st.session_state.data.columns.tolist(),
             help="Select columns that contain date or time information"
         )
+        datetime_format = st.text_input(
+            "Datetime format (optional):",
+            placeholder="%Y-%m-%d",
+            help="strftime format shared by the selected columns (numeric columns such as 20240131 too). Leave empty to infer it from a sample of each column."
+        )
+        format_error = validate_datetime_format(datetime_format.strip()) if datetime_format.strip() else None
+        if format_error:
+            st.error(f"Invalid datetime format: {format_error}")
     
     # Clean data button
     if st.button("Clean Data"):
@@ -130,12 +278,19 @@ def render_data_cleaning():
             "handle_missing": handle_missing,
             "missing_strategy": missing_strategy,
             "remove_duplicates": remove_duplicates,
-            "datetime_columns": datetime_columns
+            "duplicate_columns": duplicate_columns or None,
+            "datetime_columns": datetime_columns,
+            "datetime_format": datetime_format.strip() or None
         }
         
         # Perform data cleaning
         with st.spinner("Cleaning data..."):
-            cleaned_data = clean_data(st.session_state.data, cleaning_options)
+            cleaning_report = {}
+            try:
+                cleaned_data = clean_data(st.session_state.data, cleaning_options, report=cleaning_report)
+            except ComputeTimeout as e:
+                st.error(f"Data cleaning took too long: {str(e)}")
+                cleaned_data = None
             
             if cleaned_data is not None:
                 # Compare original and cleaned data
@@ -155,20 +310,44 @@ def render_data_cleaning():
                         delta=cleaned_shape[0] - original_shape[0]
                     )
                 
+                # Report datetime conversions and the rows that failed to parse
+                for parse_report in cleaning_report.get("datetime", []):
+                    column = parse_report["column"]
+                    if parse_report.get("error"):
+                        st.warning(f"'{column}' was left unchanged: {parse_report['error']}")
+                    elif parse_report["failed"]:
+                        st.warning(
+                            f"'{column}': {parse_report['failed']:,} values could not be parsed "
+                            f"as {parse_report['format'] or 'dates'} and were set to missing"
+                        )
+                        st.dataframe(pd.DataFrame(parse_report["failed_rows"]), use_container_width=True)
+                    else:
+                        st.caption(f"'{column}' converted using format {parse_report['format'] or '(mixed)'}")
+                
                 # Display preview of cleaned data
                 st.subheader("Preview of Cleaned Data")
                 st.dataframe(cleaned_data.head(10), use_container_width=True)
                 
-                # Option to replace original data
-                if st.button("Replace Original Data with Cleaned Data"):
-                    st.session_state.data = cleaned_data
-                    st.success("Original data replaced with cleaned data")
-                    st.rerun()
-                
                 # Store cleaned data in session state
                 st.session_state.analysis_results["cleaned_data"] = cleaned_data
+                st.session_state.analysis_results["cleaned_data_source"] = get_dataset_key(st.session_state.data)
+                st.session_state.analysis_results["cleaned_data_options"] = cleaning_options
             else:
                 st.error("Error cleaning data")
+    
+    # Offer to replace the data with the last cleaning result. This sits outside
+    # the Clean Data handler: a button nested there disappears before it can be clicked.
+    results = st.session_state.analysis_results
+    if results.get("cleaned_data") is not None and results.get("cleaned_data_source") == get_dataset_key(st.session_state.data):
+        if st.button("Replace Original Data with Cleaned Data"):
+            apply_transformation(
+                "clean",
+                describe_cleaning(results["cleaned_data_options"]),
+                results.pop("cleaned_data"),
+                params=results.pop("cleaned_data_options")
+            )
+            st.success("Original data replaced with cleaned data")
+            st.rerun()
 
 def render_data_filtering():
     """
@@ -195,7 +374,7 @@ def render_data_filtering():
     
     with col2:
         # Determine appropriate operators based on column type
-        column_types = get_column_types(st.session_state.data)
+        column_types = get_current_column_types()
         column_type = column_types.get(filter_column, "text")
         
         if column_type in ["integer", "float"]:
@@ -306,11 +485,12 @@ def render_data_filtering():
         # Apply filters button
         if st.button("Apply Filters"):
             # Filter the data
-            filtered_data = filter_data(st.session_state.data, st.session_state.filters)
+            source = get_query_source(st.session_state.data)
+            filtered_data = filter_data(source, st.session_state.filters)
             
             # Show results
             if filtered_data is not None:
-                original_rows = len(st.session_state.data)
+                original_rows = len(source)
                 filtered_rows = len(filtered_data)
                 
                 st.success(f"Filters applied: {filtered_rows} rows match the criteria (out of {original_rows})")
@@ -321,16 +501,36 @@ def render_data_filtering():
                 
                 # Store filtered data in session state
                 st.session_state.analysis_results["filtered_data"] = filtered_data
-                
-                # Option to export filtered data
-                if st.button("Replace Original Data with Filtered Data"):
-                    st.session_state.data = filtered_data
-                    st.success("Original data replaced with filtered data")
-                    st.session_state.filters = []  # Clear filters
-                    st.rerun()
+                st.session_state.analysis_results["filtered_data_source"] = get_dataset_key(st.session_state.data)
+                st.session_state.analysis_results["filtered_data_filters"] = list(st.session_state.filters)
             else:
                 st.error("Error applying filters")
         
+        # Option to replace the data with the last filter result (outside the Apply Filters handler)
+        results = st.session_state.analysis_results
+        if results.get("filtered_data") is not None and results.get("filtered_data_source") == get_dataset_key(st.session_state.data):
+            filtered_data = results["filtered_data"]
+            if isinstance(filtered_data, QueryTable):
+                # A query result is not derived from the preview rows, so it becomes a new dataset
+                if len(filtered_data) > MAX_RESULT_ROWS:
+                    st.info(f"Narrow the filters to at most {MAX_RESULT_ROWS:,} rows to load the result into memory")
+                elif st.button("Load Filtered Data into Memory"):
+                    st.session_state.data = filtered_data.to_pandas()
+                    results.pop("filtered_data")
+                    st.session_state.filters = []
+                    st.rerun()
+            elif st.button("Replace Original Data with Filtered Data"):
+                filters = results.pop("filtered_data_filters")
+                apply_transformation(
+                    "filter",
+                    "Filter: " + ", ".join(f"{f['column']} {f['operator']} {f['value']}" for f in filters),
+                    results.pop("filtered_data"),
+                    params={"filters": filters}
+                )
+                st.success("Original data replaced with filtered data")
+                st.session_state.filters = []  # Clear filters
+                st.rerun()
+        
         # Clear all filters
         if st.button("Clear All Filters"):
             st.session_state.filters = []
@@ -345,7 +545,7 @@ def render_distribution_analysis():
     st.markdown('<h3 style="color: white; font-family: \'Space Grotesk\', sans-serif;">Distribution Analysis</h3>', unsafe_allow_html=True)
     
     # Get column types
-    column_types = get_column_types(st.session_state.data)
+    column_types = get_current_column_types()
     
     # Create two tabs for categorical and numerical distributions
     dist_tab1, dist_tab2 = st.tabs(["Categorical Distributions", "Numerical Distributions"])
@@ -366,13 +566,51 @@ def render_distribution_analysis():
                 key="cat_distribution_column"
             )
             
+            # Exact counts for every value, or a bounded-memory top-k for huge columns
+            cat_mode = st.radio(
+                "Counting method:",
+                options=["auto", "exact", "approximate"],
+                format_func=lambda mode: {
+                    "auto": "Auto (approximate for large datasets)",
+                    "exact": "Exact",
+                    "approximate": "Approximate top values"
+                }[mode],
+                horizontal=True,
+                key="cat_distribution_mode"
+            )
+            cat_top_k = DISTRIBUTION_TOP_K
+            if cat_mode != "exact":
+                cat_top_k = st.number_input(
+                    "Top values to show (approximate):",
+                    min_value=5,
+                    max_value=1000,
+                    value=DISTRIBUTION_TOP_K,
+                    step=5,
+                    key="cat_distribution_top_k"
+                )
+            
             # Get and display distribution
             if st.button("Calculate Distribution", key="calc_cat_dist"):
                 with st.spinner("Calculating distribution..."):
-                    distribution = get_categorical_distribution(st.session_state.data, cat_column)
+                    distribution = get_panel_result(
+                        "categorical_distribution",
+                        (cat_column, cat_mode, cat_top_k),
+                        lambda: get_categorical_distribution(
+                            get_query_source(st.session_state.data), cat_column, mode=cat_mode, top_k=cat_top_k
+                        )
+                    )
                     
                     if distribution is not None:
                         st.write(f"Distribution of values in '{cat_column}':")
+                        if distribution.attrs.get("approximate"):
+                            st.caption(
+                                f"Approximate: top {len(distribution)} values from a bounded-memory sketch. "
+                                f"True counts lie within Count ± Error. About "
+                                f"{distribution.attrs['distinct_values']:,} distinct values "
+                                f"(±{distribution.attrs['distinct_error']:.1%})."
+                            )
+                        else:
+                            st.caption(f"Exact: {distribution.attrs.get('distinct_values', len(distribution)):,} distinct values.")
                         st.dataframe(distribution, use_container_width=True)
                         
                         # Store in session state
@@ -409,10 +647,13 @@ def render_distribution_analysis():
             # Get and display distribution
             if st.button("Calculate Distribution", key="calc_num_dist"):
                 with st.spinner("Calculating distribution..."):
-                    bin_labels, counts = get_numeric_distribution(
-                        st.session_state.data, 
-                        num_column,
-                        bins=num_bins
+                    num_sketch = (get_stats_sketches() or {}).get(num_column)
+                    bin_labels, counts = get_panel_result(
+                        "numeric_distribution",
+                        (num_column, num_bins),
+                        lambda: get_numeric_distribution(
+                            get_query_source(st.session_state.data), num_column, bins=num_bins, sketch=num_sketch
+                        )
                     )
                     
                     if bin_labels is not None and counts is not None:
@@ -423,6 +664,8 @@ def render_distribution_analysis():
                         })
                         
                         st.write(f"Distribution of values in '{num_column}':")
+                        if num_sketch is not None:
+                            st.caption("Computed from the histogram sketch built while loading: counts near bin edges are approximate.")
                         st.dataframe(distribution_df, use_container_width=True)
                         
                         # Store in session state
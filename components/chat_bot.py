@@ -3,12 +3,80 @@ import pandas as pd
 import json
 import os
 import re
-from openai import OpenAI
+from utils.llm_client import stream_chat_completion
+from components.stream_renderer import StreamRenderer
+from utils.text_matching import classify_chart_request, classify_chart_mention, get_column_matcher
+from utils.semantic_index import get_semantic_index
+from utils.figure_store import add_visualization
+from utils.data_loader import get_query_source
 from utils.data_visualization import (
     create_bar_chart, create_line_chart, create_scatter_plot,
     create_histogram, create_pie_chart, create_heatmap,
-    create_box_plot, create_correlation_heatmap
+    create_box_plot, create_correlation_heatmap,
+    validate_chart_spec, create_chart_from_spec,
+    CHART_SPEC_TYPES, CHART_SPEC_AGGREGATIONS
 )
+from utils.profiler import profiled
+
+# Fenced ```chart block holding the assistant's JSON chart spec
+CHART_SPEC_PATTERN = re.compile(r"```(?:chart|json)\s*(\{.*?\})\s*```", re.DOTALL)
+
+# Datasets wider than this only send the columns relevant to each question
+WIDE_DATASET_COLUMNS = 25
+
+def build_question_context(df, question, max_columns=10):
+    """
+    Build a compact context message with the columns relevant to a question
+    
+    Parameters:
+    - df: Pandas DataFrame
+    - question: The user's question
+    - max_columns: Maximum number of columns to describe
+    
+    Returns:
+    - Context string for the model
+    """
+    matches = get_semantic_index(df).search(question, top_k=max_columns)
+    columns_info = {}
+    for match in matches:
+        col = match["column"]
+        series = df[col]
+        info = {"data_type": str(series.dtype)}
+        if pd.api.types.is_numeric_dtype(series):
+            info.update({"mean": series.mean(), "min": series.min(), "max": series.max()})
+        else:
+            info["top_values"] = series.value_counts().head(10).to_dict()
+        if match["values"]:
+            info["values_mentioned"] = match["values"]
+        columns_info[col] = info
+    
+    relevant = list(columns_info)
+    sample = df[relevant].head(5).to_dict(orient="records") if relevant else []
+    return (
+        "Columns most relevant to the next question "
+        f"(use exactly these names and values): {json.dumps(columns_info, default=str)}\n"
+        f"Sample rows for these columns: {json.dumps(sample, default=str)}"
+    )
+
+def extract_chart_spec(response):
+    """
+    Extract a JSON chart spec emitted by the assistant
+    
+    Parameters:
+    - response: The AI response text
+    
+    Returns:
+    - Tuple of (spec dictionary or None, response text with the spec block removed)
+    """
+    for match in CHART_SPEC_PATTERN.finditer(response):
+        try:
+            spec = json.loads(match.group(1))
+        except ValueError:
+            continue
+        if isinstance(spec, dict) and "type" in spec:
+            cleaned = (response[:match.start()] + response[match.end():]).strip()
+            return spec, cleaned
+    return None, response
 
 def detect_visualization_request(prompt):
     """
@@ -17,22 +85,10 @@ def detect_visualization_request(prompt):
     Returns:
     - (chart_type, params) tuple if visualization is requested, (None, None) otherwise
     """
-    # Common patterns for visualization requests
-    patterns = {
-        'bar chart': r'(?:create|show|generate|display).*(?:bar chart|bar graph|column chart)',
-        'line chart': r'(?:create|show|generate|display).*(?:line chart|line graph|trend)',
-        'scatter plot': r'(?:create|show|generate|display).*(?:scatter plot|scatter graph|scatterplot)',
-        'histogram': r'(?:create|show|generate|display).*(?:histogram|distribution)',
-        'pie chart': r'(?:create|show|generate|display).*(?:pie chart|pie graph)',
-        'heatmap': r'(?:create|show|generate|display).*(?:heatmap|heat map|correlation map)',
-        'box plot': r'(?:create|show|generate|display).*(?:box plot|boxplot|box and whisker)',
-        'correlation': r'(?:create|show|generate|display).*(?:correlation matrix|correlation heatmap)'
-    }
-    
-    # Check for matches
-    for chart_type, pattern in patterns.items():
-        if re.search(pattern, prompt, re.IGNORECASE):
-            return chart_type, None
+    # Single pass over the prompt with patterns compiled once at import time
+    chart_type = classify_chart_request(prompt)
+    if chart_type is not None:
+        return chart_type, None
     
     return None, None
 
@@ -52,22 +108,7 @@ def create_visualization_from_response(response, chart_type=None):
     # If chart type wasn't detected in the prompt, try to detect it in the response
     if chart_type is None:
         # Look for specific visualization keywords in the response
-        if re.search(r'bar chart|bar graph|column chart', response, re.IGNORECASE):
-            chart_type = 'bar chart'
-        elif re.search(r'line chart|line graph|trend line', response, re.IGNORECASE):
-            chart_type = 'line chart'
-        elif re.search(r'scatter plot|scatter graph|scatterplot', response, re.IGNORECASE):
-            chart_type = 'scatter plot'
-        elif re.search(r'histogram|distribution chart', response, re.IGNORECASE):
-            chart_type = 'histogram'
-        elif re.search(r'pie chart|pie graph', response, re.IGNORECASE):
-            chart_type = 'pie chart'
-        elif re.search(r'heatmap|heat map', response, re.IGNORECASE):
-            chart_type = 'heatmap'
-        elif re.search(r'box plot|boxplot', response, re.IGNORECASE):
-            chart_type = 'box plot'
-        elif re.search(r'correlation matrix|correlation heatmap', response, re.IGNORECASE):
-            chart_type = 'correlation'
+        chart_type = classify_chart_mention(response)
     
     if chart_type is None:
         return None
@@ -83,12 +124,9 @@ def create_visualization_from_response(response, chart_type=None):
     x_column = categorical_columns[0] if categorical_columns else numeric_columns[0]
     y_column = numeric_columns[0]
     
-    # Try to extract column names from the response using regex
-    # This is a simplified approach - in a production environment you'd want more robust parsing
-    columns_mentioned = []
-    for col in df.columns:
-        if re.search(r'\b' + re.escape(col) + r'\b', response, re.IGNORECASE):
-            columns_mentioned.append(col)
+    # Extract column names mentioned in the response with a single pass over the text
+    # (the matcher is built once per set of dataset columns)
+    columns_mentioned = get_column_matcher(df.columns).find(response)
     
     # Use mentioned columns if found
     if len(columns_mentioned) >= 2:
@@ -148,6 +186,7 @@ def create_visualization_from_response(response, chart_type=None):
     
     return None
 
+@profiled
 def render_chat_bot():
     """
     Render the chat bot interface for data analysis assistance
@@ -187,24 +226,37 @@ def render_chat_bot():
     if "system_message_added" not in st.session_state:
         # Create data summary for the bot's context
         df = st.session_state.data
-        data_info = {
-            "columns": list(df.columns),
-            "data_types": {col: str(df[col].dtype) for col in df.columns},
-            "sample_data": df.head(5).to_dict(orient="records"),
-            "shape": df.shape,
-            "summary_stats": {
-                col: {
-                    "mean": float(df[col].mean()) if pd.api.types.is_numeric_dtype(df[col]) else None,
-                    "min": float(df[col].min()) if pd.api.types.is_numeric_dtype(df[col]) else None,
-                    "max": float(df[col].max()) if pd.api.types.is_numeric_dtype(df[col]) else None,
+        if df.shape[1] > WIDE_DATASET_COLUMNS:
+            # Wide data: only list the schema here, details for relevant columns are sent per question
+            data_info = {
+                "columns": list(df.columns),
+                "data_types": {col: str(df[col].dtype) for col in df.columns},
+                "shape": df.shape
+            }
+            data_section = "Details for the columns relevant to each question are provided alongside the question.\n\n"
+        else:
+            data_info = {
+                "columns": list(df.columns),
+                "data_types": {col: str(df[col].dtype) for col in df.columns},
+                "sample_data": df.head(5).to_dict(orient="records"),
+                "shape": df.shape,
+                "summary_stats": {
+                    col: {
+                        "mean": float(df[col].mean()) if pd.api.types.is_numeric_dtype(df[col]) else None,
+                        "min": float(df[col].min()) if pd.api.types.is_numeric_dtype(df[col]) else None,
+                        "max": float(df[col].max()) if pd.api.types.is_numeric_dtype(df[col]) else None,
+                    }
+                    for col in df.columns
+                    if pd.api.types.is_numeric_dtype(df[col])
                 }
-                for col in df.columns
-                if pd.api.types.is_numeric_dtype(df[col])
             }
-        }
-        
-        # Convert DataFrame to CSV string for the full dataset
-        full_data_csv = df.to_csv(index=False)
+            
+            # Convert DataFrame to CSV string for the full dataset
+            full_data_csv = df.to_csv(index=False)
+            data_section = (
+                f"The complete dataset is provided below:\n"
+                f"```\n{full_data_csv}\n```\n\n"
+            )
         
         # Add system message (not shown to user)
         st.session_state.system_message = (
@@ -212,14 +264,19 @@ def render_chat_bot():
             "Maintain a business-focused, direct communication style appropriate for busy professionals. "
             f"The current dataset has {df.shape[0]} rows and {df.shape[1]} columns. "
             f"Dataset structure: {json.dumps(data_info, default=str)}\n\n"
-            f"The complete dataset is provided below:\n"
-            f"```\n{full_data_csv}\n```\n\n"
+            f"{data_section}"
             f"VISUALIZATION CAPABILITIES:\n"
             f"You can create visualizations for users when they request them. If a user asks for a chart or graph, "
-            f"clearly recommend a specific visualization type (bar chart, line chart, scatter plot, histogram, pie chart, "
-            f"heatmap, box plot, or correlation matrix) and mention which columns should be used. "
-            f"When recommending visualizations, always specify column names exactly as they appear in the dataset. "
-            f"The system will automatically generate the visualization based on your recommendation.\n\n"
+            f"end your answer with exactly one fenced code block tagged `chart` containing a JSON chart spec, for example:\n"
+            f"```chart\n"
+            f'{{"type": "bar", "x": "Region", "y": "Sales", "aggregation": "sum", "top_n": 10, '
+            f'"filters": [{{"column": "Category", "operator": "equals", "value": "Electronics"}}], "title": "Sales by Region"}}\n'
+            f"```\n"
+            f"Allowed types: {', '.join(CHART_SPEC_TYPES)}. Allowed aggregations: {', '.join(CHART_SPEC_AGGREGATIONS)}. "
+            f"Heatmaps also need a \"value\" column; correlation may list \"columns\". "
+            f"Filter operators: equals, not_equals, greater_than, less_than, contains, starts_with, ends_with, in_range. "
+            f"Always use column names exactly as they appear in the dataset. "
+            f"The system will generate the visualization from the spec and hide the code block from the user.\n\n"
             f"KEY INSTRUCTIONS:\n"
             f"1. Be extremely concise - executives value brevity\n"
             f"2. Prioritize key insights over exhaustive details\n"
@@ -228,7 +285,7 @@ def render_chat_bot():
             f"5. Recommend clear actions when appropriate\n"
             f"6. Include only relevant data points\n"
             f"7. Present insights with confidence and authority\n"
-            f"8. When users ask for visualizations, recommend specific chart types and columns\n"
+            f"8. When users ask for visualizations, include a chart spec as described above\n"
             f"When analyzing numerical data, round to 2 decimal places unless precision is critical."
         )
         # Reset messages when loading a new dataset or restarting
@@ -250,38 +307,72 @@ def render_chat_bot():
         # Display assistant response
         with st.chat_message("assistant"):
             message_placeholder = st.empty()
+            renderer = StreamRenderer(message_placeholder)
             full_response = ""
+            stream = None
+            
+            # Clicking stop triggers a rerun, which interrupts the loop below
+            st.button("Stop generating", key="stop_generating")
             
             try:
-                # Get response from OpenAI (with error handling)
-                client = OpenAI()
-                stream = client.chat.completions.create(
+                # Get response from OpenAI through the shared, pooled async client
+                chat_messages = [
+                    {"role": "system", "content": st.session_state.system_message},
+                    *[{"role": m["role"], "content": m["content"]} for m in st.session_state.messages]
+                ]
+                if st.session_state.data.shape[1] > WIDE_DATASET_COLUMNS:
+                    # Describe only the columns this question is about, just before it
+                    chat_messages.insert(-1, {
+                        "role": "system",
+                        "content": build_question_context(st.session_state.data, prompt)
+                    })
+                
+                stream = stream_chat_completion(
+                    chat_messages,
                     model="gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024. do not change this unless explicitly requested by the user
-                    messages=[
-                        {"role": "system", "content": st.session_state.system_message},
-                        *[{"role": m["role"], "content": m["content"]} for m in st.session_state.messages]
-                    ],
-                    stream=True,
                 )
                 
-                # Stream the response with white text
+                # Stream the response with white text, coalescing chunks into throttled frames
                 for chunk in stream:
-                    if chunk.choices[0].delta.content is not None:
-                        full_response += chunk.choices[0].delta.content
-                        message_placeholder.markdown(f'<div style="color: white;">{full_response}▌</div>', unsafe_allow_html=True)
+                    if chunk is None:
+                        # Idle poll - redraw occasionally so a stop click is noticed while waiting
+                        renderer.tick()
+                    else:
+                        renderer.append(chunk)
                 
-                message_placeholder.markdown(f'<div style="color: white;">{full_response}</div>', unsafe_allow_html=True)
+                full_response = renderer.finish()
                 
                 # Try to generate visualization based on:
-                # 1. Direct visualization request from user
-                # 2. Or visualization mentioned in the AI response
+                # 1. A structured chart spec emitted by the assistant
+                # 2. Direct visualization request from user
+                # 3. Or visualization mentioned in the AI response
+                spec, display_response = extract_chart_spec(full_response)
+                if spec is not None:
+                    # Hide the spec block from the displayed and stored answer
+                    full_response = display_response
+                    message_placeholder.markdown(f'<div style="color: white;">{full_response}</div>', unsafe_allow_html=True)
+                
                 fig = None
-                if vis_type:
-                    # Direct request - generate visualization based on user request
-                    fig = create_visualization_from_response(full_response, vis_type)
-                else:
-                    # Check if AI response mentions visualization
-                    fig = create_visualization_from_response(full_response)
+                if spec is not None:
+                    # Charts of a query-engine dataset are aggregated over the whole table
+                    chart_source = get_query_source(st.session_state.data)
+                    is_valid, spec_error = validate_chart_spec(spec, chart_source)
+                    if is_valid:
+                        try:
+                            fig = create_chart_from_spec(chart_source, spec)
+                        except Exception as e:
+                            # Only the chart is dropped; the streamed answer stays
+                            st.warning(f"Could not build the suggested chart: {str(e)}")
+                    else:
+                        st.warning(f"Could not use the suggested chart: {spec_error}")
+                
+                if fig is None:
+                    if vis_type:
+                        # Direct request - generate visualization based on user request
+                        fig = create_visualization_from_response(full_response, vis_type)
+                    else:
+                        # Check if AI response mentions visualization
+                        fig = create_visualization_from_response(full_response)
                 
                 # Display the visualization if one was created
                 if fig is not None:
@@ -294,20 +385,27 @@ def render_chat_bot():
                     if not title or title == "":
                         title = "Chat-generated visualization"
                     
-                    # Store in session state 
-                    st.session_state.visualizations.append({
-                        "type": "chat_generated",
-                        "title": title,
-                        "figure": fig
-                    })
+                    # Store in session state in compact form, keeping the spec it was built from
+                    evicted = add_visualization(fig, "chat_generated", title, spec=spec)
                     
                     # Let the user know the visualization was saved
                     st.info("This visualization has been saved to your Visualization tab.")
+                    if evicted:
+                        st.caption(f"{evicted} older visualization(s) were removed to stay within the storage limit.")
                 
             except Exception as e:
                 error_message = f"Error: {str(e)}"
                 message_placeholder.error(error_message)
                 full_response = error_message
+            finally:
+                # A rerun (stop button or any other interaction) interrupts the stream:
+                # cancel the request and keep whatever was received so far
+                if stream is not None and not stream.finished:
+                    stream.cancel()
+                    st.session_state.messages.append({
+                        "role": "assistant",
+                        "content": f"{renderer.text()}\n\n_(Response stopped)_"
+                    })
             
             # Add assistant response to chat history
             st.session_state.messages.append({"role": "assistant", "content": full_response})
@@ -2,7 +2,9 @@ import streamlit as st
 import pandas as pd
 from utils.data_loader import get_data_summary
 from utils.data_analysis import get_column_types
+from utils.profiler import profiled
 
+@profiled
 def render_data_preview():
     """
     Render the data preview section with data table and info
@@ -1,19 +1,13 @@
 import streamlit as st
 import pandas as pd
-import base64
-from utils.data_loader import load_file, get_data_summary
-
-# Function to convert image to base64 for embedding in CSS
-def get_base64_of_file(file_path):
-    """Convert file to base64 encoded string for embedding in HTML/CSS"""
-    try:
-        with open(file_path, "rb") as f:
-            data = f.read()
-        return base64.b64encode(data).decode()
-    except Exception as e:
-        st.error(f"Error loading file {file_path}: {e}")
-        return ""
+from utils.data_loader import attach_upload, get_data_summary, sniff_csv_schema, get_upload_format, CSV_TYPE_OVERRIDES, COMPRESSED_EXTENSIONS
+from utils.excel_reader import get_excel_layout
+from utils.columnar_reader import get_columnar_schema, COLUMNAR_EXTENSIONS
+from utils.ingestion import submit_load, get_load_job, discard_load_job, LoadCancelled
+from utils.assets import get_asset_url
+from utils.profiler import profiled
 
+@profiled
 def render_sidebar():
     """
     Render the sidebar with file upload and navigation controls
@@ -25,7 +19,7 @@ def render_sidebar():
         # Logo and branding with CorpChat Analytics and Synaptide AI - theme aware
         st.markdown(f"""
         <div style="display: flex; align-items: center; gap: 12px; margin-bottom: 20px;">
-            <img src="data:image/jpeg;base64,{get_base64_of_file("assets/synaptide_logo.jpeg")}" width="40" height="40" style="border-radius: 4px;">
+            <img src="{get_asset_url("static/synaptide_logo.jpeg")}" width="40" height="40" style="border-radius: 4px;">
             <div>
                 <h2 style="margin: 0; padding: 0; font-size: 1.4rem; font-weight: 600; color: {f'#ffffff' if theme == 'dark' else '#242424'}; font-family: 'Space Grotesk', sans-serif;">CorpChat</h2>
                 <p style="margin: 0; padding: 0; font-size: 0.8rem; color: {f'#e0e0e0' if theme == 'dark' else '#474747'}; letter-spacing: 0.05em; font-family: 'Space Grotesk', sans-serif;">POWERED BY SYNAPTIDE AI</p>
@@ -54,8 +48,8 @@ def render_sidebar():
         # File upload section
         uploaded_file = st.file_uploader(
             "Upload your dataset",
-            type=["csv", "xlsx", "xls"],
-            help="Upload your data file to start analysis (max 200MB)"
+            type=["csv", "xlsx", "xls"] + list(COLUMNAR_EXTENSIONS) + list(COMPRESSED_EXTENSIONS),
+            help="Upload your data file to start analysis (max 200MB): CSV, Excel, Parquet, Feather or Arrow IPC. CSV files may be compressed (.gz, .bz2, .xz, .zst or .zip)."
         )
         
         # Saved Files dropdown - modernized with delete option - theme aware
@@ -127,31 +121,36 @@ def render_sidebar():
                     step=100
                 )
         
-        # Load data button - includes automatic save dialog
+        # Columns and types (CSV), sheet and cell range (Excel) or columns and row filters
+        # (Parquet, Feather, Arrow), chosen before anything is parsed
+        excel_options = None
+        csv_options = None
+        columnar_options = None
+        if uploaded_file is not None:
+            upload_extension, upload_compression = get_upload_format(uploaded_file)
+            if upload_extension in ['xlsx', 'xls'] and upload_compression is None:
+                excel_options = render_excel_options(uploaded_file)
+            elif upload_extension == 'csv':
+                csv_options = render_csv_options(uploaded_file)
+            elif upload_extension in COLUMNAR_EXTENSIONS and upload_compression is None:
+                columnar_options = render_columnar_options(uploaded_file)
+        
+        # Load data button - the file is read by a background worker so the app stays responsive
         if uploaded_file is not None:
             if st.button("Load Data", key="load_uploaded_file"):
-                with st.spinner("Loading data..."):
-                    # Load the data
-                    df = load_file(uploaded_file, sample_size)
-                    
-                    if df is not None:
-                        # Store in session state
-                        st.session_state.data = df
-                        st.session_state.file_name = uploaded_file.name
-                        
-                        # Show success message with data summary
-                        summary = get_data_summary(df)
-                        if summary:
-                            st.success(f"Data loaded successfully: {summary['rows']} rows, {summary['columns']} columns")
-                        else:
-                            st.success(f"Data loaded successfully")
-                        
-                        # Set flag to show save dialog
-                        st.session_state.show_save_dialog = True
-                        
-                        # Automatically switch to data view
-                        st.session_state.current_tab = "Upload"
-                        st.rerun()
+                job = submit_load(
+                    uploaded_file,
+                    sample_size=sample_size,
+                    excel_options=excel_options,
+                    csv_options=csv_options,
+                    columnar_options=columnar_options
+                )
+                st.session_state.load_job_id = job.job_id
+                # The job id in the URL lets a refreshed page pick the result up
+                st.query_params["load_job"] = job.job_id
+                st.rerun()
+        
+        render_load_job()
         
         # Navigation tabs (only enabled when data is loaded) - theme aware
         st.markdown(f"<h4 style='margin-top:20px; color: {f'#ffffff' if theme == 'dark' else '#333333'}; font-family: \"Space Grotesk\", sans-serif;'>Menu</h4>", unsafe_allow_html=True)
@@ -234,6 +233,13 @@ def render_sidebar():
                 st.session_state.messages = []
             if "system_message_added" in st.session_state:
                 del st.session_state.system_message_added
+            # Stop a load still running in the background
+            if st.session_state.get("load_job_id"):
+                clear_load_job(st.session_state.load_job_id)
+            # Release the query-engine database and load-time sketches
+            st.session_state.pop("dataset_table", None)
+            st.session_state.pop("dataset_sketches", None)
+            st.session_state.pop("load_report", None)
             st.rerun()
         
         # Display current data source info
@@ -242,6 +248,15 @@ def render_sidebar():
             st.subheader("Current Data Source")
             st.info(f"File: {st.session_state.file_name}")
             
+            report = st.session_state.get("load_report")
+            if report and report["file_name"] == st.session_state.file_name:
+                throughput = f", {report['mb_per_s']:.1f} MB/s" if report["mb_per_s"] else ""
+                compressed = f" {report['compression']}-compressed" if report.get("compression") else ""
+                st.caption(
+                    f"Read with {report['engine']}: {report['bytes'] / (1024 * 1024):.1f} MB{compressed} "
+                    f"in {report['seconds']:.2f} s{throughput}"
+                )
+            
             # Get data summary
             summary = get_data_summary(st.session_state.data)
             
@@ -256,3 +271,222 @@ def render_sidebar():
             if st.button("Save to Library"):
                 st.session_state.show_save_dialog = True
                 st.rerun()
+
+def render_load_job():
+    """
+    Show the progress of the background load started from this page, and
+    attach its data to the session once it is done
+    """
+    job_id = st.session_state.get("load_job_id") or st.query_params.get("load_job")
+    job = get_load_job(job_id)
+    if job is None:
+        if job_id:
+            clear_load_job(job_id)
+        return
+    if not job.done:
+        render_load_progress(job.job_id)
+        return
+    
+    try:
+        df = attach_upload(job.result())
+    except LoadCancelled:
+        st.info(f"Loading {job.file_name} was cancelled")
+        return
+    except Exception as e:
+        st.error(f"Error loading file: {str(e)}")
+        return
+    finally:
+        clear_load_job(job.job_id)
+    
+    # Store in session state
+    st.session_state.data = df
+    st.session_state.file_name = job.file_name
+    
+    # Show success message with data summary
+    summary = get_data_summary(df)
+    if summary:
+        st.success(f"Data loaded successfully: {summary['rows']} rows, {summary['columns']} columns")
+    else:
+        st.success(f"Data loaded successfully")
+    
+    # Set flag to show save dialog
+    st.session_state.show_save_dialog = True
+    
+    # Automatically switch to data view
+    st.session_state.current_tab = "Upload"
+    st.rerun()
+
+def clear_load_job(job_id):
+    discard_load_job(job_id)
+    st.session_state.pop("load_job_id", None)
+    if st.query_params.get("load_job") == job_id:
+        del st.query_params["load_job"]
+
+@st.fragment(run_every=1.0)
+def render_load_progress(job_id):
+    """
+    Poll a background load once a second without rerunning the rest of the page
+    """
+    job = get_load_job(job_id)
+    if job is None or job.done:
+        # Rerun the whole page so render_load_job attaches the result
+        st.rerun()
+    
+    progress = job.progress()
+    text = f"Loading {job.file_name}: {progress['bytes_read'] / (1024 * 1024):.1f} of {progress['total_bytes'] / (1024 * 1024):.1f} MB"
+    if progress["rows_parsed"]:
+        text += f", {progress['rows_parsed']:,} rows"
+    if progress["eta"] is not None:
+        text += f", about {progress['eta']:.0f} s left"
+    st.progress(progress["fraction"], text=text)
+    
+    if st.button("Cancel", key="cancel_load"):
+        job.cancel()
+
+def get_cached_excel_layout(uploaded_file):
+    """
+    Get the sheets and header rows of an uploaded workbook, read once per upload
+    """
+    file_id = getattr(uploaded_file, "file_id", uploaded_file.name)
+    cached = st.session_state.get("excel_layout")
+    if cached is None or cached["file_id"] != file_id:
+        layout = get_excel_layout(uploaded_file, uploaded_file.name.split('.')[-1].lower())
+        cached = {"file_id": file_id, "layout": layout}
+        st.session_state.excel_layout = cached
+    return cached["layout"]
+
+def render_excel_options(uploaded_file):
+    """
+    Render sheet, column and row range selection for an Excel upload
+    
+    Returns:
+    - Dictionary of options for load_file, or None if the workbook cannot be read
+    """
+    try:
+        layout = get_cached_excel_layout(uploaded_file)
+    except Exception as e:
+        st.error(f"Could not read workbook: {str(e)}")
+        return None
+    if not layout:
+        return None
+    
+    sheet_name = st.selectbox("Sheet:", options=list(layout), key="excel_sheet")
+    columns = st.multiselect(
+        "Columns to load (all if empty):",
+        options=layout[sheet_name],
+        key=f"excel_columns_{sheet_name}"
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        skip_rows = st.number_input("Skip rows", min_value=0, value=0, step=100, key="excel_skip_rows")
+    with col2:
+        max_rows = st.number_input("Max rows (0 = all)", min_value=0, value=0, step=1000, key="excel_max_rows")
+    
+    return {
+        "sheet_name": sheet_name,
+        "columns": columns or None,
+        "skip_rows": int(skip_rows),
+        "max_rows": int(max_rows) or None
+    }
+
+def render_csv_options(uploaded_file):
+    """
+    Render column selection and type overrides for a CSV upload
+    
+    The header and first rows are read once per upload; the choices are
+    passed to the parser as usecols/dtype so unselected columns are never
+    materialized.
+    
+    Returns:
+    - Dictionary of options for load_file, or None if the file cannot be read
+    """
+    file_id = getattr(uploaded_file, "file_id", uploaded_file.name)
+    cached = st.session_state.get("csv_schema")
+    if cached is None or cached["file_id"] != file_id:
+        try:
+            cached = {"file_id": file_id, "schema": sniff_csv_schema(uploaded_file)}
+        except Exception as e:
+            st.error(f"Could not read file header: {str(e)}")
+            return None
+        st.session_state.csv_schema = cached
+    schema = cached["schema"]
+    
+    columns = st.multiselect(
+        "Columns to load (all if empty):",
+        options=list(schema),
+        key=f"csv_columns_{file_id}"
+    )
+    
+    with st.expander("Column types", expanded=False):
+        shown = columns or list(schema)
+        edited = st.data_editor(
+            pd.DataFrame({
+                "Column": shown,
+                "Detected": [schema[col] for col in shown],
+                "Load as": ["auto"] * len(shown)
+            }),
+            column_config={
+                "Load as": st.column_config.SelectboxColumn(
+                    "Load as",
+                    options=["auto"] + list(CSV_TYPE_OVERRIDES),
+                    required=True
+                )
+            },
+            disabled=["Column", "Detected"],
+            hide_index=True,
+            use_container_width=True,
+            key=f"csv_types_{file_id}_{len(shown)}"
+        )
+    
+    dtypes = {
+        row["Column"]: row["Load as"]
+        for _, row in edited.iterrows()
+        if row["Load as"] != "auto"
+    }
+    return {"columns": columns or None, "dtypes": dtypes or None}
+
+def render_columnar_options(uploaded_file):
+    """
+    Render column selection and row filter pushdown for a Parquet, Feather or Arrow upload
+    
+    The schema comes from the file footer, read once per upload. The
+    filters defined in the Analysis tab's Filtering section can be applied
+    while reading, so Parquet row groups that cannot match are skipped.
+    
+    Returns:
+    - Dictionary of options for load_file, or None if the file cannot be read
+    """
+    file_id = getattr(uploaded_file, "file_id", uploaded_file.name)
+    cached = st.session_state.get("columnar_schema")
+    if cached is None or cached["file_id"] != file_id:
+        try:
+            schema = get_columnar_schema(uploaded_file, get_upload_format(uploaded_file)[0])
+        except Exception as e:
+            st.error(f"Could not read file schema: {str(e)}")
+            return None
+        cached = {"file_id": file_id, "schema": schema}
+        st.session_state.columnar_schema = cached
+    schema = cached["schema"]
+    
+    if schema["rows"] is not None:
+        row_groups = f" in {schema['row_groups']:,} row groups" if schema["row_groups"] else ""
+        st.caption(f"{schema['rows']:,} rows{row_groups}, {len(schema['columns'])} columns")
+    
+    columns = st.multiselect(
+        "Columns to load (all if empty):",
+        options=list(schema["columns"]),
+        key=f"columnar_columns_{file_id}"
+    )
+    
+    # Filters from the Filtering section whose columns exist in this file
+    filters = [f for f in st.session_state.get("filters", []) if f.get("column") in schema["columns"]]
+    use_filters = False
+    if filters:
+        use_filters = st.checkbox(
+            f"Load only rows matching the {len(filters)} active filter(s)",
+            value=False,
+            key=f"columnar_filters_{file_id}",
+            help=", ".join(f"{f['column']} {f['operator']} {f['value']}" for f in filters)
+        )
+    
+    return {"columns": columns or None, "filters": filters if use_filters else None}
@@ -0,0 +1,80 @@
+import time
+
+class StreamRenderer:
+    """
+    Coalesce streamed text chunks into throttled placeholder updates
+
+    Chunks are kept in a list buffer and only joined when a frame is drawn.
+    A frame is drawn when either the frame interval has elapsed or enough
+    new bytes have accumulated, so long answers send a bounded number of
+    messages to the front end instead of one per token.
+    """
+
+    def __init__(self, placeholder, fps=10, max_pending_bytes=2048, idle_interval=1.0):
+        """
+        Parameters:
+        - placeholder: Streamlit placeholder (st.empty()) to render into
+        - fps: Maximum number of frames drawn per second
+        - max_pending_bytes: Draw early once this many new bytes are buffered
+        - idle_interval: Seconds between keep-alive redraws while no text arrives
+        """
+        self.placeholder = placeholder
+        self.frame_interval = 1.0 / fps
+        self.max_pending_bytes = max_pending_bytes
+        self.idle_interval = idle_interval
+        self._rendered = ""
+        self._pending = []
+        self._pending_bytes = 0
+        self._last_render = 0.0
+
+    def append(self, chunk):
+        """
+        Add a chunk of text and draw a frame if one is due
+        """
+        self._pending.append(chunk)
+        self._pending_bytes += len(chunk)
+        now = time.monotonic()
+        if self._pending_bytes >= self.max_pending_bytes or now - self._last_render >= self.frame_interval:
+            self._render(cursor=True, now=now)
+
+    def tick(self):
+        """
+        Draw pending text, or redraw after idle_interval while nothing arrives
+
+        Redrawing during long waits keeps the script responsive to reruns
+        (e.g. a stop button click) when the model is slow to respond.
+        """
+        now = time.monotonic()
+        if self._pending and now - self._last_render >= self.frame_interval:
+            self._render(cursor=True, now=now)
+        elif now - self._last_render >= self.idle_interval:
+            self._render(cursor=True, now=now)
+
+    def text(self):
+        """
+        Get the full text received so far
+        """
+        if self._pending:
+            return self._rendered + "".join(self._pending)
+        return self._rendered
+
+    def finish(self):
+        """
+        Draw the final frame without the cursor
+
+        Returns:
+        - The complete response text
+        """
+        self._render(cursor=False, now=time.monotonic())
+        return self._rendered
+
+    def _render(self, cursor, now):
+        if self._pending:
+            self._rendered += "".join(self._pending)
+            self._pending = []
+            self._pending_bytes = 0
+        self.placeholder.markdown(
+            f'<div style="color: white;">{self._rendered}{"▌" if cursor else ""}</div>',
+            unsafe_allow_html=True
+        )
+        self._last_render = now
@@ -9,10 +9,19 @@ from utils.data_visualization import (
     create_pie_chart,
     create_heatmap,
     create_box_plot,
-    create_correlation_heatmap
+    create_correlation_heatmap,
+    validate_chart_spec,
+    aggregate_chart_data,
+    MAX_SCATTER_POINTS
 )
 from utils.data_analysis import get_column_types
+from utils.data_loader import get_query_source
+from utils.query_backend import QueryTable
+from utils.compute_service import ComputeTimeout
+from utils.figure_store import add_visualization, get_figure, remove_visualization, get_visualization_storage_bytes
+from utils.profiler import profiled
 
+@profiled
 def render_visualization_section():
     """
     Render the data visualization section with various chart options
@@ -23,6 +32,13 @@ def render_visualization_section():
     
     st.markdown('<h1 style="color: white; font-family: \'Space Grotesk\', sans-serif;">Data Visualization</h1>', unsafe_allow_html=True)
     
+    source = get_query_source(st.session_state.data)
+    if isinstance(source, QueryTable):
+        st.caption(
+            f"Charts are aggregated over all {len(source):,} rows in the local query engine; "
+            f"scatter plots, box plots and colored histograms use a random sample of the rows."
+        )
+    
     # Get column types for better column selection suggestions
     column_types = get_column_types(st.session_state.data)
     
@@ -68,17 +84,46 @@ def render_visualization_section():
     if st.session_state.visualizations:
         st.markdown('<h3 style="color: white; font-family: \'Space Grotesk\', sans-serif;">Your Visualizations</h3>', unsafe_allow_html=True)
         
+        st.caption(
+            f"{len(st.session_state.visualizations)} saved, "
+            f"{get_visualization_storage_bytes() / (1024 * 1024):.1f} MB stored"
+        )
+        
         for i, viz in enumerate(st.session_state.visualizations):
-            with st.expander(f"Visualization {i+1}: {viz['title']}", expanded=i == 0):
-                st.plotly_chart(viz['figure'], use_container_width=True, key=f"viz_{i}")
+            # Only charts that are switched on are decoded and sent to the browser
+            show = st.toggle(f"Visualization {i+1}: {viz['title']}", value=i == 0, key=f"show_viz_{viz['id']}")
+            if show:
+                st.plotly_chart(get_figure(viz), use_container_width=True, key=f"viz_{viz['id']}")
                 
                 # Button to remove visualization
-                if st.button(f"Remove this visualization", key=f"remove_viz_{i}"):
-                    st.session_state.visualizations.pop(i)
+                if st.button(f"Remove this visualization", key=f"remove_viz_{viz['id']}"):
+                    remove_visualization(viz['id'])
                     st.rerun()
     else:
         st.info("No visualizations created yet. Configure a visualization and click 'Create Visualization' to add one.")
 
+def get_chart_source():
+    """
+    Get what charts should be built from
+    
+    Returns:
+    - The QueryTable behind a query-engine dataset, or the loaded DataFrame
+    """
+    return get_query_source(st.session_state.data)
+
+def aggregate_in_query_engine(table, spec):
+    """
+    Aggregate a QueryTable for a chart spec, reporting an invalid selection
+    
+    Returns:
+    - Result-sized DataFrame, or None if the selection cannot be charted
+    """
+    is_valid, error = validate_chart_spec(spec, table)
+    if not is_valid:
+        st.error(f"Could not create chart: {error}")
+        return None
+    return aggregate_chart_data(table, spec)
+
 def render_bar_chart_config(column_types):
     """
     Render configuration options for a bar chart
@@ -136,9 +181,19 @@ def render_bar_chart_config(column_types):
     # Create visualization button
     if st.button("Create Bar Chart"):
         with st.spinner("Creating visualization..."):
+            data = st.session_state.data
+            source = get_chart_source()
+            if isinstance(source, QueryTable):
+                # Stacked bars add up, so summing per bar in the engine draws the same chart
+                data = aggregate_in_query_engine(
+                    source, {'type': 'bar', 'x': x_column, 'y': y_column, 'color': color_column, 'aggregation': 'sum'}
+                )
+                if data is None:
+                    return
+            
             # Create bar chart
             fig = create_bar_chart(
-                st.session_state.data,
+                data,
                 x_column,
                 y_column,
                 color=color_column,
@@ -148,11 +203,7 @@ def render_bar_chart_config(column_types):
             
             if fig is not None:
                 # Store visualization in session state
-                st.session_state.visualizations.append({
-                    "type": "bar",
-                    "title": chart_title,
-                    "figure": fig
-                })
+                add_visualization(fig, "bar", chart_title)
                 
                 st.success("Bar chart created successfully!")
                 st.rerun()
@@ -204,9 +255,23 @@ def render_line_chart_config(column_types):
             return
         
         with st.spinner("Creating visualization..."):
+            data = st.session_state.data
+            source = get_chart_source()
+            if isinstance(source, QueryTable):
+                # One point per X value: each line is averaged in the engine
+                data = None
+                for y_column in y_columns:
+                    line = aggregate_in_query_engine(
+                        source, {'type': 'line', 'x': x_column, 'y': y_column, 'aggregation': 'mean'}
+                    )
+                    if line is None:
+                        return
+                    data = line if data is None else data.merge(line, on=x_column, how='outer')
+                data = data.sort_values(x_column)
+            
             # Create line chart
             fig = create_line_chart(
-                st.session_state.data,
+                data,
                 x_column,
                 y_columns,
                 title=chart_title
@@ -214,11 +279,7 @@ def render_line_chart_config(column_types):
             
             if fig is not None:
                 # Store visualization in session state
-                st.session_state.visualizations.append({
-                    "type": "line",
-                    "title": chart_title,
-                    "figure": fig
-                })
+                add_visualization(fig, "line", chart_title)
                 
                 st.success("Line chart created successfully!")
                 st.rerun()
@@ -283,9 +344,15 @@ def render_scatter_plot_config(column_types):
     # Create visualization button
     if st.button("Create Scatter Plot"):
         with st.spinner("Creating visualization..."):
+            data = st.session_state.data
+            source = get_chart_source()
+            if isinstance(source, QueryTable):
+                needed = list(dict.fromkeys(col for col in [x_column, y_column, color_column, size_column] if col))
+                data = source.to_pandas(columns=needed, sample=MAX_SCATTER_POINTS)
+            
             # Create scatter plot
             fig = create_scatter_plot(
-                st.session_state.data,
+                data,
                 x_column,
                 y_column,
                 color=color_column,
@@ -295,11 +362,7 @@ def render_scatter_plot_config(column_types):
             
             if fig is not None:
                 # Store visualization in session state
-                st.session_state.visualizations.append({
-                    "type": "scatter",
-                    "title": chart_title,
-                    "figure": fig
-                })
+                add_visualization(fig, "scatter", chart_title)
                 
                 st.success("Scatter plot created successfully!")
                 st.rerun()
@@ -362,22 +425,30 @@ def render_histogram_config(column_types):
     # Create visualization button
     if st.button("Create Histogram"):
         with st.spinner("Creating visualization..."):
-            # Create histogram
-            fig = create_histogram(
-                st.session_state.data,
-                column,
-                bins=bins,
-                title=chart_title,
-                color=color_column
-            )
+            source = get_chart_source()
+            if isinstance(source, QueryTable) and color_column is None:
+                # Bins are counted in the engine and drawn as a bar chart of counts
+                data = aggregate_in_query_engine(source, {'type': 'histogram', 'x': column, 'bins': bins})
+                if data is None:
+                    return
+                fig = create_bar_chart(data, column, 'Count', title=chart_title)
+            else:
+                data = st.session_state.data
+                if isinstance(source, QueryTable):
+                    data = source.to_pandas(columns=[column, color_column], sample=MAX_SCATTER_POINTS * 10)
+                
+                # Create histogram
+                fig = create_histogram(
+                    data,
+                    column,
+                    bins=bins,
+                    title=chart_title,
+                    color=color_column
+                )
             
             if fig is not None:
                 # Store visualization in session state
-                st.session_state.visualizations.append({
-                    "type": "histogram",
-                    "title": chart_title,
-                    "figure": fig
-                })
+                add_visualization(fig, "histogram", chart_title)
                 
                 st.success("Histogram created successfully!")
                 st.rerun()
@@ -424,9 +495,18 @@ def render_pie_chart_config(column_types):
     # Create visualization button
     if st.button("Create Pie Chart"):
         with st.spinner("Creating visualization..."):
+            data = st.session_state.data
+            source = get_chart_source()
+            if isinstance(source, QueryTable):
+                data = aggregate_in_query_engine(
+                    source, {'type': 'pie', 'x': names_column, 'y': values_column, 'aggregation': 'sum'}
+                )
+                if data is None:
+                    return
+            
             # Create pie chart
             fig = create_pie_chart(
-                st.session_state.data,
+                data,
                 names_column,
                 values_column,
                 title=chart_title
@@ -434,11 +514,7 @@ def render_pie_chart_config(column_types):
             
             if fig is not None:
                 # Store visualization in session state
-                st.session_state.visualizations.append({
-                    "type": "pie",
-                    "title": chart_title,
-                    "figure": fig
-                })
+                add_visualization(fig, "pie", chart_title)
                 
                 st.success("Pie chart created successfully!")
                 st.rerun()
@@ -497,9 +573,19 @@ def render_heatmap_config(column_types):
             return
         
         with st.spinner("Creating visualization..."):
+            data = st.session_state.data
+            source = get_chart_source()
+            if isinstance(source, QueryTable):
+                # The heatmap shows cell means, which the engine computes directly
+                data = aggregate_in_query_engine(
+                    source, {'type': 'heatmap', 'x': x_column, 'y': y_column, 'value': value_column, 'aggregation': 'mean'}
+                )
+                if data is None:
+                    return
+            
             # Create heatmap
             fig = create_heatmap(
-                st.session_state.data,
+                data,
                 x_column,
                 y_column,
                 value_column,
@@ -508,11 +594,7 @@ def render_heatmap_config(column_types):
             
             if fig is not None:
                 # Store visualization in session state
-                st.session_state.visualizations.append({
-                    "type": "heatmap",
-                    "title": chart_title,
-                    "figure": fig
-                })
+                add_visualization(fig, "heatmap", chart_title)
                 
                 st.success("Heatmap created successfully!")
                 st.rerun()
@@ -569,9 +651,19 @@ def render_box_plot_config(column_types):
     # Create visualization button
     if st.button("Create Box Plot"):
         with st.spinner("Creating visualization..."):
+            data = st.session_state.data
+            source = get_chart_source()
+            if isinstance(source, QueryTable):
+                # Quartiles need raw values: the engine returns a sample of the rows
+                data = aggregate_in_query_engine(
+                    source, {'type': 'box', 'x': x_column, 'y': y_column, 'color': color_column}
+                )
+                if data is None:
+                    return
+            
             # Create box plot
             fig = create_box_plot(
-                st.session_state.data,
+                data,
                 x_column,
                 y_column,
                 color=color_column,
@@ -580,11 +672,7 @@ def render_box_plot_config(column_types):
             
             if fig is not None:
                 # Store visualization in session state
-                st.session_state.visualizations.append({
-                    "type": "box",
-                    "title": chart_title,
-                    "figure": fig
-                })
+                add_visualization(fig, "box", chart_title)
                 
                 st.success("Box plot created successfully!")
                 st.rerun()
@@ -630,19 +718,19 @@ def render_correlation_matrix_config(column_types):
         
         with st.spinner("Creating visualization..."):
             # Create correlation matrix
-            fig = create_correlation_heatmap(
-                st.session_state.data,
-                columns=selected_columns,
-                title=chart_title
-            )
+            try:
+                fig = create_correlation_heatmap(
+                    get_chart_source(),
+                    columns=selected_columns,
+                    title=chart_title
+                )
+            except ComputeTimeout as e:
+                st.error(f"Correlation matrix took too long: {str(e)}")
+                return
             
             if fig is not None:
                 # Store visualization in session state
-                st.session_state.visualizations.append({
-                    "type": "correlation",
-                    "title": chart_title,
-                    "figure": fig
-                })
+                add_visualization(fig, "correlation", chart_title)
                 
                 st.success("Correlation matrix created successfully!")
                 st.rerun()
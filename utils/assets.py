@@ -0,0 +1,116 @@
+import os
+import base64
+import threading
+import streamlit as st
+
+# Directory Streamlit serves at app/static/ when server.enableStaticServing is on
+STATIC_DIR = "static"
+
+# File types Streamlit serves with their real content type from the static directory
+STATIC_SAFE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+MIME_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".svg": "image/svg+xml",
+}
+
+# Assets used on every page, encoded once at startup
+APP_ASSETS = [
+    "static/synaptide_logo.jpeg",
+    "assets/corpchat_background.svg",
+    "assets/light_background.svg",
+    "assets/example_images/data_analysis.svg",
+    "assets/example_images/data_visualization.svg",
+]
+
+# Process-wide registry shared by every session: path -> encoded value
+_base64_cache = {}
+_text_cache = {}
+_cache_lock = threading.Lock()
+
+def get_base64_of_file(file_path):
+    """
+    Get a file as a base64 encoded string, encoding it only once per process
+
+    Parameters:
+    - file_path: Path to the file
+
+    Returns:
+    - Base64 string, or an empty string if the file cannot be read
+    """
+    file_path = os.path.normpath(file_path)
+    encoded = _base64_cache.get(file_path)
+    if encoded is not None:
+        return encoded
+
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    except Exception as e:
+        st.error(f"Error loading file {file_path}: {e}")
+        return ""
+
+    encoded = base64.b64encode(data).decode()
+    with _cache_lock:
+        _base64_cache[file_path] = encoded
+    return encoded
+
+def read_text_asset(file_path):
+    """
+    Read a text file (e.g. CSS) once per process
+
+    Parameters:
+    - file_path: Path to the file
+
+    Returns:
+    - File contents
+    """
+    text = _text_cache.get(file_path)
+    if text is None:
+        with open(file_path, "r") as f:
+            text = f.read()
+        with _cache_lock:
+            _text_cache[file_path] = text
+    return text
+
+def get_asset_url(file_path):
+    """
+    Get a URL for an image asset to use in HTML or CSS
+
+    Files in the static directory are referenced by URL when Streamlit's
+    static file serving is enabled, so the browser fetches and caches them
+    once. Everything else is inlined as a data URI built from the cached
+    base64 encoding.
+
+    Parameters:
+    - file_path: Path to the asset
+
+    Returns:
+    - URL string
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    directory, file_name = os.path.split(os.path.normpath(file_path))
+    if (
+        directory == STATIC_DIR
+        and extension in STATIC_SAFE_EXTENSIONS
+        and st.get_option("server.enableStaticServing")
+    ):
+        return f"app/static/{file_name}"
+
+    mime_type = MIME_TYPES.get(extension, "application/octet-stream")
+    return f"data:{mime_type};base64,{get_base64_of_file(file_path)}"
+
+def preload_assets(paths=None):
+    """
+    Encode the app's assets into the process-wide registry
+
+    Parameters:
+    - paths: Asset paths to preload (defaults to APP_ASSETS)
+    """
+    for path in paths or APP_ASSETS:
+        if os.path.exists(path) and os.path.normpath(path) not in _base64_cache:
+            get_base64_of_file(path)
@@ -0,0 +1,190 @@
+import os
+import shutil
+import datetime
+import tempfile
+import weakref
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # Columnar uploads are then rejected with a clear message
+    pa = None
+
+# Columnar upload suffix -> format ("arrow" covers Feather and Arrow IPC files)
+COLUMNAR_EXTENSIONS = {"parquet": "parquet", "pq": "parquet", "feather": "arrow", "arrow": "arrow", "ipc": "arrow"}
+
+def open_columnar_source(uploaded_file):
+    """
+    Open an upload for zero-copy reading by PyArrow
+
+    Uploads held in memory (Streamlit's UploadedFile is a BytesIO) are
+    wrapped without copying. Anything else is spooled once to a temporary
+    file that is memory-mapped, so column chunks are paged in only when a
+    projection or row group actually needs them.
+
+    Parameters:
+    - uploaded_file: The uploaded file object
+
+    Returns:
+    - PyArrow readable file
+    """
+    if pa is None:
+        raise ValueError("Reading Parquet, Feather and Arrow files requires pyarrow")
+
+    uploaded_file.seek(0)
+    if hasattr(uploaded_file, "getbuffer"):
+        return pa.BufferReader(pa.py_buffer(uploaded_file.getbuffer()))
+
+    handle, path = tempfile.mkstemp(prefix="corpchat_columnar_")
+    try:
+        with os.fdopen(handle, "wb") as f:
+            shutil.copyfileobj(uploaded_file, f, length=8 * 1024 * 1024)
+        source = pa.memory_map(path)
+    except Exception:
+        os.remove(path)
+        raise
+    finally:
+        uploaded_file.seek(0)
+    weakref.finalize(source, os.remove, path)
+    return source
+
+def get_columnar_schema(uploaded_file, file_extension):
+    """
+    Read the schema of a columnar upload from its footer, without any data
+
+    Parameters:
+    - uploaded_file: The uploaded file object
+    - file_extension: One of COLUMNAR_EXTENSIONS
+
+    Returns:
+    - Dictionary with 'columns' (column name -> Arrow type name), 'rows'
+      and 'row_groups' (None for formats without row groups)
+    """
+    source = open_columnar_source(uploaded_file)
+    if COLUMNAR_EXTENSIONS[file_extension] == "parquet":
+        parquet_file = pq.ParquetFile(source)
+        schema = parquet_file.schema_arrow
+        rows, row_groups = parquet_file.metadata.num_rows, parquet_file.metadata.num_row_groups
+    else:
+        # The IPC footer has no row count; counting would decompress every batch
+        schema, rows, row_groups = _read_arrow_schema(source), None, None
+
+    # Columns pandas stored its index in are restored as the index, not listed
+    index_columns = set()
+    if schema.pandas_metadata:
+        index_columns = {col for col in schema.pandas_metadata.get("index_columns", []) if isinstance(col, str)}
+    return {
+        "columns": {name: str(schema.field(name).type) for name in schema.names if name not in index_columns},
+        "rows": rows,
+        "row_groups": row_groups
+    }
+
+def _read_arrow_schema(source):
+    try:
+        return pa.ipc.open_file(source).schema
+    except pa.ArrowInvalid:
+        # Feather V1 files have no IPC footer
+        return feather.read_table(source).schema
+
+def _to_filter_value(value, field_type):
+    # Arrow casts plain Python values to the column type, but not dates to timestamps
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, pd.Timestamp):
+        value = value.to_pydatetime()
+    if pa.types.is_timestamp(field_type) and type(value) is datetime.date:
+        value = datetime.datetime.combine(value, datetime.time())
+    return value
+
+def filters_to_expression(filters, schema):
+    """
+    Translate filters in the filter_data format into a PyArrow expression
+
+    Parquet prunes whole row groups whose min/max statistics rule out the
+    comparison operators before decoding them; the string operators are
+    evaluated on the decoded rows.
+
+    Parameters:
+    - filters: List of dictionaries with column, operator and value
+    - schema: pyarrow.Schema of the file (filters on other columns are skipped)
+
+    Returns:
+    - pyarrow.compute.Expression, or None if no filter applies
+    """
+    expression = None
+    for filter_item in filters or []:
+        column = filter_item.get('column')
+        operator = filter_item.get('operator')
+        value = filter_item.get('value')
+        if not column or value is None or column not in schema.names:
+            continue
+
+        field = pc.field(column)
+        field_type = schema.field(column).type
+        if operator == 'equals':
+            condition = field == _to_filter_value(value, field_type)
+        elif operator == 'not_equals':
+            # pandas keeps missing values for !=
+            condition = (field != _to_filter_value(value, field_type)) | field.is_null()
+        elif operator == 'greater_than':
+            condition = field > _to_filter_value(value, field_type)
+        elif operator == 'less_than':
+            condition = field < _to_filter_value(value, field_type)
+        elif operator == 'contains':
+            condition = pc.match_substring_regex(field.cast(pa.string()), str(value))
+        elif operator == 'starts_with':
+            condition = pc.starts_with(field.cast(pa.string()), str(value))
+        elif operator == 'ends_with':
+            condition = pc.ends_with(field.cast(pa.string()), str(value))
+        elif operator == 'in_range' and isinstance(value, (list, tuple)) and len(value) == 2:
+            condition = (field >= _to_filter_value(value[0], field_type)) & (field <= _to_filter_value(value[1], field_type))
+        else:
+            continue
+
+        # A missing value makes a condition null, and null rows are dropped as in pandas
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def read_columnar(uploaded_file, file_extension, columns=None, filters=None):
+    """
+    Read a Parquet, Feather or Arrow IPC upload
+
+    Only the selected columns are decoded. Parquet filters are pushed
+    down to the reader, which skips row groups their statistics rule out;
+    Feather/Arrow files are filtered in Arrow before conversion to pandas.
+
+    Parameters:
+    - uploaded_file: The uploaded file object
+    - file_extension: One of COLUMNAR_EXTENSIONS
+    - columns: Optional list of column names to load
+    - filters: Optional list of filters in the filter_data format
+
+    Returns:
+    - DataFrame with the selected columns and matching rows
+    """
+    source = open_columnar_source(uploaded_file)
+    columns = list(columns) if columns else None
+
+    if COLUMNAR_EXTENSIONS[file_extension] == "parquet":
+        schema = pq.ParquetFile(source).schema_arrow
+        expression = filters_to_expression(filters, schema)
+        table = pq.read_table(source, columns=columns, filters=expression, use_pandas_metadata=True)
+    else:
+        schema = _read_arrow_schema(source)
+        expression = filters_to_expression(filters, schema)
+        if expression is None:
+            table = feather.read_table(source, columns=columns)
+        else:
+            # Decode the filter columns too, then drop them after filtering
+            filter_columns = [f['column'] for f in filters if f.get('column') in schema.names]
+            needed = list(dict.fromkeys(columns + filter_columns)) if columns else None
+            table = feather.read_table(source, columns=needed).filter(expression)
+            if columns:
+                table = table.select(columns)
+
+    # Release each Arrow column as soon as it is converted to keep the peak at about one copy
+    return table.to_pandas(split_blocks=True, self_destruct=True)
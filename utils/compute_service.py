@@ -0,0 +1,251 @@
+import os
+import time
+import atexit
+import shutil
+import weakref
+import tempfile
+import importlib
+import threading
+import collections
+import multiprocessing
+
+try:
+    import pyarrow as pa
+except ImportError:  # Without pyarrow every job runs in the calling thread
+    pa = None
+
+# Worker processes running heavy jobs at the same time across all sessions; 0 runs every job inline
+COMPUTE_WORKERS = int(os.environ.get("CORPCHAT_COMPUTE_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Seconds a job may wait for a worker and then run before it is abandoned
+COMPUTE_TIMEOUT_SECONDS = float(os.environ.get("CORPCHAT_COMPUTE_TIMEOUT", 120))
+
+# Smaller frames are cheaper to process inline than to export to a worker
+OFFLOAD_MIN_ROWS = 500_000
+
+# Frames kept exported for reuse by later jobs on the same data
+EXPORT_CACHE_SIZE = 4
+
+# Modules imported once by the fork server, so each worker starts with them loaded
+WORKER_PRELOAD = ["pandas", "pyarrow", "utils.data_analysis", "utils.data_visualization"]
+
+_context = None
+_context_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(COMPUTE_WORKERS, 1))
+
+# Exported frames: (id, shape, columns) -> (weak reference to the frame, IPC file path)
+_exports = collections.OrderedDict()
+_exports_lock = threading.Lock()
+_export_dir = None
+
+_metrics = {
+    "submitted": 0, "queued": 0, "running": 0, "completed": 0, "failed": 0,
+    "timed_out": 0, "inline_fallbacks": 0, "wait_seconds": 0.0, "run_seconds": 0.0
+}
+_metrics_lock = threading.Lock()
+
+# Set in worker processes so kernels never offload again
+_in_worker = False
+
+class ComputeTimeout(TimeoutError):
+    """Raised when a job does not get a worker or finish within its timeout"""
+
+def _count(**deltas):
+    with _metrics_lock:
+        for name, delta in deltas.items():
+            _metrics[name] += delta
+
+def get_compute_metrics():
+    """
+    Queue and job counters of the execution service
+
+    submitted counts every job on a frame large enough to offload,
+    including the inline_fallbacks that then ran in the calling thread
+    because the frame could not be exported.
+
+    Returns:
+    - Dictionary with workers, queued, running, submitted, completed,
+      failed, timed_out, inline_fallbacks, avg_wait_ms and avg_run_ms
+    """
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    finished = metrics["completed"] + metrics["failed"] + metrics["timed_out"]
+    started = finished + metrics["running"]
+    metrics["workers"] = COMPUTE_WORKERS
+    metrics["avg_wait_ms"] = metrics.pop("wait_seconds") * 1000 / started if started else None
+    metrics["avg_run_ms"] = metrics.pop("run_seconds") * 1000 / finished if finished else None
+    return metrics
+
+def should_offload(df):
+    """
+    Decide whether a job on a frame goes to a worker process
+
+    Returns:
+    - True if workers are enabled, pyarrow is installed and the frame is large
+    """
+    return (
+        COMPUTE_WORKERS > 0 and pa is not None and not _in_worker
+        and df is not None and len(df) >= OFFLOAD_MIN_ROWS
+    )
+
+def _get_context():
+    # Workers are forked from a clean fork server, never from the multi-threaded app process
+    global _context
+    with _context_lock:
+        if _context is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _context = multiprocessing.get_context(method)
+            if method == "forkserver":
+                _context.set_forkserver_preload(WORKER_PRELOAD)
+    return _context
+
+def _get_export_dir():
+    # /dev/shm is RAM-backed, so exported frames are shared memory the workers map directly
+    global _export_dir
+    if _export_dir is None:
+        base = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+        _export_dir = tempfile.mkdtemp(prefix="corpchat_frames_", dir=base)
+        atexit.register(shutil.rmtree, _export_dir, True)
+    return _export_dir
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _drop_export(key, ref):
+    # Called when an exported frame is garbage collected; its key may have been reused since
+    with _exports_lock:
+        entry = _exports.get(key)
+        if entry is None or entry[0] is not ref:
+            return
+        del _exports[key]
+    _remove_file(entry[1])
+
+def _export_frame(df, columns):
+    """
+    Write a frame (or some of its columns) to an uncompressed Arrow IPC file
+
+    The file is reused while the frame is alive, so several jobs on the
+    same dataset export it once. Frames are treated as immutable, as
+    everywhere in the app: changes create new frames.
+    """
+    key = (id(df), df.shape, tuple(columns) if columns else None)
+    with _exports_lock:
+        entry = _exports.get(key)
+        if entry is not None and entry[0]() is df:
+            _exports.move_to_end(key)
+            return entry[1]
+
+    table = pa.Table.from_pandas(df[list(columns)] if columns else df, preserve_index=False)
+    path = os.path.join(_get_export_dir(), f"{os.getpid()}_{id(df)}_{time.monotonic_ns()}.arrow")
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    del table
+
+    ref = weakref.ref(df, lambda ref, key=key: _drop_export(key, ref))
+    with _exports_lock:
+        stale = _exports.pop(key, None)
+        _exports[key] = (ref, path)
+        evicted = []
+        while len(_exports) > EXPORT_CACHE_SIZE:
+            evicted.append(_exports.popitem(last=False)[1][1])
+    for old_path in evicted + ([stale[1]] if stale else []):
+        _remove_file(old_path)
+    return path
+
+def _read_frame(path):
+    # Memory-mapped: numeric buffers are read straight from the shared file
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+
+def _worker_main(module_name, func_name, path, args, kwargs, connection):
+    global _in_worker
+    _in_worker = True
+    try:
+        func = getattr(importlib.import_module(module_name), func_name)
+        result = ("ok", func(_read_frame(path), *args, **kwargs))
+    except Exception as e:
+        result = ("error", RuntimeError(f"{type(e).__name__}: {e}"))
+    try:
+        connection.send(result)
+    finally:
+        connection.close()
+
+def offload(func, df, *args, columns=None, timeout=None, **kwargs):
+    """
+    Run func(df[columns], *args, **kwargs) in a worker process
+
+    The frame is exported once to shared memory as an Arrow IPC file and
+    memory-mapped by the worker, so it is never pickled; only the result
+    comes back through a pipe. Each job runs in its own process forked
+    from a preloaded fork server, so a job that exceeds its timeout is
+    terminated without affecting the others. Small frames, frames Arrow
+    cannot represent, and calls made with workers disabled run inline.
+
+    Parameters:
+    - func: Module-level function taking the frame as first argument
+    - df: Pandas DataFrame
+    - columns: Optional list of columns func needs (the others are not exported)
+    - timeout: Seconds to wait for a worker plus run time (default COMPUTE_TIMEOUT_SECONDS)
+
+    Returns:
+    - Whatever func returns
+
+    Raises:
+    - ComputeTimeout if no worker became free or the job ran too long
+    """
+    if not should_offload(df):
+        return func(df[list(columns)] if columns else df, *args, **kwargs)
+
+    _count(submitted=1)
+    try:
+        path = _export_frame(df, columns)
+    except (pa.ArrowException, OSError):
+        # e.g. object columns with mixed types Arrow cannot store
+        _count(inline_fallbacks=1)
+        return func(df[list(columns)] if columns else df, *args, **kwargs)
+
+    timeout = COMPUTE_TIMEOUT_SECONDS if timeout is None else timeout
+    queued = time.monotonic()
+    _count(queued=1)
+    acquired = _slots.acquire(timeout=timeout)
+    waited = time.monotonic() - queued
+    _count(queued=-1, wait_seconds=waited)
+    if not acquired:
+        _count(timed_out=1)
+        raise ComputeTimeout(f"No compute worker became free within {timeout:g} s")
+
+    _count(running=1)
+    started = time.monotonic()
+    outcome = "failed"
+    try:
+        context = _get_context()
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=_worker_main,
+            args=(func.__module__, func.__name__, path, args, kwargs, sender),
+            daemon=True
+        )
+        process.start()
+        sender.close()
+        try:
+            if not receiver.poll(max(timeout - waited, 0)):
+                process.terminate()
+                outcome = "timed_out"
+                raise ComputeTimeout(f"{func.__name__} did not finish within {timeout:g} s")
+            try:
+                status, result = receiver.recv()
+            except EOFError:
+                raise RuntimeError(f"The worker running {func.__name__} exited unexpectedly (out of memory?)")
+        finally:
+            receiver.close()
+            process.join()
+        if status == "error":
+            raise result
+        outcome = "completed"
+        return result
+    finally:
+        _slots.release()
+        _count(running=-1, run_seconds=time.monotonic() - started, **{outcome: 1})
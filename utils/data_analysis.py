@@ -1,14 +1,42 @@
+import os
 import pandas as pd
 import numpy as np
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from utils.profiler import profiled
+from utils.datetime_parsing import parse_datetime_column
+from utils.sketches import build_categorical_sketch
+from utils.query_backend import QueryTable
+from utils.compute_service import offload
 
-def calculate_basic_stats(df, columns=None):
+# Threads used for per-column cleaning work
+CLEANING_WORKERS = min(8, os.cpu_count() or 1)
+
+# Rows hashed at a time when looking for duplicates
+DEDUP_CHUNK_ROWS = 250_000
+
+# Above this many rows, "auto" categorical distributions use sketches
+APPROX_DISTRIBUTION_MIN_ROWS = 1_000_000
+
+# Values shown by an approximate categorical distribution
+DISTRIBUTION_TOP_K = 50
+
+# Above this many rows, numeric statistics use the sketches built during load
+SKETCH_STATS_MIN_ROWS = 1_000_000
+
+@profiled
+def calculate_basic_stats(df, columns=None, sketches=None):
     """
     Calculate basic statistics for selected columns
     
+    Columns with a sketch are answered from it instead of scanning the
+    data: mean, standard deviation, min, max and counts are exact, the
+    median and quartiles are approximate.
+    
     Parameters:
-    - df: Pandas DataFrame
+    - df: Pandas DataFrame or QueryTable
     - columns: List of columns to analyze (None for all numeric columns)
+    - sketches: Optional dictionary of column name -> NumericColumnSketch
     
     Returns:
     - DataFrame with basic statistics
@@ -18,19 +46,28 @@ def calculate_basic_stats(df, columns=None):
     
     # If no columns specified, use all numeric columns
     if columns is None:
-        columns = df.select_dtypes(include=[np.number]).columns.tolist()
+        columns = [col for col, dtype in df.dtypes.items() if pd.api.types.is_numeric_dtype(dtype)]
     
-    # Filter to only include numeric columns from the selection
-    numeric_columns = [col for col in columns if pd.api.types.is_numeric_dtype(df[col])]
+    # Filter to only include numeric columns from the selection (booleans have no quantiles)
+    numeric_columns = [
+        col for col in columns
+        if pd.api.types.is_numeric_dtype(df.dtypes[col]) and not pd.api.types.is_bool_dtype(df.dtypes[col])
+    ]
     
     if not numeric_columns:
         return pd.DataFrame({
             "Message": ["No numeric columns selected for analysis"]
         })
     
+    if isinstance(df, QueryTable):
+        return df.describe(numeric_columns)
+    
     # Calculate statistics
     stats = {}
     for col in numeric_columns:
+        if sketches and col in sketches:
+            stats[col] = sketches[col].stats()
+            continue
         col_stats = {
             "Mean": df[col].mean(),
             "Median": df[col].median(),
@@ -46,6 +83,7 @@ def calculate_basic_stats(df, columns=None):
     
     return pd.DataFrame(stats)
 
+@profiled
 def get_column_types(df):
     """
     Get the data types of columns in a DataFrame
@@ -75,22 +113,152 @@ def get_column_types(df):
     
     return types
 
-def clean_data(df, options):
+def get_column_mode(series):
+    """
+    Get the most frequent value of a Series from a single value_counts pass
+
+    Ties resolve to the smallest value, as with Series.mode().
+
+    Parameters:
+    - series: Pandas Series
+
+    Returns:
+    - Most frequent value, or None if the Series has no values
+    """
+    counts = series.value_counts(sort=True)
+    if counts.empty:
+        return None
+    top_values = counts.index[counts.to_numpy() == counts.iloc[0]]
+    try:
+        return min(top_values)
+    except TypeError:
+        # Mixed types that cannot be compared
+        return top_values[0]
+
+def get_fill_values(df, strategy, columns=None):
+    """
+    Compute the fill value for every column with missing values in one pass
+
+    Parameters:
+    - df: Pandas DataFrame
+    - strategy: 'fill_mean', 'fill_median', 'fill_mode' or 'fill_zero'
+    - columns: Optional list of columns to consider (defaults to all)
+
+    Returns:
+    - Dictionary mapping column names to fill values
+    """
+    columns = df.columns if columns is None else columns
+    if strategy in ('fill_mean', 'fill_median'):
+        columns = [
+            col for col in columns
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+        ]
+
+    # Checked per column so no subset of the frame is copied
+    missing_columns = [col for col in columns if df[col].hasnans]
+    if not missing_columns:
+        return {}
+
+    if strategy == 'fill_zero':
+        return {col: 0 for col in missing_columns}
+
+    if strategy in ('fill_mean', 'fill_median'):
+        numeric = df[missing_columns]
+        values = numeric.mean() if strategy == 'fill_mean' else numeric.median()
+        return values.dropna().to_dict()
+
+    if strategy == 'fill_mode':
+        # value_counts releases the GIL for much of its work, so columns are counted in parallel
+        if len(missing_columns) == 1:
+            modes = [get_column_mode(df[missing_columns[0]])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(CLEANING_WORKERS, len(missing_columns))) as executor:
+                modes = list(executor.map(lambda col: get_column_mode(df[col]), missing_columns))
+        return {col: mode for col, mode in zip(missing_columns, modes) if mode is not None}
+
+    return {}
+
+def hash_rows(df, columns=None, chunk_size=DEDUP_CHUNK_ROWS):
+    """
+    Hash each row of a DataFrame to a 64-bit integer, a chunk of rows at a time
+
+    Parameters:
+    - df: Pandas DataFrame
+    - columns: Optional list of key columns to hash (defaults to all columns)
+    - chunk_size: Rows hashed per chunk, bounding the temporary memory used
+
+    Returns:
+    - NumPy uint64 array with one hash per row
+    """
+    keys = df if not columns else df[list(columns)]
+    hashes = np.empty(len(keys), dtype=np.uint64)
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys.iloc[start:start + chunk_size]
+        hashes[start:start + len(chunk)] = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+    return hashes
+
+def find_duplicate_rows(df, columns=None, keep='first'):
+    """
+    Find duplicate rows by comparing row hashes instead of the full values
+
+    Rows whose hash occurs only once cannot be duplicates. The remaining
+    candidates are compared exactly, because hashes can collide: object
+    columns are hashed by their text, so 1 and '1' share a hash. The result
+    matches drop_duplicates. Large frames are hashed in a worker process
+    (see utils.compute_service).
+
+    Parameters:
+    - df: Pandas DataFrame
+    - columns: Optional list of key columns that identify a duplicate (defaults to all)
+    - keep: Which occurrence is not marked ('first' or 'last')
+
+    Returns:
+    - Boolean NumPy array, True for rows that duplicate an earlier (or later) row
+    """
+    if df is None or df.empty:
+        return np.zeros(0 if df is None else len(df), dtype=bool)
+    return offload(_duplicate_mask, df, keep, columns=list(columns) if columns else None)
+
+def _duplicate_mask(keys, keep):
+    candidates = pd.Series(hash_rows(keys)).duplicated(keep=False).to_numpy()
+    mask = np.zeros(len(keys), dtype=bool)
+    if candidates.any():
+        mask[candidates] = keys[candidates].duplicated(keep=keep).to_numpy()
+    return mask
+
+@profiled
+def count_duplicates(df, columns=None):
+    """
+    Count duplicate rows without removing anything
+
+    Parameters:
+    - df: Pandas DataFrame
+    - columns: Optional list of key columns that identify a duplicate (defaults to all)
+
+    Returns:
+    - Number of rows that would be removed as duplicates
+    """
+    return int(find_duplicate_rows(df, columns).sum())
+
+@profiled
+def clean_data(df, options, report=None):
     """
     Clean data based on selected options
     
     Parameters:
     - df: Pandas DataFrame
     - options: Dictionary of cleaning options
+    - report: Optional dictionary that receives details of the cleaning steps
+      (currently 'datetime': one parse report per converted column)
     
     Returns:
-    - Cleaned DataFrame
+    - Cleaned DataFrame (the original is never modified)
     """
     if df is None or df.empty:
         return None
     
-    # Create a copy to avoid modifying the original
-    cleaned_df = df.copy()
+    # Every step below returns a new frame, so no upfront copy is needed
+    cleaned_df = df
     
     # Handle missing values
     if options.get('handle_missing'):
@@ -98,46 +266,54 @@ def clean_data(df, options):
         
         if missing_strategy == 'drop':
             cleaned_df = cleaned_df.dropna()
-        elif missing_strategy == 'fill_mean':
-            for col in cleaned_df.select_dtypes(include=[np.number]).columns:
-                cleaned_df[col] = cleaned_df[col].fillna(cleaned_df[col].mean())
-        elif missing_strategy == 'fill_median':
-            for col in cleaned_df.select_dtypes(include=[np.number]).columns:
-                cleaned_df[col] = cleaned_df[col].fillna(cleaned_df[col].median())
-        elif missing_strategy == 'fill_mode':
-            for col in cleaned_df.columns:
-                cleaned_df[col] = cleaned_df[col].fillna(cleaned_df[col].mode()[0] if not cleaned_df[col].mode().empty else None)
-        elif missing_strategy == 'fill_zero':
-            cleaned_df = cleaned_df.fillna(0)
-    
-    # Remove duplicates
+        else:
+            fill_values = get_fill_values(cleaned_df, missing_strategy)
+            if fill_values:
+                cleaned_df = cleaned_df.fillna(fill_values)
+    
+    # Remove duplicates (optionally judged on a subset of key columns)
     if options.get('remove_duplicates'):
-        cleaned_df = cleaned_df.drop_duplicates()
+        duplicates = find_duplicate_rows(cleaned_df, options.get('duplicate_columns'))
+        if duplicates.any():
+            cleaned_df = cleaned_df[~duplicates]
     
-    # Convert columns to datetime
+    # Convert columns to datetime (format inferred per column unless given)
     if options.get('datetime_columns'):
+        converted = {}
+        datetime_reports = []
         for col in options['datetime_columns']:
-            try:
-                cleaned_df[col] = pd.to_datetime(cleaned_df[col])
-            except:
-                pass
+            parsed, parse_report = parse_datetime_column(cleaned_df[col], options.get('datetime_format') or None)
+            datetime_reports.append(parse_report)
+            if parsed is not None:
+                converted[col] = parsed
+        if converted:
+            # Column names can be any label (e.g. numeric Excel headers), so no assign(**converted)
+            cleaned_df = cleaned_df.copy(deep=False)
+            for col, parsed in converted.items():
+                cleaned_df[col] = parsed
+        if report is not None:
+            report['datetime'] = datetime_reports
     
     return cleaned_df
 
+@profiled
 def filter_data(df, filters):
     """
     Filter data based on specified conditions
     
     Parameters:
-    - df: Pandas DataFrame
+    - df: Pandas DataFrame or QueryTable
     - filters: List of dictionaries with filter conditions
     
     Returns:
-    - Filtered DataFrame
+    - Filtered DataFrame (a QueryTable for a QueryTable)
     """
     if df is None or df.empty or not filters:
         return df
     
+    if isinstance(df, QueryTable):
+        return df.where(filters)
+    
     filtered_df = df.copy()
     
     for filter_item in filters:
@@ -169,37 +345,77 @@ def filter_data(df, filters):
     
     return filtered_df
 
-def get_categorical_distribution(df, column):
+@profiled
+def get_categorical_distribution(df, column, mode="auto", top_k=DISTRIBUTION_TOP_K):
     """
     Get the distribution of values in a categorical column
     
+    The exact mode counts every distinct value. The approximate mode keeps
+    memory bounded for huge, high-cardinality columns: it returns only the
+    top_k values, with counts from a frequent items sketch and an error
+    bound, and estimates the number of distinct values with HyperLogLog.
+    
+    A QueryTable is counted exactly by the query engine; outside exact
+    mode only the top_k values are returned.
+    
     Parameters:
-    - df: Pandas DataFrame
+    - df: Pandas DataFrame or QueryTable
     - column: Column name
+    - mode: 'exact', 'approximate' or 'auto' (approximate for large datasets)
+    - top_k: Number of values returned in approximate mode
     
     Returns:
-    - DataFrame with value counts
+    - DataFrame with value counts; its attrs hold 'approximate',
+      'distinct_values' and, when approximate, 'distinct_error' (relative)
     """
     if df is None or df.empty or column not in df.columns:
         return None
     
+    if isinstance(df, QueryTable):
+        distribution, distinct = df.value_counts(column, limit=None if mode == "exact" else top_k)
+        distribution.attrs.update({"approximate": False, "distinct_values": distinct})
+        return distribution
+    
+    if mode == "auto":
+        mode = "approximate" if len(df) > APPROX_DISTRIBUTION_MIN_ROWS else "exact"
+    
+    if mode == "approximate":
+        frequent, distinct = build_categorical_sketch(df[column], capacity=max(20 * top_k, 1000))
+        top = frequent.top(top_k)
+        distribution = pd.DataFrame({
+            column: top["value"],
+            'Count': top["estimate"],
+            'Percentage': (top["estimate"] / max(frequent.total, 1) * 100).round(2),
+            'Error': top["error"]
+        })
+        distribution.attrs.update({
+            "approximate": True,
+            "distinct_values": distinct.estimate(),
+            "distinct_error": distinct.relative_error
+        })
+        return distribution
+    
     # Get value counts and convert to DataFrame
     distribution = df[column].value_counts().reset_index()
     distribution.columns = [column, 'Count']
     
     # Calculate percentage
     distribution['Percentage'] = (distribution['Count'] / distribution['Count'].sum() * 100).round(2)
+    distribution.attrs.update({"approximate": False, "distinct_values": len(distribution)})
     
     return distribution
 
-def get_numeric_distribution(df, column, bins=10):
+@profiled
+def get_numeric_distribution(df, column, bins=10, sketch=None):
     """
     Get the distribution of values in a numeric column
     
     Parameters:
-    - df: Pandas DataFrame
+    - df: Pandas DataFrame or QueryTable
     - column: Column name
     - bins: Number of bins for histogram
+    - sketch: Optional NumericColumnSketch of the column; counts then come
+      from its streaming histogram instead of a pass over the data
     
     Returns:
     - Tuple of (bin_edges, counts)
@@ -207,10 +423,19 @@ def get_numeric_distribution(df, column, bins=10):
     if df is None or df.empty or column not in df.columns:
         return None, None
     
-    if not pd.api.types.is_numeric_dtype(df[column]):
+    if not pd.api.types.is_numeric_dtype(df.dtypes[column]):
         return None, None
     
-    counts, bin_edges = np.histogram(df[column].dropna(), bins=bins)
+    if isinstance(df, QueryTable):
+        counts, bin_edges = df.histogram(column, bins)
+    elif sketch is not None and sketch.count:
+        low, high = sketch.min, sketch.max
+        if low == high:
+            # Same range np.histogram uses for a constant column
+            low, high = low - 0.5, high + 0.5
+        counts, bin_edges = sketch.histogram.histogram(bins, low, high)
+    else:
+        counts, bin_edges = np.histogram(df[column].dropna(), bins=bins)
     
     # Create bin labels
     bin_labels = [f"{bin_edges[i]:.2f}-{bin_edges[i+1]:.2f}" for i in range(len(bin_edges)-1)]
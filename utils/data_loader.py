@@ -2,40 +2,539 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import io
+import os
+import re
+import bz2
+import gzip
+import lzma
+import time
+import zipfile
+import datetime
+import weakref
+import itertools
+import threading
+from utils.profiler import profiled
+from utils.sketches import update_numeric_sketches, build_numeric_sketches
+from utils.excel_reader import read_excel, get_excel_engine
+from utils.columnar_reader import read_columnar, COLUMNAR_EXTENSIONS
+from utils.datetime_parsing import infer_datetime_format
+from utils.query_backend import QueryTable, is_query_backend_enabled, QUERY_BACKEND_MIN_BYTES, QUERY_PREVIEW_ROWS
 
-def load_file(uploaded_file, sample_size=None):
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import zstandard
+except ImportError:  # .zst uploads are then rejected with a clear message
+    zstandard = None
+
+# Compressed upload suffix -> compression (the archive or inner name gives the format)
+COMPRESSED_EXTENSIONS = {"gz": "gzip", "bz2": "bz2", "xz": "xz", "zst": "zstd", "zip": "zip"}
+
+# CSV parser: "auto" (multi-threaded PyArrow when installed, else C), "pyarrow" or "c"
+CSV_ENGINE_ENV_VAR = "CORPCHAT_CSV_ENGINE"
+
+# Set to "pyarrow" to keep the Arrow-backed dtypes produced by the PyArrow parser
+CSV_DTYPE_BACKEND_ENV_VAR = "CORPCHAT_CSV_DTYPE_BACKEND"
+
+# Rows parsed at a time when reading CSV files
+LOAD_CHUNK_ROWS = 1_000_000
+
+# Rows read to preview a CSV file's columns and types before loading
+SCHEMA_SNIFF_ROWS = 2000
+
+# Dates and timestamps the PyArrow CSV parser recognises (ISO 8601)
+ISO_DATETIME_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,9})?)?(?:Z|[+-]\d{2}:?\d{2})?)?")
+
+# Types a CSV column can be loaded as -> pandas dtype (datetimes go through parse_dates)
+CSV_TYPE_OVERRIDES = {
+    "integer": "Int64",
+    "float": "float64",
+    "text": "string",
+    "category": "category",
+    "boolean": "boolean",
+    "datetime": None
+}
+
+# id(DataFrame) -> (weak reference, token) for get_dataset_key
+_dataset_tokens = {}
+_dataset_token_counter = itertools.count(1)
+_dataset_tokens_lock = threading.Lock()
+
+@profiled
+def load_file(uploaded_file, sample_size=None, excel_options=None, csv_options=None, columnar_options=None):
     """
-    Load data from an uploaded file (CSV or Excel)
+    Load data from an uploaded file (CSV, Excel, Parquet, Feather or Arrow IPC)
     
     Parameters:
     - uploaded_file: The uploaded file object
     - sample_size: Optional number of rows to sample
+    - excel_options: Optional sheet_name, columns, skip_rows and max_rows
+      for Excel files (see utils.excel_reader.read_excel)
+    - csv_options: Optional columns to load and type overrides for CSV
+      files (see get_csv_read_options)
+    - columnar_options: Optional columns and filters for Parquet, Feather
+      and Arrow files (see utils.columnar_reader.read_columnar)
     
     Returns:
     - DataFrame with the loaded data
     """
+    try:
+        return attach_upload(read_upload(uploaded_file, sample_size, excel_options, csv_options, columnar_options))
+    except Exception as e:
+        st.error(f"Error loading file: {str(e)}")
+        return None
+
+def read_upload(uploaded_file, sample_size=None, excel_options=None, csv_options=None, columnar_options=None, progress=None):
+    """
+    Read an uploaded file without touching the session
+    
+    This is the part of load_file that does the work, so it can run in a
+    background thread (see utils.ingestion); attach_upload then stores
+    the result in the session.
+    
+    Parameters:
+    - uploaded_file: The uploaded file object
+    - sample_size, excel_options, csv_options, columnar_options: As for load_file
+    - progress: Optional callable receiving the number of rows parsed so far
+      (called after each chunk of a CSV file read by the C parser)
+    
+    Returns:
+    - Dictionary with 'data' (DataFrame), 'sketches', 'table' (QueryTable
+      or None) and 'report' (see get_load_report)
+    """
     file_name = uploaded_file.name
-    file_extension = file_name.split('.')[-1].lower()
+    file_extension, compression = get_upload_format(uploaded_file)
+    
+    # The file may already have been read (e.g. to sniff its columns)
+    uploaded_file.seek(0)
+    start = time.perf_counter()
+    
+    # Process based on file extension
+    if file_extension == 'csv' and use_query_backend(uploaded_file):
+        columns = (csv_options or {}).get("columns")
+        data, table = load_into_query_backend(uploaded_file, sample_size, columns, compression)
+        report = get_load_report(uploaded_file, "duckdb", time.perf_counter() - start, data, compression)
+        return {"data": data, "sketches": None, "table": table, "report": report}
+    elif file_extension == 'csv':
+        data, sketches, engine = read_csv_file(uploaded_file, compression, progress, **get_csv_read_options(csv_options))
+    elif file_extension in ['xlsx', 'xls'] and compression is None:
+        data, sketches = read_excel(uploaded_file, file_extension, **(excel_options or {})), None
+        engine = get_excel_engine(file_extension) or "xlrd"
+    elif file_extension in COLUMNAR_EXTENSIONS and compression is None:
+        data, engine = read_columnar(uploaded_file, file_extension, **(columnar_options or {})), "pyarrow"
+        # Same rule as CSV files: sketches only for more than one load chunk
+        sketches = build_numeric_sketches(data, LOAD_CHUNK_ROWS) if len(data) > LOAD_CHUNK_ROWS else None
+    else:
+        raise ValueError(f"Unsupported file format: {file_name}. Please upload a CSV, Excel, Parquet, Feather or Arrow file (CSV files may be compressed).")
+    report = get_load_report(uploaded_file, engine, time.perf_counter() - start, data, compression)
+    
+    # Sample data if specified
+    if sample_size and sample_size < len(data):
+        data, sketches = data.sample(n=sample_size, random_state=42), None
+    
+    return {"data": data, "sketches": sketches, "table": None, "report": report}
+
+def attach_upload(result):
+    """
+    Store the load report, sketches and query table of a read upload in the session
+    
+    Parameters:
+    - result: Dictionary returned by read_upload
+    
+    Returns:
+    - The loaded DataFrame
+    """
+    data = result["data"]
+    st.session_state.load_report = result["report"]
+    set_dataset_sketches(data, result["sketches"])
+    set_dataset_table(data, result["table"])
+    return data
+
+def get_upload_format(uploaded_file):
+    """
+    Get the data format and compression of an upload from its name
+    
+    "sales.csv.gz" is a gzip-compressed CSV file. A zip archive is read
+    through its first CSV member, so "export.zip" is a zip-compressed CSV.
+    
+    Parameters:
+    - uploaded_file: The uploaded file object
+    
+    Returns:
+    - (format extension, compression or None) tuple
+    """
+    parts = uploaded_file.name.lower().split('.')
+    extension = parts[-1]
+    if extension not in COMPRESSED_EXTENSIONS:
+        return extension, None
+    if extension == "zip":
+        return "csv", "zip"
+    return (parts[-2] if len(parts) > 2 else "csv"), COMPRESSED_EXTENSIONS[extension]
+
+def open_decompressed(uploaded_file, compression):
+    """
+    Open an upload as a stream of decompressed bytes
+    
+    Decompression happens as the parser reads, so only the parser's
+    current block is held in memory, never the whole decompressed file.
+    
+    Parameters:
+    - uploaded_file: The uploaded file object
+    - compression: One of COMPRESSED_EXTENSIONS' values, or None
+    
+    Returns:
+    - Binary file object positioned at the start of the data
+    """
+    uploaded_file.seek(0)
+    if compression is None:
+        return uploaded_file
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=uploaded_file, mode="rb")
+    if compression == "bz2":
+        return bz2.BZ2File(uploaded_file, mode="rb")
+    if compression == "xz":
+        return lzma.LZMAFile(uploaded_file, mode="rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Reading .zst files requires the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(uploaded_file)
+    if compression == "zip":
+        archive = zipfile.ZipFile(uploaded_file)
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        csv_members = [info for info in members if info.filename.lower().endswith(".csv")]
+        if not csv_members:
+            raise ValueError("The zip archive contains no CSV file")
+        return archive.open(csv_members[0])
+    raise ValueError(f"Unsupported compression: {compression}")
+
+def get_upload_size(uploaded_file):
+    """
+    Size of an uploaded file in bytes
+    """
+    size = getattr(uploaded_file, "size", None)
+    if size is None:
+        position = uploaded_file.tell()
+        size = uploaded_file.seek(0, io.SEEK_END)
+        uploaded_file.seek(position)
+    return size
+
+def get_load_report(uploaded_file, engine, seconds, data, compression=None):
+    """
+    Describe how a file was loaded (engine and throughput) for the sidebar
+    
+    Parameters:
+    - uploaded_file: The uploaded file object
+    - engine: Name of the parser or engine used
+    - seconds: Time spent reading
+    - data: The loaded DataFrame
+    - compression: Compression of the upload, if any
+    
+    Returns:
+    - Dictionary stored as st.session_state.load_report
+    """
+    size = get_upload_size(uploaded_file)
+    return {
+        "file_name": uploaded_file.name,
+        "engine": engine,
+        "compression": compression,
+        "bytes": size,
+        "seconds": seconds,
+        "rows": len(data),
+        "mb_per_s": size / (1024 * 1024) / seconds if seconds > 0 else None
+    }
+
+def use_query_backend(uploaded_file):
+    """
+    Decide whether an upload goes to the query engine instead of pandas
+    
+    Returns:
+    - True if the backend is enabled and the file is large enough
+    """
+    size = getattr(uploaded_file, "size", None)
+    return is_query_backend_enabled() and size is not None and size >= QUERY_BACKEND_MIN_BYTES
+
+def load_into_query_backend(uploaded_file, sample_size=None, columns=None, compression=None):
+    """
+    Load a CSV upload into the on-disk query engine
+    
+    Analysis runs on the whole table through the query engine; pandas only
+    holds the first QUERY_PREVIEW_ROWS rows for the preview and the chat.
+    With a sample size the random sample is loaded into pandas instead and
+    the table is not kept.
+    
+    Parameters:
+    - uploaded_file: The uploaded file object
+    - sample_size: Optional number of rows to sample
+    - columns: Optional list of columns to keep
+    - compression: Compression of the upload, if any
+    
+    Returns:
+    - (DataFrame with the preview rows or the sample, QueryTable or None) tuple
+    """
+    table = QueryTable.from_upload(open_decompressed(uploaded_file, compression), columns=columns)
+    if sample_size and sample_size < len(table):
+        return table.to_pandas(sample=sample_size), None
+    
+    data = table.to_pandas(limit=QUERY_PREVIEW_ROWS)
+    return data, (table if len(table) > len(data) else None)
+
+def set_dataset_table(df, table):
+    """
+    Remember the query-engine table holding the full version of a dataset
+    
+    Parameters:
+    - df: The DataFrame loaded into pandas (a preview of the table)
+    - table: QueryTable, or None
+    """
+    if table is not None:
+        st.session_state.dataset_table = {"key": get_dataset_key(df), "table": table}
+    else:
+        st.session_state.pop("dataset_table", None)
+
+def get_query_source(df):
+    """
+    Get what analysis of a dataset should run on
     
+    Parameters:
+    - df: Pandas DataFrame (normally st.session_state.data)
+    
+    Returns:
+    - The QueryTable the frame previews, or the frame itself
+    """
+    entry = st.session_state.get("dataset_table")
+    if entry is None or df is None or entry["key"] != get_dataset_key(df):
+        return df
+    return entry["table"]
+
+def sniff_csv_schema(uploaded_file, rows=SCHEMA_SNIFF_ROWS):
+    """
+    Read the header and first rows of a CSV file to preview its columns
+    
+    Compressed files are decompressed only as far as those rows.
+    
+    Parameters:
+    - uploaded_file: The uploaded file object
+    - rows: Number of rows to read
+    
+    Returns:
+    - Dictionary of column name -> type detected in the sample
+      (one of CSV_TYPE_OVERRIDES, or 'text' for anything else)
+    """
     try:
-        # Process based on file extension
-        if file_extension == 'csv':
-            data = pd.read_csv(uploaded_file)
-        elif file_extension in ['xlsx', 'xls']:
-            data = pd.read_excel(uploaded_file)
+        sample = pd.read_csv(open_decompressed(uploaded_file, get_upload_format(uploaded_file)[1]), nrows=rows)
+    finally:
+        uploaded_file.seek(0)
+    
+    schema = {}
+    for col in sample.columns:
+        dtype = sample[col].dtype
+        if pd.api.types.is_bool_dtype(dtype):
+            schema[col] = "boolean"
+        elif pd.api.types.is_integer_dtype(dtype):
+            schema[col] = "integer"
+        elif pd.api.types.is_float_dtype(dtype):
+            schema[col] = "float"
+        elif infer_datetime_format(sample[col]) is not None:
+            schema[col] = "datetime"
         else:
-            st.error(f"Unsupported file format: {file_extension}. Please upload a CSV or Excel file.")
-            return None
-        
-        # Sample data if specified
-        if sample_size and sample_size < len(data):
-            data = data.sample(n=sample_size, random_state=42)
-        
-        return data
+            schema[col] = "text"
+    return schema
+
+def get_csv_read_options(csv_options):
+    """
+    Turn the column choices from the sidebar into pd.read_csv arguments
     
-    except Exception as e:
-        st.error(f"Error loading file: {str(e)}")
+    Parameters:
+    - csv_options: Dictionary with optional 'columns' (list of names to
+      load) and 'dtypes' (column name -> key of CSV_TYPE_OVERRIDES)
+    
+    Returns:
+    - Dictionary with usecols, dtype and parse_dates as needed
+    """
+    if not csv_options:
+        return {}
+    
+    read_options = {}
+    columns = csv_options.get("columns")
+    if columns:
+        read_options["usecols"] = list(columns)
+    
+    dtypes, parse_dates = {}, []
+    for col, type_name in (csv_options.get("dtypes") or {}).items():
+        if columns and col not in columns:
+            continue
+        if type_name == "datetime":
+            parse_dates.append(col)
+        elif type_name in CSV_TYPE_OVERRIDES:
+            dtypes[col] = CSV_TYPE_OVERRIDES[type_name]
+    if dtypes:
+        read_options["dtype"] = dtypes
+    if parse_dates:
+        read_options["parse_dates"] = parse_dates
+    return read_options
+
+def get_csv_engine():
+    """
+    Get the CSV parser to try first
+    
+    Returns:
+    - 'pyarrow' or 'c'
+    """
+    requested = os.environ.get(CSV_ENGINE_ENV_VAR, "auto").lower()
+    if requested == "c" or not PYARROW_AVAILABLE:
+        return "c"
+    return "pyarrow"
+
+def read_csv_file(uploaded_file, compression=None, progress=None, **read_options):
+    """
+    Read a CSV file with the fastest parser that can handle it
+    
+    The PyArrow parser splits the file into blocks parsed on all cores.
+    It is stricter than the C parser (ragged rows, unusual quoting or
+    options it does not support), so on any failure the file is read
+    again with the chunked C parser.
+    
+    Parameters:
+    - uploaded_file: File object
+    - compression: Compression of the file, if any (see open_decompressed)
+    - progress: Optional callable receiving the number of rows parsed so far
+    - read_options: Extra keyword arguments for pd.read_csv
+    
+    Returns:
+    - (DataFrame, numeric sketches or None, engine name) tuple
+    """
+    if get_csv_engine() == "pyarrow":
+        if os.environ.get(CSV_DTYPE_BACKEND_ENV_VAR, "").lower() == "pyarrow":
+            read_options = {**read_options, "dtype_backend": "pyarrow"}
+        try:
+            data = pd.read_csv(open_decompressed(uploaded_file, compression), engine="pyarrow", **read_options)
+        except Exception:
+            read_options.pop("dtype_backend", None)
+        else:
+            # Same rule as the chunked reader: sketches only for more than one chunk
+            sketches = build_numeric_sketches(data, LOAD_CHUNK_ROWS) if len(data) > LOAD_CHUNK_ROWS else None
+            return convert_iso_date_columns(data), sketches, "pyarrow"
+    
+    data, sketches = read_csv_with_sketches(open_decompressed(uploaded_file, compression), progress=progress, **read_options)
+    return convert_iso_date_columns(data), sketches, "c"
+
+def convert_iso_date_columns(data):
+    """
+    Store columns of ISO 8601 dates and timestamps as datetime64
+    
+    PyArrow parses ISO dates into datetime.date objects and the C parser
+    leaves them as strings, so both are converted here and a file gets the
+    same column types whichever parser read it. As in PyArrow, a column
+    with any value that is not a valid ISO date stays as it is.
+    
+    Parameters:
+    - data: DataFrame read from a CSV file (modified in place)
+    
+    Returns:
+    - The same DataFrame
+    """
+    for col in data.columns[data.dtypes == object]:
+        values = data[col].dropna()
+        if values.empty:
+            continue
+        first = values.iat[0]
+        if isinstance(first, datetime.date):
+            data[col] = pd.to_datetime(data[col], errors="coerce")
+        elif (
+            isinstance(first, str) and ISO_DATETIME_PATTERN.fullmatch(first)
+            and values.str.fullmatch(ISO_DATETIME_PATTERN, na=False).all()
+        ):
+            try:
+                data[col] = pd.to_datetime(data[col], format="ISO8601")
+            except (ValueError, OverflowError):
+                # e.g. 2024-02-30, or timestamps with different UTC offsets
+                continue
+    return data
+
+def read_csv_with_sketches(source, chunk_rows=LOAD_CHUNK_ROWS, progress=None, **read_options):
+    """
+    Read a CSV file in chunks, building numeric column sketches on the way
+    
+    Sketches are only built when the file has more than one chunk; smaller
+    files are cheap to analyse directly. The chunks are still concatenated
+    into one frame, so the file must fit in memory: the sketches save
+    rescanning that frame, not holding it. Files larger than memory go to
+    the query backend instead (see utils.query_backend).
+    
+    Parameters:
+    - source: Path or file object
+    - chunk_rows: Rows parsed at a time
+    - progress: Optional callable receiving the number of rows parsed so far
+    - read_options: Extra keyword arguments for pd.read_csv
+    
+    Returns:
+    - (DataFrame, dictionary of column name -> NumericColumnSketch or None) tuple
+    """
+    chunks, rows = [], 0
+    sketches, excluded = {}, set()
+    with pd.read_csv(source, chunksize=chunk_rows, **read_options) as reader:
+        for chunk in reader:
+            chunks.append(chunk)
+            rows += len(chunk)
+            if len(chunks) == 2:
+                update_numeric_sketches(sketches, chunks[0], excluded)
+            if len(chunks) >= 2:
+                update_numeric_sketches(sketches, chunk, excluded)
+            if progress is not None:
+                progress(rows)
+    
+    if not chunks:
+        return pd.read_csv(source, **read_options), None
+    if len(chunks) == 1:
+        return chunks[0], None
+    data = pd.concat(chunks, ignore_index=True)
+    
+    # Chunks with different categories concatenate to object columns
+    for col, dtype in (read_options.get("dtype") or {}).items():
+        if dtype == "category" and col in data.columns and data[col].dtype != "category":
+            data[col] = data[col].astype("category")
+    
+    # Keep sketches only for columns that ended up numeric
+    sketches = {
+        col: sketch for col, sketch in sketches.items()
+        if pd.api.types.is_numeric_dtype(data[col]) and not pd.api.types.is_bool_dtype(data[col])
+    }
+    return data, sketches
+
+def set_dataset_sketches(df, sketches):
+    """
+    Remember the numeric column sketches built while loading a dataset
+    
+    Parameters:
+    - df: The loaded DataFrame
+    - sketches: Dictionary of column name -> NumericColumnSketch, or None
+    """
+    if sketches:
+        st.session_state.dataset_sketches = {"key": get_dataset_key(df), "sketches": sketches}
+    else:
+        st.session_state.pop("dataset_sketches", None)
+
+def get_dataset_sketches(df):
+    """
+    Get the numeric column sketches for a dataset, if it was loaded with them
+    
+    Transformed datasets (cleaned, filtered, sampled) are new frames and
+    have no sketches, so their statistics are always computed from the data.
+    
+    Parameters:
+    - df: Pandas DataFrame
+    
+    Returns:
+    - Dictionary of column name -> NumericColumnSketch, or None
+    """
+    entry = st.session_state.get("dataset_sketches")
+    if entry is None or df is None or entry["key"] != get_dataset_key(df):
         return None
+    return entry["sketches"]
 
 def load_sample_data():
     """
@@ -48,6 +547,7 @@ def load_sample_data():
     df = pd.DataFrame(columns=['ID', 'Date', 'Category', 'Value', 'Region'])
     return df
 
+@profiled
 def get_data_summary(df):
     """
     Get a basic summary of the dataframe
@@ -71,6 +571,44 @@ def get_data_summary(df):
     
     return summary
 
+def get_dataset_key(df):
+    """
+    Get a cheap key identifying the current dataset
+    
+    Every operation that changes the data stores a new DataFrame in
+    st.session_state.data, so identity plus shape and column names is
+    enough to tell datasets apart without hashing their contents. Identity
+    is a token issued per DataFrame object rather than id(), which Python
+    reuses once a frame is freed (e.g. after undoing a transformation).
+    
+    Parameters:
+    - df: Pandas DataFrame
+    
+    Returns:
+    - Hashable key, or None if there is no data
+    """
+    if df is None:
+        return None
+    return (_get_dataset_token(df), df.shape, tuple(df.columns))
+
+def _get_dataset_token(df):
+    frame_id = id(df)
+    with _dataset_tokens_lock:
+        entry = _dataset_tokens.get(frame_id)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+        token = next(_dataset_token_counter)
+        # The entry is dropped when the frame is garbage collected
+        ref = weakref.ref(df, lambda _, frame_id=frame_id, token=token: _release_dataset_token(frame_id, token))
+        _dataset_tokens[frame_id] = (ref, token)
+        return token
+
+def _release_dataset_token(frame_id, token):
+    with _dataset_tokens_lock:
+        entry = _dataset_tokens.get(frame_id)
+        if entry is not None and entry[1] == token:
+            del _dataset_tokens[frame_id]
+
 def validate_dataframe(df):
     """
     Validate that the dataframe is properly formatted
@@ -6,7 +6,12 @@ import plotly.graph_objects as go
 import matplotlib.pyplot as plt
 import seaborn as sns
 from io import BytesIO
+from utils.data_analysis import filter_data
+from utils.query_backend import QueryTable
+from utils.compute_service import offload
+from utils.profiler import profiled
 
+@profiled
 def create_bar_chart(df, x_column, y_column, color=None, title=None, orientation='v'):
     """
     Create a bar chart
@@ -58,6 +63,7 @@ def create_bar_chart(df, x_column, y_column, color=None, title=None, orientation
     
     return fig
 
+@profiled
 def create_line_chart(df, x_column, y_columns, title=None):
     """
     Create a line chart
@@ -100,6 +106,7 @@ def create_line_chart(df, x_column, y_columns, title=None):
     
     return fig
 
+@profiled
 def create_scatter_plot(df, x_column, y_column, color=None, size=None, title=None):
     """
     Create a scatter plot
@@ -146,6 +153,7 @@ def create_scatter_plot(df, x_column, y_column, color=None, size=None, title=Non
     
     return fig
 
+@profiled
 def create_histogram(df, column, bins=None, title=None, color=None):
     """
     Create a histogram
@@ -185,6 +193,7 @@ def create_histogram(df, column, bins=None, title=None, color=None):
     
     return fig
 
+@profiled
 def create_pie_chart(df, names_column, values_column, title=None):
     """
     Create a pie chart
@@ -220,6 +229,7 @@ def create_pie_chart(df, names_column, values_column, title=None):
     
     return fig
 
+@profiled
 def create_heatmap(df, x_column, y_column, value_column, title=None):
     """
     Create a heatmap
@@ -263,6 +273,7 @@ def create_heatmap(df, x_column, y_column, value_column, title=None):
     
     return fig
 
+@profiled
 def create_box_plot(df, x_column, y_column, color=None, title=None):
     """
     Create a box plot
@@ -304,12 +315,13 @@ def create_box_plot(df, x_column, y_column, color=None, title=None):
     
     return fig
 
+@profiled
 def create_correlation_heatmap(df, columns=None, title=None):
     """
     Create a correlation heatmap
     
     Parameters:
-    - df: Pandas DataFrame
+    - df: Pandas DataFrame or QueryTable
     - columns: List of columns to include (None for all numeric)
     - title: Optional chart title
     
@@ -320,16 +332,20 @@ def create_correlation_heatmap(df, columns=None, title=None):
         return None
     
     # Select only numeric columns if not specified
-    if columns is None:
-        numeric_df = df.select_dtypes(include=[np.number])
-    else:
-        numeric_df = df[columns].select_dtypes(include=[np.number])
+    dtypes = df.dtypes if columns is None else df.dtypes[columns]
+    numeric_columns = [
+        col for col, dtype in dtypes.items()
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+    ]
     
-    if numeric_df.shape[1] < 2:
+    if len(numeric_columns) < 2:
         return None
     
-    # Calculate correlation matrix
-    corr_matrix = numeric_df.corr()
+    # Calculate correlation matrix (in the query engine, or in a worker process for large frames)
+    if isinstance(df, QueryTable):
+        corr_matrix = df.correlation(numeric_columns)
+    else:
+        corr_matrix = offload(_correlation_matrix, df, columns=numeric_columns)
     
     # Create heatmap
     if not title:
@@ -349,3 +365,253 @@ def create_correlation_heatmap(df, columns=None, title=None):
     )
     
     return fig
+
+# Chart specs describe a chart as plain data so it can be validated, pre-aggregated and re-created
+CHART_SPEC_TYPES = ['bar', 'line', 'scatter', 'histogram', 'pie', 'heatmap', 'box', 'correlation']
+CHART_SPEC_AGGREGATIONS = ['sum', 'mean', 'median', 'count', 'min', 'max']
+
+# Upper bound on points sent to the browser for chart types that cannot be aggregated
+MAX_SCATTER_POINTS = 5000
+
+def validate_chart_spec(spec, df):
+    """
+    Validate a chart spec against a dataframe
+    
+    A chart spec is a dictionary with the keys:
+    - type: One of CHART_SPEC_TYPES
+    - x, y: Column names (y may be omitted for histogram and correlation)
+    - value: Column for heatmap cell values
+    - color: Optional column for coloring
+    - columns: Optional list of columns for a correlation matrix
+    - aggregation: One of CHART_SPEC_AGGREGATIONS (default 'sum')
+    - filters: Optional list of filters in the utils.data_analysis.filter_data format
+    - top_n: Optional number of categories to keep (largest first)
+    - bins: Optional number of histogram bins
+    - title: Optional chart title
+    
+    Parameters:
+    - spec: Chart spec dictionary
+    - df: Pandas DataFrame (or QueryTable) the chart will be built from
+    
+    Returns:
+    - Boolean indicating if the spec is valid
+    - Error message if invalid
+    """
+    if df is None or df.empty:
+        return False, "No data loaded"
+    
+    if not isinstance(spec, dict):
+        return False, "Chart spec must be an object"
+    
+    chart_type = spec.get('type')
+    if chart_type not in CHART_SPEC_TYPES:
+        return False, f"Unsupported chart type: {chart_type}"
+    
+    aggregation = spec.get('aggregation', 'sum')
+    if aggregation not in CHART_SPEC_AGGREGATIONS:
+        return False, f"Unsupported aggregation: {aggregation}"
+    
+    # Columns required by each chart type
+    required = {
+        'bar': ['x', 'y'],
+        'line': ['x', 'y'],
+        'scatter': ['x', 'y'],
+        'histogram': ['x'],
+        'pie': ['x', 'y'],
+        'heatmap': ['x', 'y', 'value'],
+        'box': ['x', 'y'],
+        'correlation': []
+    }[chart_type]
+    
+    for key in required:
+        if not spec.get(key):
+            return False, f"Chart spec is missing '{key}'"
+    
+    for key in ['x', 'y', 'value', 'color']:
+        column = spec.get(key)
+        if column is None:
+            continue
+        if not _is_column_name(column):
+            return False, f"Chart spec '{key}' must be a column name"
+        if column not in df.columns:
+            return False, f"Unknown column: {column}"
+    
+    # The aggregated column is written next to the group keys, so it cannot be one of them
+    if chart_type in ['bar', 'line', 'pie', 'heatmap']:
+        value_key = 'value' if chart_type == 'heatmap' else 'y'
+        group_keys = ['x', 'y'] if chart_type == 'heatmap' else ['x'] + (['color'] if chart_type == 'bar' else [])
+        if any(spec.get(value_key) == spec.get(key) for key in group_keys):
+            return False, f"Chart spec '{value_key}' must differ from the columns it is grouped by"
+    
+    # Plotted values must be numeric (aggregated values only when not just counted)
+    if chart_type in ['scatter', 'histogram']:
+        numeric_keys = ['x', 'y']
+    elif aggregation == 'count':
+        numeric_keys = []
+    else:
+        numeric_keys = ['value'] if chart_type == 'heatmap' else ['y']
+    for key in numeric_keys:
+        column = spec.get(key)
+        if column and not pd.api.types.is_numeric_dtype(df.dtypes[column]):
+            return False, f"Column '{column}' must be numeric"
+    
+    columns = spec.get('columns')
+    if columns is not None:
+        if not isinstance(columns, list) or any(not _is_column_name(col) or col not in df.columns for col in columns):
+            return False, "Chart spec 'columns' must be a list of existing columns"
+    
+    for filter_item in spec.get('filters') or []:
+        if not isinstance(filter_item, dict) or not _is_column_name(filter_item.get('column')) or filter_item.get('column') not in df.columns:
+            return False, f"Invalid filter: {filter_item}"
+    
+    top_n = spec.get('top_n')
+    if top_n is not None and (not isinstance(top_n, int) or isinstance(top_n, bool) or top_n < 1):
+        return False, "Chart spec 'top_n' must be a positive integer"
+    
+    bins = spec.get('bins')
+    if bins is not None and (not isinstance(bins, int) or isinstance(bins, bool) or bins < 1):
+        return False, "Chart spec 'bins' must be a positive integer"
+    
+    return True, ""
+
+def _is_column_name(value):
+    # Specs come from the LLM as JSON: a list or object here would not even be hashable
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+def aggregate_chart_data(df, spec):
+    """
+    Reduce a dataframe to the rows a chart spec actually needs
+    
+    Filters are applied first, then the data is grouped and aggregated
+    so the chart is built from a result-sized frame instead of the full data.
+    For a QueryTable the filters, grouping and binning run in the query
+    engine; chart types that need raw rows get a sample of them.
+    
+    Parameters:
+    - df: Pandas DataFrame or QueryTable
+    - spec: Validated chart spec
+    
+    Returns:
+    - DataFrame ready to be passed to the matching create_* function
+    """
+    chart_type = spec['type']
+    aggregation = spec.get('aggregation', 'sum')
+    top_n = spec.get('top_n')
+    x_column = spec.get('x')
+    y_column = spec.get('y')
+    color = spec.get('color')
+    
+    data = filter_data(df, spec.get('filters') or [])
+    
+    if chart_type in ['bar', 'pie', 'line']:
+        keys = [x_column] + ([color] if color and chart_type == 'bar' else [])
+        result = _group_and_aggregate(data, keys, y_column, aggregation)
+        if chart_type == 'line':
+            result = result.sort_values(x_column)
+        elif top_n:
+            top_keys = result.groupby(x_column, observed=True)[y_column].sum().nlargest(top_n).index
+            result = result[result[x_column].isin(top_keys)].sort_values(y_column, ascending=False)
+        else:
+            result = result.sort_values(y_column, ascending=False)
+        return result
+    
+    if chart_type == 'heatmap':
+        value_column = spec['value']
+        result = _group_and_aggregate(data, [y_column, x_column], value_column, aggregation)
+        if top_n:
+            for axis in [x_column, y_column]:
+                top_keys = result.groupby(axis, observed=True)[value_column].sum().nlargest(top_n).index
+                result = result[result[axis].isin(top_keys)]
+        return result
+    
+    if chart_type == 'histogram':
+        if isinstance(data, QueryTable):
+            counts, bin_edges = data.histogram(x_column, spec.get('bins') or 20)
+        else:
+            counts, bin_edges = np.histogram(data[x_column].dropna(), bins=spec.get('bins') or 20)
+        return pd.DataFrame({
+            x_column: [f"{bin_edges[i]:.2f}-{bin_edges[i+1]:.2f}" for i in range(len(counts))],
+            'Count': counts
+        })
+    
+    if chart_type == 'correlation' and isinstance(data, QueryTable):
+        # Correlations are computed in the query engine by create_correlation_heatmap
+        return data
+    
+    if isinstance(data, QueryTable):
+        # Raw rows are needed from here on: bring back a bounded sample
+        needed = spec.get('columns') or [col for col in [x_column, y_column, color] if col]
+        data = data.to_pandas(columns=needed, sample=MAX_SCATTER_POINTS * 10)
+    
+    if chart_type == 'box':
+        if top_n:
+            top_keys = data[x_column].value_counts().nlargest(top_n).index
+            data = data[data[x_column].isin(top_keys)]
+        return data[[col for col in [x_column, y_column, color] if col]]
+    
+    if chart_type == 'scatter':
+        data = data[[col for col in [x_column, y_column, color] if col]].dropna(subset=[x_column, y_column])
+        if len(data) > MAX_SCATTER_POINTS:
+            data = data.sample(n=MAX_SCATTER_POINTS, random_state=42)
+        return data
+    
+    # Correlation works on the filtered numeric columns
+    columns = spec.get('columns')
+    return data[columns] if columns else data
+
+def _correlation_matrix(numeric_df):
+    return numeric_df.corr()
+
+def _group_and_aggregate(data, keys, column, aggregation):
+    if isinstance(data, QueryTable):
+        return data.aggregate(keys, column, aggregation)
+    return offload(_grouped_aggregate, data, keys, column, aggregation, columns=list(dict.fromkeys(keys + [column])))
+
+def _grouped_aggregate(data, keys, column, aggregation):
+    grouped = data.groupby(keys, observed=True, sort=False)[column]
+    return (grouped.size() if aggregation == 'count' else grouped.agg(aggregation)).reset_index(name=column)
+
+@profiled
+def create_chart_from_spec(df, spec):
+    """
+    Create a chart from a chart spec through the aggregation-first path
+    
+    Parameters:
+    - df: Pandas DataFrame
+    - spec: Chart spec dictionary (see validate_chart_spec)
+    
+    Returns:
+    - Plotly figure, or None if the spec is invalid or yields no data
+    """
+    is_valid, _ = validate_chart_spec(spec, df)
+    if not is_valid:
+        return None
+    
+    data = aggregate_chart_data(df, spec)
+    if data is None or data.empty:
+        return None
+    
+    chart_type = spec['type']
+    x_column = spec.get('x')
+    y_column = spec.get('y')
+    title = spec.get('title')
+    
+    if chart_type == 'bar':
+        return create_bar_chart(data, x_column, y_column, color=spec.get('color'), title=title)
+    elif chart_type == 'line':
+        return create_line_chart(data, x_column, [y_column], title=title)
+    elif chart_type == 'scatter':
+        return create_scatter_plot(data, x_column, y_column, color=spec.get('color'), title=title)
+    elif chart_type == 'histogram':
+        # Bins are already counted, so the histogram is drawn as a bar chart of counts
+        return create_bar_chart(data, x_column, 'Count', title=title or f"Histogram: Distribution of {x_column}")
+    elif chart_type == 'pie':
+        return create_pie_chart(data, x_column, y_column, title=title)
+    elif chart_type == 'heatmap':
+        return create_heatmap(data, x_column, y_column, spec['value'], title=title)
+    elif chart_type == 'box':
+        return create_box_plot(data, x_column, y_column, color=spec.get('color'), title=title)
+    elif chart_type == 'correlation':
+        return create_correlation_heatmap(data, columns=spec.get('columns'), title=title)
+    
+    return None
@@ -0,0 +1,184 @@
+import warnings
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# Rows sampled to infer a column's datetime format
+DATETIME_SAMPLE_SIZE = 500
+
+# Share of sampled rows a format must parse to be accepted
+MIN_FORMAT_MATCH_RATE = 0.6
+
+# Failed rows listed in a parse report (the count is always exact)
+MAX_REPORTED_FAILURES = 20
+
+# Formats tried when guessing from individual values finds nothing
+FALLBACK_DATETIME_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%d/%m/%Y",
+    "%m/%d/%Y",
+    "%d-%m-%Y",
+    "%m-%d-%Y",
+    "%d.%m.%Y",
+    "%Y/%m/%d",
+    "%d %b %Y",
+    "%b %d, %Y",
+    "%Y%m%d",
+]
+
+def _sample_values(series, sample_size):
+    values = series.dropna()
+    if len(values) > sample_size:
+        values = values.sample(n=sample_size, random_state=0)
+    values = values.astype(str).str.strip()
+    return values[values != ""]
+
+def _match_rate(sample, datetime_format):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        parsed = pd.to_datetime(sample, format=datetime_format, errors="coerce")
+    return parsed.notna().mean()
+
+def infer_datetime_format(series, sample_size=DATETIME_SAMPLE_SIZE):
+    """
+    Infer a single strftime format for a column of date strings
+
+    Candidate formats are guessed from sampled values (month-first and
+    day-first) plus a list of common formats, and the one that parses
+    the most sampled rows wins.
+
+    Parameters:
+    - series: Pandas Series of strings
+    - sample_size: Number of rows to sample
+
+    Returns:
+    - Format string, or None if no format parses enough of the sample
+    """
+    sample = _sample_values(series, sample_size)
+    if sample.empty:
+        return None
+
+    candidates = []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for value in sample.drop_duplicates().head(20):
+            for dayfirst in (False, True):
+                guessed = guess_datetime_format(value, dayfirst=dayfirst)
+                if guessed and guessed not in candidates:
+                    candidates.append(guessed)
+    candidates += [fmt for fmt in FALLBACK_DATETIME_FORMATS if fmt not in candidates]
+
+    best_format, best_rate = None, 0.0
+    for candidate in candidates:
+        rate = _match_rate(sample, candidate)
+        if rate > best_rate:
+            best_format, best_rate = candidate, rate
+        if rate == 1.0:
+            break
+
+    return best_format if best_rate >= MIN_FORMAT_MATCH_RATE else None
+
+def validate_datetime_format(datetime_format):
+    """
+    Check that pandas accepts a strftime format before parsing with it
+
+    Parameters:
+    - datetime_format: strftime format string
+
+    Returns:
+    - Error message, or None if the format is valid
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            pd.to_datetime(pd.Series(["0"]), format=datetime_format, errors="coerce")
+    except ValueError as e:
+        return str(e)
+    return None
+
+def _numbers_as_text(series):
+    # 20240131 read as a number (or as 20240131.0 in a column with gaps) -> "20240131"
+    text = series.astype("string")
+    if pd.api.types.is_float_dtype(series):
+        text = text.str.replace(r"\.0$", "", regex=True)
+    return text
+
+def _parse_distinct_values(series, datetime_format):
+    # Parse each distinct string once and map the results back to the rows.
+    # pandas' own cache=True heuristic only looks at the first rows and often
+    # skips caching for date columns that repeat values across the file.
+    codes, uniques = pd.factorize(series)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if datetime_format is not None:
+            parsed_uniques = pd.to_datetime(pd.Series(uniques), format=datetime_format, errors="coerce")
+        else:
+            # No common format: let pandas infer per value (slow, but only for irregular columns)
+            parsed_uniques = pd.to_datetime(pd.Series(uniques).astype(str), format="mixed", errors="coerce")
+
+    # Missing values have code -1 and are filled with NaT
+    values = pd.api.extensions.take(parsed_uniques.array, codes, allow_fill=True)
+    return pd.Series(values, index=series.index, name=series.name)
+
+def parse_datetime_column(series, datetime_format=None):
+    """
+    Parse a column to datetimes with one explicit format
+
+    Parsing with a known format is vectorized, and each distinct string is
+    parsed only once. Values that do not match become NaT and are
+    listed in the report instead of failing the whole column. Without a
+    given or inferred format, values are parsed one by one and the column
+    is only converted if at least MIN_FORMAT_MATCH_RATE of them parse, so
+    text columns with a few date-like values are left alone.
+
+    Parameters:
+    - series: Pandas Series to convert
+    - datetime_format: Optional strftime format (inferred when None)
+
+    Returns:
+    - (parsed Series or None if the column was left unchanged, report dictionary) tuple;
+      the report's 'error' explains why a column was left unchanged
+    """
+    report = {"column": series.name, "format": datetime_format, "parsed": 0, "failed": 0, "failed_rows": [], "error": None}
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        report["parsed"] = int(series.notna().sum())
+        return series, report
+
+    if datetime_format is not None:
+        report["error"] = validate_datetime_format(datetime_format)
+        if report["error"] is not None:
+            return None, report
+
+    if datetime_format is None and not pd.api.types.is_numeric_dtype(series):
+        datetime_format = infer_datetime_format(series)
+        report["format"] = datetime_format
+
+    if pd.api.types.is_numeric_dtype(series) and datetime_format is None:
+        parsed = pd.to_datetime(series, errors="coerce")
+    elif pd.api.types.is_numeric_dtype(series):
+        # e.g. 20240131 with %Y%m%d
+        parsed = _parse_distinct_values(_numbers_as_text(series), datetime_format)
+    else:
+        parsed = _parse_distinct_values(series, datetime_format)
+
+    failed = parsed.isna() & series.notna()
+    report["parsed"] = int(parsed.notna().sum())
+    report["failed"] = int(failed.sum())
+    report["failed_rows"] = [
+        {"row": index, "value": value}
+        for index, value in series[failed].head(MAX_REPORTED_FAILURES).items()
+    ]
+
+    if report["parsed"] == 0:
+        report["error"] = "no values could be parsed as dates"
+        return None, report
+
+    # Per-value parsing accepts almost anything date-like; require most values to be dates
+    if datetime_format is None and not pd.api.types.is_numeric_dtype(series):
+        present = int(series.notna().sum())
+        if report["parsed"] < MIN_FORMAT_MATCH_RATE * present:
+            report["error"] = f"only {report['parsed']:,} of {present:,} values look like dates"
+            return None, report
+    return parsed, report
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import openpyxl
+except ImportError:  # pandas then reports the missing engine when reading xlsx
+    openpyxl = None
+
+# pandas can read every Excel format through calamine (Rust) when python-calamine is installed
+try:
+    import python_calamine  # noqa: F401
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+def get_excel_engine(file_extension):
+    """
+    Pick the fastest available engine for an Excel file
+
+    Parameters:
+    - file_extension: 'xlsx' or 'xls'
+
+    Returns:
+    - 'calamine', 'openpyxl' (streamed in read-only mode) or None (pandas' default)
+    """
+    if CALAMINE_AVAILABLE:
+        return "calamine"
+    if file_extension == "xlsx" and openpyxl is not None:
+        return "openpyxl"
+    return None
+
+def get_excel_layout(uploaded_file, file_extension):
+    """
+    List the sheets of a workbook and their header rows without parsing any data
+
+    Parameters:
+    - uploaded_file: The uploaded file object
+    - file_extension: 'xlsx' or 'xls'
+
+    Returns:
+    - Dictionary of sheet name -> list of column names
+    """
+    uploaded_file.seek(0)
+    with pd.ExcelFile(uploaded_file, engine=get_excel_engine(file_extension)) as workbook:
+        layout = {
+            sheet: [str(col) for col in workbook.parse(sheet, nrows=0).columns]
+            for sheet in workbook.sheet_names
+        }
+    uploaded_file.seek(0)
+    return layout
+
+def read_excel(uploaded_file, file_extension, sheet_name=0, columns=None, skip_rows=0, max_rows=None):
+    """
+    Read one sheet of a workbook, decoding only the requested cells where possible
+
+    Parameters:
+    - uploaded_file: The uploaded file object
+    - file_extension: 'xlsx' or 'xls'
+    - sheet_name: Sheet name or position
+    - columns: Optional list of column names to keep
+    - skip_rows: Data rows to skip after the header
+    - max_rows: Optional number of data rows to read
+
+    Returns:
+    - DataFrame with the selected cells
+    """
+    engine = get_excel_engine(file_extension)
+    uploaded_file.seek(0)
+    if engine == "openpyxl":
+        return _read_xlsx_streaming(uploaded_file, sheet_name, columns, skip_rows, max_rows)
+
+    return pd.read_excel(
+        uploaded_file,
+        sheet_name=sheet_name,
+        engine=engine,
+        usecols=columns,
+        skiprows=range(1, skip_rows + 1) if skip_rows else None,
+        nrows=max_rows
+    )
+
+def _read_xlsx_streaming(uploaded_file, sheet_name, columns, skip_rows, max_rows):
+    # Read-only openpyxl streams the sheet XML row by row, so rows after max_row
+    # are never parsed. It converts every cell of a parsed row either way, so
+    # whole rows are read and trimmed like pd.read_excel before selecting columns.
+    workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook[sheet_name] if isinstance(sheet_name, str) else workbook.worksheets[sheet_name]
+        header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), None)
+        if header is None:
+            return pd.DataFrame()
+
+        first_row = 2 + skip_rows
+        rows = list(sheet.iter_rows(
+            min_row=first_row,
+            max_row=first_row + max_rows - 1 if max_rows else None,
+            values_only=True
+        ))
+    finally:
+        workbook.close()
+
+    # Sheets often carry formatted but empty rows at the end
+    while rows and all(value is None for value in rows[-1]):
+        rows.pop()
+
+    # Columns with neither a header nor any value are formatting; the rest is
+    # kept (unnamed if need be), as in pd.read_excel
+    width = max(
+        (i + 1 for row in [header] + rows for i, value in enumerate(row) if value is not None),
+        default=0
+    )
+    names = _header_names((list(header) + [None] * width)[:width])
+    if columns:
+        positions = [i for i, name in enumerate(names) if name in columns or str(name) in columns]
+        if not positions:
+            return pd.DataFrame()
+    else:
+        positions = list(range(width))
+    rows = [tuple(row[i] if i < len(row) else None for i in positions) for row in rows]
+
+    data = pd.DataFrame.from_records(rows, columns=[names[position] for position in positions]).infer_objects()
+    # Empty cells are NaN in pd.read_excel, not None (and a column of empty cells is float)
+    for col in data.columns[data.dtypes == object]:
+        present = data[col].notna()
+        if present.all():
+            continue
+        data[col] = data[col].where(present, np.nan) if present.any() else data[col].astype(float)
+    return data
+
+def _header_names(header):
+    return _dedup_names(
+        [f"Unnamed: {i}" if name is None else name for i, name in enumerate(header)],
+        {i for i, name in enumerate(header) if name is None}
+    )
+
+def _dedup_names(names, unnamed):
+    # Same renaming as pd.read_excel: repeats get .1, .2, ... skipping names used anywhere
+    # in the header, and unnamed columns are numbered last
+    names = list(names)
+    counts = {}
+    order = [i for i in range(len(names)) if i not in unnamed] + sorted(unnamed)
+    for i in order:
+        name = original = names[i]
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[original] = count + 1
+            name = f"{original}.{count}"
+            count = count + 1 if name in names else counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+    return names
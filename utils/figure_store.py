@@ -0,0 +1,114 @@
+import zlib
+import uuid
+import threading
+from collections import OrderedDict
+import plotly.io as pio
+import streamlit as st
+
+# Per-session budget for stored chart payloads (compressed bytes)
+MAX_SESSION_VISUALIZATION_BYTES = 25 * 1024 * 1024
+
+# Number of decoded figures kept in the process-wide cache
+FIGURE_CACHE_SIZE = 32
+
+_figure_cache = OrderedDict()
+_figure_cache_lock = threading.Lock()
+
+def _encode_figure(fig):
+    return zlib.compress(fig.to_json().encode("utf-8"), 1)
+
+def add_visualization(fig, viz_type, title, spec=None):
+    """
+    Save a chart to the session's visualization list in compact form
+
+    The figure is stored as compressed Plotly JSON instead of a live Figure
+    object, alongside its chart spec when one is available. The oldest
+    entries are evicted when the session exceeds its storage budget.
+
+    Parameters:
+    - fig: Plotly figure
+    - viz_type: Short chart type label (e.g. 'bar')
+    - title: Chart title
+    - spec: Optional chart spec the figure was built from
+
+    Returns:
+    - Number of older visualizations evicted to stay within the budget
+    """
+    if "visualizations" not in st.session_state:
+        st.session_state.visualizations = []
+
+    payload = _encode_figure(fig)
+    entry = {
+        "id": uuid.uuid4().hex,
+        "type": viz_type,
+        "title": title,
+        "spec": spec,
+        "figure_json": payload,
+        "size": len(payload)
+    }
+    visualizations = st.session_state.visualizations
+    visualizations.append(entry)
+
+    # Keep the decoded figure warm so the first render does not need to decode it
+    _cache_figure(entry["id"], fig)
+
+    evicted = 0
+    total = sum(viz["size"] for viz in visualizations)
+    while total > MAX_SESSION_VISUALIZATION_BYTES and len(visualizations) > 1:
+        oldest = visualizations.pop(0)
+        total -= oldest["size"]
+        _drop_cached_figure(oldest["id"])
+        evicted += 1
+    return evicted
+
+def get_figure(entry):
+    """
+    Get the Plotly figure for a saved visualization
+
+    Parameters:
+    - entry: Visualization entry from st.session_state.visualizations
+
+    Returns:
+    - Plotly figure
+    """
+    with _figure_cache_lock:
+        fig = _figure_cache.get(entry["id"])
+        if fig is not None:
+            _figure_cache.move_to_end(entry["id"])
+            return fig
+
+    fig = pio.from_json(zlib.decompress(entry["figure_json"]).decode("utf-8"))
+    _cache_figure(entry["id"], fig)
+    return fig
+
+def remove_visualization(viz_id):
+    """
+    Remove a saved visualization by id
+
+    Parameters:
+    - viz_id: Id of the visualization entry
+    """
+    st.session_state.visualizations = [
+        viz for viz in st.session_state.visualizations if viz["id"] != viz_id
+    ]
+    _drop_cached_figure(viz_id)
+
+def get_visualization_storage_bytes():
+    """
+    Get the number of bytes used by the session's saved visualizations
+
+    Returns:
+    - Total stored size in bytes
+    """
+    return sum(viz["size"] for viz in st.session_state.get("visualizations", []))
+
+def _cache_figure(viz_id, fig):
+    with _figure_cache_lock:
+        _figure_cache[viz_id] = fig
+        _figure_cache.move_to_end(viz_id)
+        while len(_figure_cache) > FIGURE_CACHE_SIZE:
+            _figure_cache.popitem(last=False)
+
+def _drop_cached_figure(viz_id):
+    with _figure_cache_lock:
+        _figure_cache.pop(viz_id, None)
@@ -0,0 +1,219 @@
+import io
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.data_loader import read_upload, get_upload_size
+
+# Uploads parsed at the same time across all sessions; parsers release the GIL
+INGESTION_WORKERS = int(os.environ.get("CORPCHAT_INGESTION_WORKERS", 2))
+
+# Finished jobs nobody picked up (e.g. the tab was closed) are dropped after this long
+LOAD_JOB_TTL_SECONDS = 3600
+
+# Process-wide worker pool and job registry shared by every Streamlit session
+_executor = None
+_executor_lock = threading.Lock()
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+class LoadCancelled(Exception):
+    """Raised inside a load job's reader when the job is cancelled"""
+
+class UploadReader(io.RawIOBase):
+    """
+    Private read cursor over an uploaded file's bytes that counts what is read
+
+    The worker gets its own position (the sidebar keeps seeking the upload
+    to sniff it on reruns) without copying the data, and every read is
+    counted for the progress bar and checked for cancellation.
+    """
+
+    def __init__(self, uploaded_file, job):
+        super().__init__()
+        uploaded_file.seek(0)
+        self._buffer = uploaded_file.getbuffer()
+        self._position = 0
+        self._job = job
+        self.name = uploaded_file.name
+        self.size = len(self._buffer)
+        self.file_id = getattr(uploaded_file, "file_id", uploaded_file.name)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._position = max(0, offset)
+        return self._position
+
+    def _advance(self, size):
+        if self._job.cancel_requested:
+            raise LoadCancelled("Loading was cancelled")
+        start = min(self._position, self.size)
+        end = self.size if size is None or size < 0 else min(start + size, self.size)
+        self._position = end
+        self._job.bytes_read = max(self._job.bytes_read, end)
+        return self._buffer[start:end]
+
+    def read(self, size=-1):
+        return bytes(self._advance(size))
+
+    def readall(self):
+        return self.read()
+
+    def readinto(self, buffer):
+        chunk = self._advance(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def getbuffer(self):
+        # Columnar files are read zero-copy from the buffer (see utils.columnar_reader)
+        return self._buffer
+
+class LoadJob:
+    """
+    One upload being read in the background
+
+    The worker thread updates bytes_read and rows_parsed as it goes; the
+    sidebar polls them through progress() and picks up the result once
+    the job is done.
+    """
+
+    def __init__(self, file_name, total_bytes):
+        self.job_id = uuid.uuid4().hex
+        self.file_name = file_name
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.rows_parsed = 0
+        self.cancel_requested = False
+        self.started = time.monotonic()
+        self.finished = None
+        self.future = None
+
+    @property
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def set_rows_parsed(self, rows):
+        self.rows_parsed = rows
+
+    def cancel(self):
+        """
+        Ask the job to stop at its next read
+        """
+        self.cancel_requested = True
+        if self.future is not None:
+            self.future.cancel()
+
+    def progress(self):
+        """
+        Snapshot of the job's progress
+
+        Returns:
+        - Dictionary with bytes_read, total_bytes, fraction, rows_parsed,
+          elapsed and eta (seconds, None until it can be estimated)
+        """
+        elapsed = (self.finished or time.monotonic()) - self.started
+        fraction = min(self.bytes_read / self.total_bytes, 1.0) if self.total_bytes else 0.0
+        eta = None
+        if self.done:
+            eta = 0.0
+        elif 0 < fraction < 1:
+            eta = elapsed * (1 - fraction) / fraction
+        return {
+            "bytes_read": self.bytes_read,
+            "total_bytes": self.total_bytes,
+            "fraction": fraction,
+            "rows_parsed": self.rows_parsed,
+            "elapsed": elapsed,
+            "eta": eta
+        }
+
+    def result(self):
+        """
+        Get the result of a finished job
+
+        Returns:
+        - Dictionary returned by utils.data_loader.read_upload
+
+        Raises:
+        - The exception the read failed with (LoadCancelled if cancelled)
+        """
+        if self.future.cancelled():
+            raise LoadCancelled("Loading was cancelled")
+        return self.future.result()
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=INGESTION_WORKERS, thread_name_prefix="corpchat-ingest")
+    return _executor
+
+def _run_load_job(job, reader, options):
+    try:
+        result = read_upload(reader, progress=job.set_rows_parsed, **options)
+        # The PyArrow parsers only report rows at the end
+        job.rows_parsed = len(result["data"])
+        return result
+    finally:
+        job.finished = time.monotonic()
+
+def _drop_expired_jobs():
+    now = time.monotonic()
+    with _jobs_lock:
+        for job_id, job in list(_jobs.items()):
+            if job.finished is not None and now - job.finished > LOAD_JOB_TTL_SECONDS:
+                del _jobs[job_id]
+
+def submit_load(uploaded_file, **options):
+    """
+    Start reading an upload in the background
+
+    Parameters:
+    - uploaded_file: The uploaded file object (kept in memory by Streamlit)
+    - options: sample_size, excel_options, csv_options and columnar_options
+      as for utils.data_loader.load_file
+
+    Returns:
+    - LoadJob, also registered under its job_id for get_load_job
+    """
+    _drop_expired_jobs()
+    job = LoadJob(uploaded_file.name, get_upload_size(uploaded_file))
+    reader = UploadReader(uploaded_file, job)
+    with _jobs_lock:
+        _jobs[job.job_id] = job
+    job.future = _get_executor().submit(_run_load_job, job, reader, options)
+    return job
+
+def get_load_job(job_id):
+    """
+    Look up a load job by id (from any session, e.g. after a browser refresh)
+
+    Returns:
+    - LoadJob, or None if it is unknown or was already picked up
+    """
+    if not job_id:
+        return None
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+def discard_load_job(job_id):
+    """
+    Forget a load job once its result has been attached (or abandoned)
+    """
+    with _jobs_lock:
+        job = _jobs.pop(job_id, None)
+    if job is not None and not job.done:
+        job.cancel()
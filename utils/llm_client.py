@@ -0,0 +1,175 @@
+import os
+import queue
+import asyncio
+import threading
+import httpx
+from openai import AsyncOpenAI
+
+# Default model used by the chat assistant
+DEFAULT_MODEL = "gpt-4o"
+
+# Process-wide clients and event loop shared by every Streamlit session
+_clients = {}
+_clients_lock = threading.Lock()
+_loop = None
+_loop_lock = threading.Lock()
+
+# Sentinel pushed onto the chunk queue when a stream finishes
+_STREAM_DONE = object()
+
+def get_client_settings():
+    """
+    Read connection settings for the OpenAI client from the environment
+
+    Returns:
+    - Dictionary with base URL, timeouts, retries and pool limits
+    """
+    return {
+        # OPENAI_BASE_URL lets the app talk to any OpenAI-compatible server (e.g. a local stub)
+        'base_url': os.environ.get("OPENAI_BASE_URL") or None,
+        'connect_timeout': float(os.environ.get("OPENAI_CONNECT_TIMEOUT", 5.0)),
+        'read_timeout': float(os.environ.get("OPENAI_READ_TIMEOUT", 60.0)),
+        'max_retries': int(os.environ.get("OPENAI_MAX_RETRIES", 2)),
+        'max_connections': int(os.environ.get("OPENAI_MAX_CONNECTIONS", 20)),
+        'max_keepalive_connections': int(os.environ.get("OPENAI_MAX_KEEPALIVE", 10)),
+    }
+
+def _build_timeout(settings):
+    return httpx.Timeout(settings['read_timeout'], connect=settings['connect_timeout'])
+
+def _build_limits(settings):
+    return httpx.Limits(
+        max_connections=settings['max_connections'],
+        max_keepalive_connections=settings['max_keepalive_connections']
+    )
+
+def _client_key(kind):
+    api_key = os.environ.get("OPENAI_API_KEY", "")
+    settings = get_client_settings()
+    return (kind, api_key, tuple(sorted(settings.items())))
+
+def get_async_openai_client():
+    """
+    Get the process-wide asynchronous OpenAI client
+
+    The client is bound to the shared background event loop returned by
+    get_event_loop() and must only be used from coroutines running on it.
+
+    Returns:
+    - AsyncOpenAI client
+    """
+    key = _client_key("async")
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            settings = get_client_settings()
+            client = AsyncOpenAI(
+                base_url=settings['base_url'],
+                timeout=_build_timeout(settings),
+                max_retries=settings['max_retries'],
+                http_client=httpx.AsyncClient(limits=_build_limits(settings), timeout=_build_timeout(settings))
+            )
+            _clients[key] = client
+    return client
+
+def get_event_loop():
+    """
+    Get the background asyncio event loop used for streaming requests
+
+    The loop runs in a daemon thread for the lifetime of the process.
+
+    Returns:
+    - asyncio event loop
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="openai-event-loop", daemon=True)
+            thread.start()
+    return _loop
+
+async def _produce_chunks(messages, model, chunk_queue):
+    """
+    Stream a chat completion and push text deltas onto a thread-safe queue
+    """
+    client = get_async_openai_client()
+    stream = None
+    try:
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                chunk_queue.put(chunk.choices[0].delta.content)
+    except Exception as e:
+        chunk_queue.put(e)
+    finally:
+        # Closing the stream releases the pooled connection straight away on cancel
+        if stream is not None:
+            await stream.close()
+        chunk_queue.put(_STREAM_DONE)
+
+class ChatStream:
+    """
+    Iterator over the text chunks of a streamed chat completion
+
+    The request runs on the shared background event loop, so the script
+    thread only waits on a queue and the response can be cancelled at any
+    point with cancel(). Iteration yields None whenever no chunk arrived
+    within poll_interval seconds, which gives the caller a chance to
+    refresh the UI while a slow response is pending.
+    """
+
+    def __init__(self, messages, model=DEFAULT_MODEL, poll_interval=0.25):
+        self._queue = queue.Queue()
+        self._poll_interval = poll_interval
+        self._future = asyncio.run_coroutine_threadsafe(
+            _produce_chunks(messages, model, self._queue),
+            get_event_loop()
+        )
+        self.finished = False
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.finished:
+            raise StopIteration
+        try:
+            item = self._queue.get(timeout=self._poll_interval)
+        except queue.Empty:
+            return None
+        if item is _STREAM_DONE:
+            self.finished = True
+            raise StopIteration
+        if isinstance(item, Exception):
+            self.finished = True
+            raise item
+        return item
+
+    def cancel(self):
+        """
+        Cancel the underlying request if it is still running
+        """
+        if not self.finished:
+            self.cancelled = True
+            self.finished = True
+            self._future.cancel()
+
+def stream_chat_completion(messages, model=DEFAULT_MODEL, poll_interval=0.25):
+    """
+    Start a streamed chat completion through the shared async client
+
+    Parameters:
+    - messages: List of chat messages in OpenAI format
+    - model: Model name to use
+    - poll_interval: Seconds to wait for a chunk before yielding None
+
+    Returns:
+    - ChatStream yielding text chunks (or None while waiting)
+    """
+    return ChatStream(messages, model=model, poll_interval=poll_interval)
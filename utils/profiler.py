@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import uuid
+import threading
+import functools
+import tracemalloc
+from contextlib import contextmanager
+import pandas as pd
+import streamlit as st
+from utils.compute_service import get_compute_metrics
+
+# Profiling is opt-in: set CORPCHAT_PROFILE=1 or open the app with ?profile=1
+PROFILE_ENV_VAR = "CORPCHAT_PROFILE"
+# Optional JSON lines file that receives every profiled section and rerun summary
+PROFILE_LOG_ENV_VAR = "CORPCHAT_PROFILE_LOG"
+# Set CORPCHAT_PROFILE_MEMORY=0 to skip tracemalloc (it slows Python code down noticeably);
+# memory is only traced when profiling is enabled for the whole process through CORPCHAT_PROFILE
+PROFILE_MEMORY_ENV_VAR = "CORPCHAT_PROFILE_MEMORY"
+
+# Number of rerun profiles kept per session for the timing panel
+PROFILE_HISTORY_SIZE = 20
+
+# Each Streamlit session runs its script in its own thread
+_state = threading.local()
+_log_lock = threading.Lock()
+
+def is_profiling_enabled():
+    """
+    Check whether rerun profiling is switched on for this run
+
+    Returns:
+    - Boolean
+    """
+    if _profiling_env_enabled():
+        return True
+    try:
+        return st.query_params.get("profile") == "1"
+    except Exception:
+        return False
+
+def _profiling_env_enabled():
+    return os.environ.get(PROFILE_ENV_VAR, "").lower() in ("1", "true", "yes")
+
+def _memory_enabled():
+    # tracemalloc slows down every session, so a query parameter alone never starts it
+    return _profiling_env_enabled() and os.environ.get(PROFILE_MEMORY_ENV_VAR, "1").lower() not in ("0", "false", "no")
+
+def _current_memory():
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return None
+
+def _memory_delta_kb(memory_start):
+    memory_end = _current_memory()
+    if memory_start is None or memory_end is None:
+        return None
+    return round((memory_end - memory_start) / 1024, 1)
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx is not None else None
+    except Exception:
+        return None
+
+def _count_rows(args, kwargs):
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, pd.DataFrame):
+            return len(value)
+    return None
+
+def start_rerun(label=None):
+    """
+    Start collecting timings for the current script run
+
+    Call once at the top of the app script. Does nothing unless profiling is enabled.
+
+    Parameters:
+    - label: Optional label for the run (e.g. the active tab)
+    """
+    if not is_profiling_enabled():
+        _state.profile = None
+        return
+
+    # tracemalloc is process-wide, so memory deltas include allocations by concurrent sessions
+    if _memory_enabled() and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    _state.profile = {
+        "rerun_id": uuid.uuid4().hex[:12],
+        "session_id": _session_id(),
+        "timestamp": time.time(),
+        "label": label,
+        "start": time.perf_counter(),
+        "memory_start": _current_memory(),
+        "depth": 0,
+        "records": []
+    }
+
+@contextmanager
+def profile_section(name, rows=None):
+    """
+    Time a block of code as a named section of the current rerun
+
+    Parameters:
+    - name: Section name
+    - rows: Optional number of rows the section processes
+    """
+    profile = getattr(_state, "profile", None)
+    if profile is None:
+        yield
+        return
+
+    # Append on entry so nested sections are listed under their parent
+    depth = profile["depth"]
+    record = {"name": name, "depth": depth, "wall_ms": None, "memory_delta_kb": None, "rows": rows}
+    profile["records"].append(record)
+    profile["depth"] += 1
+    memory_start = _current_memory()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile["depth"] = depth
+        record["wall_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        record["memory_delta_kb"] = _memory_delta_kb(memory_start)
+
+def profiled(func=None, name=None):
+    """
+    Decorator that records a function as a profiled section
+
+    When profiling is off the wrapper only checks a thread-local and calls
+    through. Rows are taken from the first DataFrame argument.
+
+    Parameters:
+    - func: Function to wrap
+    - name: Optional section name (defaults to module.function)
+    """
+    if func is None:
+        return lambda f: profiled(f, name=name)
+
+    section_name = name or f"{func.__module__.split('.')[-1]}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_state, "profile", None) is None:
+            return func(*args, **kwargs)
+        with profile_section(section_name, rows=_count_rows(args, kwargs)):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+def finish_rerun(rows=None):
+    """
+    Finish the current rerun profile, store it in the session and export it
+
+    Parameters:
+    - rows: Optional number of rows in the current dataset
+
+    Returns:
+    - The finished profile dictionary, or None if profiling is off
+    """
+    profile = getattr(_state, "profile", None)
+    if profile is None:
+        return None
+    _state.profile = None
+
+    summary = {
+        "rerun_id": profile["rerun_id"],
+        "session_id": profile["session_id"],
+        "timestamp": profile["timestamp"],
+        "label": profile["label"],
+        "wall_ms": round((time.perf_counter() - profile["start"]) * 1000, 3),
+        "memory_delta_kb": _memory_delta_kb(profile["memory_start"]),
+        "rows": rows,
+        "sections": profile["records"]
+    }
+
+    if "profiler_history" not in st.session_state:
+        st.session_state.profiler_history = []
+    st.session_state.profiler_history.append(summary)
+    del st.session_state.profiler_history[:-PROFILE_HISTORY_SIZE]
+
+    log_path = os.environ.get(PROFILE_LOG_ENV_VAR)
+    if log_path:
+        _write_jsonl(log_path, summary)
+
+    return summary
+
+def _write_jsonl(log_path, summary):
+    base = {key: summary[key] for key in ["rerun_id", "session_id", "timestamp", "label"]}
+    lines = [
+        json.dumps({**base, "type": "section", **record}, default=str)
+        for record in summary["sections"]
+    ]
+    lines.append(json.dumps({
+        **base,
+        "type": "rerun",
+        "wall_ms": summary["wall_ms"],
+        "memory_delta_kb": summary["memory_delta_kb"],
+        "rows": summary["rows"]
+    }, default=str))
+    with _log_lock:
+        with open(log_path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+def render_profiler_panel():
+    """
+    Render a collapsible timing panel for the most recent reruns
+    """
+    if not is_profiling_enabled():
+        # Reruns recorded before profiling was switched off are dropped, not shown as current
+        st.session_state.pop("profiler_history", None)
+        return
+
+    history = st.session_state.get("profiler_history")
+    if not history:
+        return
+
+    latest = history[-1]
+    with st.expander(f"Rerun profile: {latest['wall_ms']:.0f} ms ({latest['label']})", expanded=False):
+        if latest["sections"]:
+            sections = pd.DataFrame(latest["sections"])
+            sections["name"] = sections.apply(lambda row: "    " * row["depth"] + row["name"], axis=1)
+            st.dataframe(
+                sections[["name", "wall_ms", "memory_delta_kb", "rows"]],
+                use_container_width=True,
+                hide_index=True
+            )
+        memory = "not traced" if latest["memory_delta_kb"] is None else f"{latest['memory_delta_kb']:.1f} KB"
+        st.caption(f"Total {latest['wall_ms']:.1f} ms, memory delta {memory}, rows {latest['rows']}")
+
+        st.write("Recent reruns:")
+        st.dataframe(
+            pd.DataFrame([
+                {"label": run["label"], "wall_ms": run["wall_ms"], "memory_delta_kb": run["memory_delta_kb"], "rows": run["rows"]}
+                for run in reversed(history)
+            ]),
+            use_container_width=True,
+            hide_index=True
+        )
+
+        # Process-wide: shared by every session
+        compute = get_compute_metrics()
+        if compute["submitted"]:
+            st.caption(
+                f"Compute workers ({compute['workers']}): {compute['queued']} queued, {compute['running']} running, "
+                f"{compute['completed']} completed, {compute['failed']} failed, {compute['timed_out']} timed out, "
+                f"{compute['inline_fallbacks']} run inline"
+            )
+        if compute["avg_run_ms"] is not None:
+            st.caption(f"Average worker wait {compute['avg_wait_ms']:.0f} ms, run {compute['avg_run_ms']:.0f} ms")
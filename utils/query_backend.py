@@ -0,0 +1,311 @@
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # Optional: large uploads stay in pandas without it
+    duckdb = None
+
+# Set to "duckdb" to keep large CSV uploads in a local on-disk query engine
+QUERY_BACKEND_ENV_VAR = "CORPCHAT_QUERY_BACKEND"
+
+# Uploads at least this large go to the query engine when it is enabled
+QUERY_BACKEND_MIN_BYTES = 100 * 1024 * 1024
+
+# Rows of a query-engine dataset loaded into pandas for the preview and chat
+QUERY_PREVIEW_ROWS = 100_000
+
+# Largest query result that is brought back into pandas as a full dataset
+MAX_RESULT_ROWS = 1_000_000
+
+# Filter operators (see utils.data_analysis.filter_data) -> SQL with ? placeholders
+FILTER_SQL = {
+    "equals": "{column} = ?",
+    "not_equals": "({column} <> ? OR {column} IS NULL)",
+    "greater_than": "{column} > ?",
+    "less_than": "{column} < ?",
+    "contains": "regexp_matches(CAST({column} AS VARCHAR), ?)",
+    "starts_with": "starts_with(CAST({column} AS VARCHAR), ?)",
+    "ends_with": "suffix(CAST({column} AS VARCHAR), ?)",
+    "in_range": "{column} BETWEEN ? AND ?",
+}
+
+# Chart spec aggregations -> SQL aggregate expressions
+AGGREGATION_SQL = {
+    "sum": "coalesce(sum({column}), 0)",
+    "mean": "avg({column})",
+    "median": "median({column})",
+    "min": "min({column})",
+    "max": "max({column})",
+    "count": "count(*)",
+}
+
+def is_query_backend_enabled():
+    """
+    Check whether large uploads should go to the query engine
+
+    Returns:
+    - True if DuckDB is installed and CORPCHAT_QUERY_BACKEND=duckdb
+    """
+    return duckdb is not None and os.environ.get(QUERY_BACKEND_ENV_VAR, "").lower() == "duckdb"
+
+def quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _to_parameter(value):
+    # DuckDB binds plain Python values; NumPy scalars and Timestamps are converted
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _drop_database(connection, directory):
+    try:
+        connection.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+class QueryTable:
+    """
+    A dataset kept in a local DuckDB database file instead of in memory
+
+    Filtering returns another QueryTable (a query over the same database),
+    and statistics, distributions and chart aggregations run as SQL, so
+    only result-sized frames come back to pandas. The database lives in
+    a temporary directory that is removed when the table is garbage
+    collected.
+    """
+
+    def __init__(self, connection, sql, params=(), base=None):
+        self._connection = connection
+        self._lock = base._lock if base is not None else threading.Lock()
+        self._base = base
+        self.sql = sql
+        self.params = list(params)
+        self._length = None
+
+        empty = self._fetch_df(f"SELECT * FROM ({sql}) LIMIT 0", self.params)
+        self.columns = empty.columns
+        self.dtypes = empty.dtypes
+
+    @classmethod
+    def from_upload(cls, uploaded_file, read_options=None, columns=None):
+        """
+        Copy an uploaded CSV file into a new on-disk database
+
+        Parameters:
+        - uploaded_file: Binary file object (e.g. a decompressing stream) read from its current position
+        - read_options: Optional dictionary of extra read_csv_auto options
+        - columns: Optional list of columns to keep (the others are never stored)
+
+        Returns:
+        - QueryTable over the whole file
+        """
+        if duckdb is None:
+            raise RuntimeError("The DuckDB query backend is not installed")
+
+        directory = tempfile.mkdtemp(prefix="corpchat_query_")
+        try:
+            csv_path = os.path.join(directory, "upload.csv")
+            with open(csv_path, "wb") as f:
+                shutil.copyfileobj(uploaded_file, f, length=8 * 1024 * 1024)
+
+            connection = duckdb.connect(os.path.join(directory, "data.duckdb"))
+            options = "".join(
+                f", {name} = {value!r}" for name, value in (read_options or {}).items()
+            )
+            literal_path = csv_path.replace("'", "''")
+            select = ", ".join(quote_identifier(col) for col in columns) if columns else "*"
+            connection.execute(f"CREATE TABLE data AS SELECT {select} FROM read_csv_auto('{literal_path}'{options})")
+            os.remove(csv_path)
+        except Exception:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+
+        table = cls(connection, "SELECT * FROM data")
+        weakref.finalize(table, _drop_database, connection, directory)
+        return table
+
+    def _fetch_df(self, sql, params=()):
+        with self._lock:
+            return self._connection.execute(sql, [_to_parameter(p) for p in params]).df()
+
+    def _fetch_one(self, sql, params=()):
+        with self._lock:
+            return self._connection.execute(sql, [_to_parameter(p) for p in params]).fetchone()
+
+    def _derive(self, sql, params):
+        return QueryTable(self._connection, sql, params, base=self._base if self._base is not None else self)
+
+    def __len__(self):
+        if self._length is None:
+            self._length = int(self._fetch_one(f"SELECT count(*) FROM ({self.sql})", self.params)[0])
+        return self._length
+
+    @property
+    def empty(self):
+        return len(self) == 0 or len(self.columns) == 0
+
+    def where(self, filters):
+        """
+        Filter rows with conditions in the filter_data format
+
+        Parameters:
+        - filters: List of dictionaries with column, operator and value
+
+        Returns:
+        - New QueryTable
+        """
+        clauses, params = [], list(self.params)
+        for filter_item in filters:
+            column = filter_item.get('column')
+            operator = filter_item.get('operator')
+            value = filter_item.get('value')
+            if not column or operator not in FILTER_SQL or value is None:
+                continue
+            if operator == "in_range":
+                if not (isinstance(value, (list, tuple)) and len(value) == 2):
+                    continue
+                params += list(value)
+            elif operator in ["contains", "starts_with", "ends_with"]:
+                params.append(str(value))
+            else:
+                params.append(value)
+            clauses.append(FILTER_SQL[operator].format(column=quote_identifier(column)))
+
+        if not clauses:
+            return self
+        return self._derive(f"SELECT * FROM ({self.sql}) WHERE " + " AND ".join(clauses), params)
+
+    def head(self, n=5):
+        return self.to_pandas(limit=n)
+
+    def to_pandas(self, columns=None, limit=None, sample=None):
+        """
+        Bring rows back into pandas
+
+        Parameters:
+        - columns: Optional list of columns to keep
+        - limit: Optional number of leading rows
+        - sample: Optional number of randomly sampled rows
+
+        Returns:
+        - Pandas DataFrame
+        """
+        select = ", ".join(quote_identifier(col) for col in columns) if columns else "*"
+        sql = f"SELECT {select} FROM ({self.sql})"
+        if sample is not None:
+            sql += f" USING SAMPLE reservoir({int(sample)} ROWS) REPEATABLE (42)"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self._fetch_df(sql, self.params)
+
+    def value_counts(self, column, limit=None):
+        """
+        Count the non-missing values of a column, most frequent first
+
+        Returns:
+        - (DataFrame with column, Count and Percentage, number of distinct values) tuple
+        """
+        name = quote_identifier(column)
+        sql = (
+            f"SELECT {name}, count(*) AS Count, "
+            f"round(count(*) * 100.0 / sum(count(*)) OVER (), 2) AS Percentage "
+            f"FROM ({self.sql}) WHERE {name} IS NOT NULL GROUP BY {name} ORDER BY Count DESC, {name}"
+        )
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        counts = self._fetch_df(sql, self.params)
+        distinct = self._fetch_one(f"SELECT count(DISTINCT {name}) FROM ({self.sql})", self.params)[0]
+        return counts, int(distinct)
+
+    def describe(self, columns):
+        """
+        Basic statistics in the layout of calculate_basic_stats, in one query
+        """
+        expressions = []
+        for col in columns:
+            name = quote_identifier(col)
+            expressions += [
+                f"avg({name})", f"median({name})", f"stddev_samp({name})",
+                f"min({name})", f"max({name})",
+                f"quantile_cont({name}, 0.25)", f"quantile_cont({name}, 0.75)",
+                f"count({name})", f"count(*) - count({name})"
+            ]
+        row = self._fetch_one(f"SELECT {', '.join(expressions)} FROM ({self.sql})", self.params)
+        labels = ["Mean", "Median", "Std Dev", "Min", "Max", "25%", "75%", "Count", "Missing"]
+        return pd.DataFrame({
+            col: dict(zip(labels, row[i * len(labels):(i + 1) * len(labels)]))
+            for i, col in enumerate(columns)
+        }).astype(float)
+
+    def histogram(self, column, bins):
+        """
+        Equal-width histogram of a numeric column, binned like np.histogram
+
+        Returns:
+        - (counts, bin_edges) tuple
+        """
+        name = quote_identifier(column)
+        low, high = self._fetch_one(f"SELECT min({name}), max({name}) FROM ({self.sql})", self.params)
+        if low is None:
+            return np.zeros(bins, dtype=np.int64), np.linspace(0, 1, bins + 1)
+        low, high = float(low), float(high)
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+        edges = np.linspace(low, high, bins + 1)
+        width = (high - low) / bins
+        # The last bin is closed on the right, as in np.histogram
+        binned = self._fetch_df(
+            f"SELECT least(CAST(floor(({name} - ?) / ?) AS BIGINT), {bins - 1}) AS bin, count(*) AS n "
+            f"FROM ({self.sql}) WHERE {name} IS NOT NULL GROUP BY bin",
+            [low, width] + self.params
+        )
+        counts = np.zeros(bins, dtype=np.int64)
+        counts[binned["bin"].to_numpy(dtype=np.int64)] = binned["n"].to_numpy()
+        return counts, edges
+
+    def aggregate(self, keys, column, aggregation):
+        """
+        Group by the key columns and aggregate one column
+
+        Rows with a missing key are dropped, as in pandas' groupby.
+
+        Returns:
+        - DataFrame with the keys and the aggregated column
+        """
+        key_list = ", ".join(quote_identifier(key) for key in keys)
+        value = AGGREGATION_SQL[aggregation].format(column=quote_identifier(column))
+        not_null = " AND ".join(f"{quote_identifier(key)} IS NOT NULL" for key in keys)
+        return self._fetch_df(
+            f"SELECT {key_list}, {value} AS {quote_identifier(column)} "
+            f"FROM ({self.sql}) WHERE {not_null} GROUP BY {key_list}",
+            self.params
+        )
+
+    def correlation(self, columns):
+        """
+        Pearson correlation matrix of numeric columns, in one query
+
+        Each pair uses the rows where both values are present, as in
+        pandas' DataFrame.corr.
+
+        Returns:
+        - DataFrame indexed and labelled by the columns
+        """
+        pairs = [(a, b) for i, a in enumerate(columns) for b in columns[i:]]
+        row = self._fetch_one(
+            "SELECT " + ", ".join(f"corr({quote_identifier(a)}, {quote_identifier(b)})" for a, b in pairs)
+            + f" FROM ({self.sql})",
+            self.params
+        )
+        matrix = pd.DataFrame(np.nan, index=list(columns), columns=list(columns))
+        for (a, b), value in zip(pairs, row):
+            matrix.loc[a, b] = matrix.loc[b, a] = np.nan if value is None else float(value)
+        return matrix
@@ -0,0 +1,213 @@
+import re
+import math
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.data_loader import get_dataset_key
+
+# Business vocabulary - each group is treated as interchangeable when matching
+SYNONYM_GROUPS = [
+    ['sales', 'revenue', 'turnover', 'income', 'earnings'],
+    ['profit', 'margin', 'earnings'],
+    ['cost', 'expense', 'spend', 'spending'],
+    ['price', 'cost', 'rate', 'fee'],
+    ['units', 'quantity', 'qty', 'volume', 'count'],
+    ['customer', 'client', 'buyer', 'account'],
+    ['product', 'item', 'sku', 'article'],
+    ['category', 'segment', 'group', 'type', 'class'],
+    ['region', 'area', 'territory', 'zone', 'location'],
+    ['country', 'nation', 'market'],
+    ['date', 'time', 'day', 'month', 'year', 'period', 'when'],
+    ['rating', 'score', 'review', 'satisfaction'],
+    ['age', 'years', 'old'],
+    ['employee', 'staff', 'worker', 'headcount'],
+    ['id', 'identifier', 'number', 'code'],
+    ['gbp', 'pounds', 'sterling'],
+    ['usd', 'dollars'],
+    ['eur', 'euros'],
+]
+
+# Common abbreviations found in categorical values
+ABBREVIATIONS = {
+    'n': 'north', 's': 'south', 'e': 'east', 'w': 'west',
+    'ne': 'northeast', 'nw': 'northwest', 'se': 'southeast', 'sw': 'southwest',
+    'uk': 'united kingdom', 'us': 'united states', 'usa': 'united states',
+    'q1': 'first quarter', 'q2': 'second quarter', 'q3': 'third quarter', 'q4': 'fourth quarter',
+    'm': 'male', 'f': 'female', 'y': 'yes',
+}
+
+STOPWORDS = {
+    'a', 'an', 'the', 'in', 'on', 'of', 'for', 'to', 'by', 'and', 'or', 'is', 'are', 'was', 'were',
+    'what', 'which', 'who', 'how', 'much', 'many', 'me', 'show', 'give', 'tell', 'our', 'my', 'we',
+    'with', 'per', 'from', 'at', 'as', 'do', 'does', 'did', 'it', 'this', 'that', 'these', 'those',
+    'please', 'can', 'you', 'i', 'be', 'all', 'each', 'there', 'top', 'over', 'between', 'vs',
+}
+
+# Query tokens and vocabulary tokens must be at least this similar to match
+SIMILARITY_THRESHOLD = 0.6
+
+_SYNONYMS = defaultdict(set)
+for _group in SYNONYM_GROUPS:
+    for _word in _group:
+        _SYNONYMS[_word].update(w for w in _group if w != _word)
+
+def tokenize(text):
+    """
+    Split text into lowercase word tokens, breaking snake_case and camelCase
+
+    Parameters:
+    - text: Text or column name
+
+    Returns:
+    - List of tokens
+    """
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', str(text))
+    return [token for token in re.split(r'[^0-9a-zA-Z]+', text.lower()) if token]
+
+def _trigrams(token):
+    padded = f" {token} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+class SemanticIndex:
+    """
+    Local TF-IDF index over column names and top categorical values
+
+    Every distinct token from column names, their synonyms and the most
+    frequent categorical values is embedded as a character-trigram TF-IDF
+    vector. A question is matched token by token, so "revenue in the north"
+    finds a Total_Sales_GBP column through the sales/revenue synonyms and a
+    Region value "N" through its abbreviation.
+    """
+
+    def __init__(self, df, max_values_per_column=20, max_categorical_unique=1000):
+        """
+        Parameters:
+        - df: Pandas DataFrame to index
+        - max_values_per_column: Number of most frequent values indexed per categorical column
+        - max_categorical_unique: Columns with more distinct values than this are not value-indexed
+        """
+        self.columns = list(df.columns)
+        # Each entry maps a token to the (column, value) pairs it describes; value is None for names
+        token_entries = defaultdict(set)
+        for col in self.columns:
+            for token in tokenize(col):
+                token_entries[token].add((col, None))
+                for synonym in _SYNONYMS.get(token, ()):
+                    token_entries[synonym].add((col, None))
+
+            series = df[col]
+            if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+                continue
+            if series.nunique(dropna=True) > max_categorical_unique:
+                continue
+            for value in series.value_counts().head(max_values_per_column).index:
+                value_tokens = tokenize(value)
+                expanded = list(value_tokens)
+                abbreviation = ABBREVIATIONS.get(str(value).strip().lower())
+                if abbreviation:
+                    expanded.extend(tokenize(abbreviation))
+                for token in expanded:
+                    token_entries[token].add((col, value))
+
+        self._vocabulary = list(token_entries)
+        self._entries = [token_entries[token] for token in self._vocabulary]
+
+        # Rare tokens carry more meaning - weight them by how few columns they describe
+        column_count = max(len(self.columns), 1)
+        self._token_weights = np.array([
+            1.0 + math.log(column_count / len({col for col, _ in entries}))
+            for entries in self._entries
+        ])
+
+        # Trigram inverted index with IDF weights, vectors normalised to unit length
+        trigram_docs = defaultdict(list)
+        for token_id, token in enumerate(self._vocabulary):
+            for trigram in set(_trigrams(token)):
+                trigram_docs[trigram].append(token_id)
+        vocabulary_size = max(len(self._vocabulary), 1)
+        self._idf = {trigram: math.log(1 + vocabulary_size / len(ids)) for trigram, ids in trigram_docs.items()}
+        self._postings = {}
+        self._norms = np.zeros(len(self._vocabulary))
+        for token_id, token in enumerate(self._vocabulary):
+            for trigram in set(_trigrams(token)):
+                self._norms[token_id] += self._idf[trigram] ** 2
+        self._norms = np.sqrt(self._norms)
+        for trigram, ids in trigram_docs.items():
+            weight = self._idf[trigram]
+            self._postings[trigram] = (np.array(ids), weight / self._norms[ids])
+
+    def _similar_tokens(self, token):
+        scores = np.zeros(len(self._vocabulary))
+        query_weights = {trigram: self._idf.get(trigram, math.log(1 + len(self._vocabulary))) for trigram in set(_trigrams(token))}
+        query_norm = math.sqrt(sum(w ** 2 for w in query_weights.values()))
+        for trigram, weight in query_weights.items():
+            posting = self._postings.get(trigram)
+            if posting is not None:
+                ids, doc_weights = posting
+                scores[ids] += weight * doc_weights / query_norm
+        matches = np.nonzero(scores >= SIMILARITY_THRESHOLD)[0]
+        return [(token_id, scores[token_id]) for token_id in matches]
+
+    def search(self, question, top_k=10):
+        """
+        Find the columns and values a question refers to
+
+        Parameters:
+        - question: Natural language question
+        - top_k: Maximum number of columns to return
+
+        Returns:
+        - List of dictionaries with 'column', 'score' and 'values' (matched values), best first
+        """
+        column_scores = defaultdict(float)
+        column_values = defaultdict(set)
+        for term in tokenize(question):
+            if term in STOPWORDS:
+                continue
+            best_per_column = {}
+            for token_id, similarity in self._similar_tokens(term):
+                score = similarity * self._token_weights[token_id]
+                for col, value in self._entries[token_id]:
+                    if score > best_per_column.get(col, 0):
+                        best_per_column[col] = score
+                    if value is not None:
+                        column_values[col].add(value)
+            for col, score in best_per_column.items():
+                column_scores[col] += score
+
+        ranked = sorted(column_scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [
+            {'column': col, 'score': round(float(score), 3), 'values': sorted(column_values[col], key=str)}
+            for col, score in ranked
+        ]
+
+    def relevant_columns(self, question, limit=10):
+        """
+        Get the names of the columns most relevant to a question
+
+        Parameters:
+        - question: Natural language question
+        - limit: Maximum number of columns
+
+        Returns:
+        - List of column names
+        """
+        return [match['column'] for match in self.search(question, top_k=limit)]
+
+def get_semantic_index(df):
+    """
+    Get the semantic index for the current dataset, building it once per dataset
+
+    Parameters:
+    - df: Pandas DataFrame
+
+    Returns:
+    - SemanticIndex instance
+    """
+    key = get_dataset_key(df)
+    cached = st.session_state.get("semantic_index")
+    if cached is None or cached[0] != key:
+        cached = (key, SemanticIndex(df))
+        st.session_state.semantic_index = cached
+    return cached[1]
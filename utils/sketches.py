@@ -0,0 +1,464 @@
+import numpy as np
+import pandas as pd
+
+# Rows processed at a time when building a sketch from a column
+SKETCH_CHUNK_ROWS = 1_000_000
+
+# Counters kept by the frequent items sketch
+FREQUENT_ITEMS_CAPACITY = 1000
+
+# HyperLogLog precision: 2^14 registers, about 0.8% standard error
+HLL_PRECISION = 14
+
+class FrequentItemsSketch:
+    """
+    Misra-Gries summary of the most frequent values, mergeable across chunks
+
+    Each chunk is counted exactly with value_counts and merged into at most
+    `capacity` counters. When the counters overflow, the (capacity+1)-th
+    largest count is subtracted from all of them and recorded as `offset`,
+    so every kept count is a lower bound and the true count is at most
+    `offset` higher. The offset never exceeds total / (capacity + 1).
+    """
+
+    def __init__(self, capacity=FREQUENT_ITEMS_CAPACITY):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="float64")
+        self.offset = 0
+        self.total = 0
+
+    def update(self, values):
+        """
+        Add a chunk of values (missing values are ignored)
+
+        Parameters:
+        - values: Pandas Series
+        """
+        counts = values.value_counts(dropna=True)
+        self._merge_counts(counts.astype("float64"), int(counts.sum()), 0)
+
+    def merge(self, other):
+        """
+        Merge another sketch into this one (e.g. one built on another chunk)
+        """
+        self._merge_counts(other.counts, other.total, other.offset)
+
+    def _merge_counts(self, counts, total, offset):
+        combined = self.counts.add(counts, fill_value=0) if len(self.counts) else counts
+        self.total += total
+        self.offset += offset
+        if len(combined) > self.capacity:
+            threshold = combined.nlargest(self.capacity + 1).iloc[-1]
+            combined = combined - threshold
+            combined = combined[combined > 0]
+            self.offset += threshold
+        self.counts = combined
+
+    def top(self, k):
+        """
+        Get the k most frequent values with error bounds
+
+        Returns:
+        - DataFrame with columns value, estimate and error: the true count
+          lies within estimate ± error
+        """
+        top_counts = self.counts.nlargest(k)
+        return pd.DataFrame({
+            "value": top_counts.index,
+            "estimate": (top_counts.to_numpy() + self.offset / 2).round().astype("int64"),
+            "error": int(np.ceil(self.offset / 2))
+        })
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct count estimator, mergeable across chunks
+
+    Values are hashed with pandas' vectorized hashing, so a chunk of a
+    million values is added with a handful of NumPy operations.
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        """Standard error of the estimate as a fraction (1.04 / sqrt(m))"""
+        return float(1.04 / np.sqrt(len(self.registers)))
+
+    def update(self, values):
+        """
+        Add a chunk of values (missing values are ignored)
+
+        Parameters:
+        - values: Pandas Series
+        """
+        values = values.dropna()
+        if values.empty:
+            return
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        rest_bits = 64 - self.precision
+        buckets = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        # Bit length via the float exponent; exact because rest < 2^53
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        ranks = (rest_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def merge(self, other):
+        """
+        Merge another estimator with the same precision into this one
+        """
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        """
+        Estimated number of distinct values
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+def build_categorical_sketch(series, capacity=FREQUENT_ITEMS_CAPACITY, chunk_rows=SKETCH_CHUNK_ROWS):
+    """
+    Build frequent-item and distinct-count sketches for a column chunk by chunk
+
+    Memory stays bounded by the chunk size plus `capacity` counters,
+    however many distinct values the column has.
+
+    Parameters:
+    - series: Pandas Series
+    - capacity: Counters kept for frequent values
+    - chunk_rows: Rows counted at a time
+
+    Returns:
+    - (FrequentItemsSketch, HyperLogLog) tuple
+    """
+    frequent = FrequentItemsSketch(capacity)
+    distinct = HyperLogLog()
+    for start in range(0, len(series), chunk_rows):
+        chunk = series.iloc[start:start + chunk_rows]
+        frequent.update(chunk)
+        distinct.update(chunk)
+    return frequent, distinct
+
+# Items kept per level by the quantile sketch (rank error roughly 1.7 / k)
+QUANTILE_SKETCH_K = 400
+
+# Bins kept by the streaming histogram
+HISTOGRAM_MAX_BINS = 2048
+
+class QuantileSketch:
+    """
+    KLL quantile sketch, mergeable across chunks
+
+    Items live in levels where an item at level h stands for 2^h original
+    values. When a level outgrows its capacity it is sorted and every other
+    item (from a random start) moves up a level, so a sketch of any number
+    of values holds only a few times k items.
+    """
+
+    def __init__(self, k=QUANTILE_SKETCH_K, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        """
+        Add a chunk of values
+
+        Parameters:
+        - values: NumPy array of floats without missing values
+        """
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        """
+        Merge another sketch into this one
+        """
+        self.count += other.count
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays at this level so the total weight is unchanged
+                kept = items[len(items) - len(items) % 2:]
+                promoted = items[self._rng.integers(2):len(items) - len(items) % 2:2]
+                self.levels[level] = kept
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantiles(self, qs):
+        """
+        Estimate quantiles
+
+        Parameters:
+        - qs: Sequence of quantiles between 0 and 1
+
+        Returns:
+        - NumPy array of estimated values (NaN if the sketch is empty)
+        """
+        if self.count == 0:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side="left")
+        return items[np.minimum(positions, len(items) - 1)]
+
+class StreamingHistogram:
+    """
+    Histogram with exact counts on a fixed grid of power-of-two width bins
+
+    Bin i covers [i * width, (i + 1) * width). When values fall outside the
+    grid and it would need more than `max_bins` bins, neighbouring bins are
+    paired up and the width doubles. Because every grid is aligned to zero,
+    two histograms always merge exactly.
+    """
+
+    def __init__(self, max_bins=HISTOGRAM_MAX_BINS):
+        self.max_bins = max_bins
+        self.width = None
+        self.start = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    @staticmethod
+    def _rebin(start, counts, factor):
+        indexes = np.floor_divide(start + np.arange(len(counts)), factor)
+        new_start = int(np.floor_divide(start, factor))
+        return new_start, np.bincount(indexes - new_start, weights=counts, minlength=1).astype(np.int64)
+
+    def _coarsen(self, factor):
+        self.start, self.counts = self._rebin(self.start, self.counts, factor)
+        self.width *= factor
+
+    def _extend(self, first, last):
+        # Grow the grid to cover bins first..last, coarsening as needed
+        if len(self.counts):
+            first, last = min(first, self.start), max(last, self.start + len(self.counts) - 1)
+        while last - first + 1 > self.max_bins:
+            self._coarsen(2)
+            first, last = first // 2, last // 2
+        counts = np.zeros(last - first + 1, dtype=np.int64)
+        if len(self.counts):
+            counts[self.start - first:self.start - first + len(self.counts)] = self.counts
+        self.start, self.counts = first, counts
+
+    def update(self, values):
+        """
+        Add a chunk of values (non-finite values are ignored)
+
+        Parameters:
+        - values: NumPy array of floats
+        """
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return
+        low, high = values.min(), values.max()
+        if self.width is None:
+            span = high - low if high > low else max(abs(high), 1.0)
+            self.width = float(2.0 ** np.ceil(np.log2(span / (self.max_bins - 1))))
+        while True:
+            first, last = int(np.floor(low / self.width)), int(np.floor(high / self.width))
+            if last - first + 1 <= self.max_bins:
+                break
+            if len(self.counts):
+                self._coarsen(2)
+            else:
+                self.width *= 2
+        self._extend(first, last)
+        indexes = np.floor(values / self.width).astype(np.int64) - self.start
+        self.counts += np.bincount(indexes, minlength=len(self.counts))
+
+    def merge(self, other):
+        """
+        Merge another histogram into this one
+        """
+        if not len(other.counts):
+            return
+        if not len(self.counts):
+            self.width, self.start, self.counts = other.width, other.start, other.counts.copy()
+            return
+        other_start, other_counts, other_width = other.start, other.counts, other.width
+        # Bring both grids to the coarser width, then coarsen both until the union fits
+        while other_width < self.width:
+            other_start, other_counts = self._rebin(other_start, other_counts, 2)
+            other_width *= 2
+        while self.width < other_width:
+            self._coarsen(2)
+        while (
+            max(self.start + len(self.counts), other_start + len(other_counts))
+            - min(self.start, other_start) > self.max_bins
+        ):
+            self._coarsen(2)
+            other_start, other_counts = self._rebin(other_start, other_counts, 2)
+        self._extend(other_start, other_start + len(other_counts) - 1)
+        offset = other_start - self.start
+        self.counts[offset:offset + len(other_counts)] += other_counts
+
+    def histogram(self, bins, low, high):
+        """
+        Counts for equal-width bins between low and high
+
+        Grid bins that straddle a requested edge are split in proportion to
+        the overlap, so each count is within one grid bin of the exact value.
+
+        Parameters:
+        - bins: Number of bins
+        - low, high: Range to cover (normally the column's min and max)
+
+        Returns:
+        - (counts, bin_edges) tuple like np.histogram
+        """
+        edges = np.linspace(low, high, bins + 1)
+        if not len(self.counts):
+            return np.zeros(bins, dtype=np.int64), edges
+        grid_edges = (self.start + np.arange(len(self.counts) + 1)) * self.width
+        cumulative = np.concatenate([[0], np.cumsum(self.counts)])
+        at_edges = np.interp(edges, grid_edges, cumulative)
+        at_edges[0], at_edges[-1] = 0, cumulative[-1]
+        return np.diff(np.round(at_edges)).astype(np.int64), edges
+
+class NumericColumnSketch:
+    """
+    Mergeable summary of a numeric column: count, missing values, mean and
+    variance (combined with Chan's formula), min/max, quantiles and histogram
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.missing = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+        self.quantile_sketch = QuantileSketch()
+        self.histogram = StreamingHistogram()
+
+    def update(self, series):
+        """
+        Add a chunk of the column
+
+        Parameters:
+        - series: Numeric Pandas Series
+        """
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        present = values[~np.isnan(values)]
+        self.missing += len(values) - len(present)
+        if len(present) == 0:
+            return
+        chunk = NumericColumnSketch()
+        chunk.count = len(present)
+        chunk.mean = float(present.mean())
+        chunk.m2 = float(((present - chunk.mean) ** 2).sum())
+        chunk.min, chunk.max = float(present.min()), float(present.max())
+        self._merge_moments(chunk)
+        self.quantile_sketch.update(present)
+        self.histogram.update(present)
+
+    def merge(self, other):
+        """
+        Merge another column sketch into this one
+        """
+        self.missing += other.missing
+        self._merge_moments(other)
+        self.quantile_sketch.merge(other.quantile_sketch)
+        self.histogram.merge(other.histogram)
+
+    def _merge_moments(self, other):
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.min = other.min if self.count == 0 else min(self.min, other.min)
+        self.max = other.max if self.count == 0 else max(self.max, other.max)
+        self.count = total
+
+    def stats(self):
+        """
+        Statistics in the layout of calculate_basic_stats
+        """
+        q25, median, q75 = self.quantile_sketch.quantiles([0.25, 0.5, 0.75])
+        return {
+            "Mean": self.mean if self.count else np.nan,
+            "Median": median,
+            "Std Dev": np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan,
+            "Min": self.min,
+            "Max": self.max,
+            "25%": q25,
+            "75%": q75,
+            "Count": self.count,
+            "Missing": self.missing
+        }
+
+def update_numeric_sketches(sketches, chunk, excluded):
+    """
+    Add a chunk of a dataset to per-column numeric sketches
+
+    A column that is not numeric in some chunk cannot be summarised and is
+    moved to `excluded`.
+
+    Parameters:
+    - sketches: Dictionary of column name -> NumericColumnSketch (updated in place)
+    - chunk: Pandas DataFrame
+    - excluded: Set of excluded column names (updated in place)
+    """
+    for col in chunk.columns:
+        if col in excluded:
+            continue
+        series = chunk[col]
+        if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            if not series.isna().all():
+                excluded.add(col)
+                sketches.pop(col, None)
+                continue
+        if col not in sketches:
+            sketches[col] = NumericColumnSketch()
+        sketches[col].update(series)
+
+def build_numeric_sketches(df, chunk_rows=SKETCH_CHUNK_ROWS):
+    """
+    Build numeric column sketches for a DataFrame that is already in memory
+
+    Parameters:
+    - df: Pandas DataFrame
+    - chunk_rows: Rows added at a time
+
+    Returns:
+    - Dictionary of column name -> NumericColumnSketch
+    """
+    sketches, excluded = {}, set()
+    for start in range(0, len(df), chunk_rows):
+        update_numeric_sketches(sketches, df.iloc[start:start + chunk_rows], excluded)
+    return sketches
@@ -0,0 +1,178 @@
+import re
+from collections import deque
+from functools import lru_cache
+
+# Chart keywords in priority order - when several match, the earliest entry wins
+_REQUEST_KEYWORDS = [
+    ('bar chart', ['bar chart', 'bar graph', 'column chart']),
+    ('line chart', ['line chart', 'line graph', 'trend']),
+    ('scatter plot', ['scatter plot', 'scatter graph', 'scatterplot']),
+    ('histogram', ['histogram', 'distribution']),
+    ('pie chart', ['pie chart', 'pie graph']),
+    ('heatmap', ['heatmap', 'heat map', 'correlation map']),
+    ('box plot', ['box plot', 'boxplot', 'box and whisker']),
+    ('correlation', ['correlation matrix', 'correlation heatmap']),
+]
+
+_RESPONSE_KEYWORDS = [
+    ('bar chart', ['bar chart', 'bar graph', 'column chart']),
+    ('line chart', ['line chart', 'line graph', 'trend line']),
+    ('scatter plot', ['scatter plot', 'scatter graph', 'scatterplot']),
+    ('histogram', ['histogram', 'distribution chart']),
+    ('pie chart', ['pie chart', 'pie graph']),
+    ('heatmap', ['heatmap', 'heat map']),
+    ('box plot', ['box plot', 'boxplot']),
+    ('correlation', ['correlation matrix', 'correlation heatmap']),
+]
+
+def _compile_keywords(keyword_groups):
+    """
+    Compile chart keyword groups into one alternation with a group per chart type
+
+    The alternation sits inside a lookahead so overlapping keywords
+    (e.g. "heatmap" inside "correlation heatmap") are all seen in one pass.
+    """
+    alternatives = []
+    for i, (_, keywords) in enumerate(keyword_groups):
+        alternatives.append(f"(?P<k{i}>{'|'.join(re.escape(k) for k in keywords)})")
+    return re.compile(f"(?=(?:{'|'.join(alternatives)}))", re.IGNORECASE)
+
+# Patterns are compiled once at import time
+_ACTION_PATTERN = re.compile(r'create|show|generate|display', re.IGNORECASE)
+_REQUEST_PATTERN = _compile_keywords(_REQUEST_KEYWORDS)
+_RESPONSE_PATTERN = _compile_keywords(_RESPONSE_KEYWORDS)
+
+def _classify(text, pattern, keyword_groups, start=0):
+    best = None
+    for match in pattern.finditer(text, start):
+        index = int(match.lastgroup[1:])
+        if best is None or index < best:
+            best = index
+            if best == 0:
+                break
+    return keyword_groups[best][0] if best is not None else None
+
+def classify_chart_request(prompt):
+    """
+    Classify a user prompt as a visualization request
+
+    A prompt counts as a request when an action verb (create, show, generate,
+    display) appears before a chart keyword.
+
+    Parameters:
+    - prompt: User prompt text
+
+    Returns:
+    - Chart type string or None
+    """
+    action = _ACTION_PATTERN.search(prompt)
+    if action is None:
+        return None
+    return _classify(prompt, _REQUEST_PATTERN, _REQUEST_KEYWORDS, action.end())
+
+def classify_chart_mention(response):
+    """
+    Find the chart type mentioned in an assistant response
+
+    Parameters:
+    - response: Assistant response text
+
+    Returns:
+    - Chart type string or None
+    """
+    return _classify(response, _RESPONSE_PATTERN, _RESPONSE_KEYWORDS)
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+class ColumnMatcher:
+    """
+    Aho-Corasick automaton over the column names of a dataset
+
+    Finds every column mentioned in a text in a single pass, case
+    insensitively and on word boundaries, instead of running one regex per
+    column over the whole text.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self._patterns = [str(col).lower() for col in self.columns]
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for pattern_id, pattern in enumerate(self._patterns):
+            if pattern:
+                self._add(pattern, pattern_id)
+        self._build_failure_links()
+
+    def _add(self, pattern, pattern_id):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern_id)
+
+    def _build_failure_links(self):
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self._goto[state].items():
+                pending.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """
+        Find the columns mentioned in a text
+
+        Parameters:
+        - text: Text to scan
+
+        Returns:
+        - List of mentioned columns, in dataset column order
+        """
+        text = text.lower()
+        found = set()
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern_id in self._output[state]:
+                if pattern_id in found:
+                    continue
+                pattern = self._patterns[pattern_id]
+                start = position - len(pattern) + 1
+                end = position + 1
+                # Same boundary rules as a \b...\b regex around the column name
+                if _is_word_char(pattern[0]) and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if _is_word_char(pattern[-1]) and end < len(text) and _is_word_char(text[end]):
+                    continue
+                found.add(pattern_id)
+        return [self.columns[i] for i in sorted(found)]
+
+@lru_cache(maxsize=32)
+def _cached_column_matcher(columns):
+    return ColumnMatcher(columns)
+
+def get_column_matcher(columns):
+    """
+    Get a column matcher for a dataset, built once per set of column names
+
+    Parameters:
+    - columns: Iterable of column names (e.g. df.columns)
+
+    Returns:
+    - ColumnMatcher instance
+    """
+    return _cached_column_matcher(tuple(columns))
@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.data_loader import get_dataset_key
+
+# Transformations that never change column values, only which rows are kept
+ROW_ONLY_KINDS = {"filter", "sample"}
+
+def _new_history(base):
+    return {
+        "base": base,
+        "steps": [],
+        "position": 0,
+        "current_key": get_dataset_key(base)
+    }
+
+def get_history():
+    """
+    Get the transformation history for the current dataset
+
+    A new history starts whenever st.session_state.data was replaced by
+    something other than the history itself (a new upload, a saved file,
+    a reset), with that frame as the base.
+
+    Returns:
+    - History dictionary
+    """
+    data = st.session_state.get("data")
+    history = st.session_state.get("data_history")
+    if history is None or history["current_key"] != get_dataset_key(data):
+        history = _new_history(data)
+        st.session_state.data_history = history
+    return history
+
+def _build_step(kind, label, source, result, params):
+    """
+    Describe result relative to source as a row selection plus replaced columns
+
+    Rows are stored as a boolean mask when their order is kept (filtering,
+    dropping rows) or as positions otherwise (sampling). Only columns whose
+    values changed are stored; everything else is taken from the base frame
+    when the step is replayed.
+    """
+    step = {"kind": kind, "label": label, "params": params, "rows": len(result)}
+
+    positions = source.index.get_indexer(result.index) if source.index.is_unique else None
+    if positions is None or (positions < 0).any():
+        # Rows cannot be traced back to the source: keep the result itself
+        step.update({"mask": None, "positions": None, "columns": None, "snapshot": result})
+        return step
+
+    if len(positions) == len(source) and (positions == np.arange(len(source))).all():
+        step.update({"mask": None, "positions": None})
+    elif (np.diff(positions) > 0).all():
+        mask = np.zeros(len(source), dtype=bool)
+        mask[positions] = True
+        step.update({"mask": mask, "positions": None})
+    else:
+        step.update({"mask": None, "positions": positions})
+
+    changed = {}
+    if kind not in ROW_ONLY_KINDS:
+        for col in result.columns:
+            before = source[col] if col in source.columns else None
+            after = result[col]
+            if (
+                before is None
+                or before.dtype != after.dtype
+                or not before.take(positions).reset_index(drop=True).equals(after.reset_index(drop=True))
+            ):
+                # Copied so the step does not keep the result's whole block alive
+                changed[col] = after.copy()
+    step["columns"] = changed
+    step["column_order"] = list(result.columns)
+    step["snapshot"] = None
+    return step
+
+def _step_positions(step):
+    if step["mask"] is not None:
+        return np.flatnonzero(step["mask"])
+    return step["positions"]
+
+def materialize(history, position):
+    """
+    Rebuild the dataset after the first `position` steps
+
+    Row selections are composed into one set of positions, so the base
+    frame is indexed once however many steps there are.
+
+    Parameters:
+    - history: History dictionary
+    - position: Number of steps to apply
+
+    Returns:
+    - Pandas DataFrame
+    """
+    frame = history["base"]
+    positions = None
+    replaced = {}
+    column_order = list(frame.columns)
+
+    for step in history["steps"][:position]:
+        if step["snapshot"] is not None:
+            frame, positions, replaced = step["snapshot"], None, {}
+            column_order = list(frame.columns)
+            continue
+
+        step_positions = _step_positions(step)
+        if step_positions is not None:
+            positions = step_positions if positions is None else positions[step_positions]
+            replaced = {col: series.iloc[step_positions] for col, series in replaced.items()}
+        replaced.update(step["columns"])
+        column_order = step["column_order"]
+
+    if positions is None and not replaced:
+        return frame
+
+    # One copy of the kept columns; replaced columns are then set on that copy
+    kept_columns = [col for col in column_order if col not in replaced]
+    if positions is None:
+        result = frame[kept_columns]
+    else:
+        result = frame.iloc[positions, frame.columns.get_indexer(kept_columns)]
+    # A shallow copy detaches the selection from frame (no SettingWithCopyWarning) without copying data
+    result = result.copy(deep=False)
+    for col, series in replaced.items():
+        result[col] = pd.Series(series.array, index=result.index, name=col)
+    if list(result.columns) != column_order:
+        result = result[column_order]
+    return result
+
+def apply_transformation(kind, label, result, params=None):
+    """
+    Record a transformation and make its result the current dataset
+
+    Any steps that were undone are discarded, as in an editor.
+
+    Parameters:
+    - kind: 'clean', 'filter' or 'sample'
+    - label: Short description shown in the history
+    - result: Transformed DataFrame (derived from the current dataset)
+    - params: Optional parameters of the operation, kept for display
+    """
+    history = get_history()
+    source = st.session_state.data
+
+    del history["steps"][history["position"]:]
+    history["steps"].append(_build_step(kind, label, source, result, params))
+    history["position"] = len(history["steps"])
+
+    st.session_state.data = result
+    history["current_key"] = get_dataset_key(result)
+
+def move_to(position):
+    """
+    Make the dataset after `position` steps current (used by undo and redo)
+
+    Parameters:
+    - position: Number of steps to apply (0 restores the base dataset)
+    """
+    history = get_history()
+    position = max(0, min(position, len(history["steps"])))
+    if position == history["position"]:
+        return
+
+    data = materialize(history, position)
+    history["position"] = position
+    st.session_state.data = data
+    history["current_key"] = get_dataset_key(data)
+
+def undo():
+    """
+    Undo the last applied transformation
+    """
+    move_to(get_history()["position"] - 1)
+
+def redo():
+    """
+    Re-apply the last undone transformation
+    """
+    move_to(get_history()["position"] + 1)
+
+def get_history_memory_bytes(history):
+    """
+    Memory held by the history on top of the base dataset
+
+    Returns:
+    - Size in bytes of the stored masks, positions and replaced columns
+    """
+    total = 0
+    for step in history["steps"]:
+        if step["mask"] is not None:
+            total += step["mask"].nbytes
+        if step["positions"] is not None:
+            total += step["positions"].nbytes
+        for series in (step["columns"] or {}).values():
+            total += int(series.memory_usage(deep=True, index=False))
+        if step["snapshot"] is not None:
+            total += int(step["snapshot"].memory_usage(deep=True).sum())
+    return total